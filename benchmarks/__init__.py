@@ -0,0 +1,5 @@
+"""
+离线性能基准
+
+使用本地替身上游驱动全部 MCP 工具，测量延迟分布、吞吐量和内存分配，不依赖网络。
+"""
\ No newline at end of file
@@ -0,0 +1,320 @@
+"""
+MCP stdio 端到端压测
+
+启动一个或多个接入替身上游的服务器子进程（benchmarks.standin_server，内部运行
+src.main:main），通过 MCP 客户端以 stdio 连接，按权重混合回放工具调用。
+与 tool_bench 不同，测量包含进程启动、JSON-RPC 编解码和 FastMCP 分发的完整开销。
+指定 --url 时不启动子进程，而是以多个客户端会话连接已运行的 Streamable HTTP 服务器。
+
+报告内容：
+- 每个实例的启动耗时（启动进程到完成 initialize）和首次工具调用耗时
+- 服务器进程 RSS 随时间的变化（读取 /proc，其他平台不采集）
+- 请求往返延迟分布、吞吐量和错误数，总体及按工具统计
+
+用法:
+    python -m benchmarks.load_gen --instances 2 --concurrency 16 --duration 30 --output load.json
+    python -m benchmarks.load_gen --mix mix.json --latency 0.1 --error-rate 0.05
+    python -m benchmarks.load_gen --url http://127.0.0.1:8000/mcp --instances 8 --concurrency 4
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from .upstreams import add_upstream_arguments, upstream_argv
+from .workload import TOOL_ARGUMENTS, is_error, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 默认调用权重：以依赖上游的查询类工具为主，少量本地工具
+DEFAULT_MIX: Dict[str, float] = {
+    "query_ip_location": 4,
+    "query_ip_detailed_info": 2,
+    "query_crypto_price": 3,
+    "query_exchange_rate": 3,
+    "get_weather": 3,
+    "get_news_by_country": 2,
+    "fetch_random_joke": 2,
+    "fetch_inspirational_quote": 2,
+    "fetch_random_cat_image": 1,
+    "fetch_today_in_history": 1,
+    "create_short_url": 1,
+    "analyze_color": 1,
+    "create_uuid": 1,
+}
+
+# 测量首次工具调用使用的工具（不访问上游，只反映启动和分发开销）
+FIRST_CALL_TOOL = "create_uuid"
+
+def read_rss_mib(pid: int) -> Optional[float]:
+    """读取进程的常驻内存（MiB），无法读取时返回 None"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 2)
+    except (OSError, ValueError):
+        return None
+    return None
+
+@dataclass
+class InstanceResult:
+    """单个服务器实例的压测结果"""
+    index: int
+    startup_ms: float = 0.0
+    first_call_ms: float = 0.0
+    elapsed: float = 0.0
+    rss_mib: List[Tuple[float, float]] = field(default_factory=list)
+    records: List[Tuple[str, float, bool]] = field(default_factory=list)
+    
+    def report(self) -> Dict[str, Any]:
+        rss = [value for _, value in self.rss_mib]
+        return {
+            "instance": self.index,
+            "startup_ms": self.startup_ms,
+            "time_to_first_tool_call_ms": self.first_call_ms,
+            "calls": len(self.records),
+            "errors": sum(not ok for _, _, ok in self.records),
+            "rss_start_mib": rss[0] if rss else None,
+            "rss_end_mib": rss[-1] if rss else None,
+            "rss_peak_mib": max(rss) if rss else None,
+            "rss_mib": self.rss_mib,
+        }
+
+class LoadGenerator:
+    """
+    stdio / Streamable HTTP 压测驱动
+    
+    Args:
+        server_args: 传给 benchmarks.standin_server 的命令行参数
+        mix: 工具名 -> 调用权重
+        concurrency: 每个实例同时进行的调用数
+        duration: 压测时长（秒）
+        max_requests: 每个实例的最大调用数，None 表示只受时长限制
+        rss_interval: RSS 采样间隔（秒）
+        call_timeout: 单次调用的超时（秒）
+        verbose: 是否输出服务器的标准错误
+        url: 已运行的 Streamable HTTP 服务器地址，设置后每个实例是一个客户端会话，不启动子进程
+    """
+    
+    def __init__(self, server_args: Sequence[str], mix: Mapping[str, float], concurrency: int = 8,
+                 duration: float = 10.0, max_requests: Optional[int] = None, rss_interval: float = 0.5,
+                 call_timeout: float = 60.0, seed: int = 1, verbose: bool = False,
+                 url: Optional[str] = None):
+        self.server_args = list(server_args)
+        self.tools = list(mix)
+        self.weights = [mix[name] for name in self.tools]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = max_requests
+        self.rss_interval = rss_interval
+        self.call_timeout = timedelta(seconds=call_timeout)
+        self.seed = seed
+        self.verbose = verbose
+        self.url = url
+    
+    def _parameters(self, workdir: str, index: int) -> Tuple[StdioServerParameters, str]:
+        pid_file = os.path.join(workdir, f"server-{index}.pid")
+        env = dict(os.environ)
+        # 各实例的日志分别写入临时目录，避免多个进程轮转同一个文件
+        env.setdefault("LOG_FILE", os.path.join(workdir, f"server-{index}.log"))
+        params = StdioServerParameters(
+            command=sys.executable,
+            args=["-m", "benchmarks.standin_server", *self.server_args, "--pid-file", pid_file],
+            env=env,
+            cwd=ROOT
+        )
+        return params, pid_file
+    
+    async def _call(self, session: ClientSession, name: str, arguments: Mapping[str, Any]) -> Tuple[float, bool]:
+        start = time.perf_counter()
+        try:
+            result = await session.call_tool(name, dict(arguments), read_timeout_seconds=self.call_timeout)
+        except Exception:
+            return time.perf_counter() - start, False
+        text = "".join(getattr(block, "text", "") for block in result.content)
+        return time.perf_counter() - start, not result.isError and not is_error(text)
+    
+    async def _sample_rss(self, pid: Optional[int], result: InstanceResult, started: float):
+        if pid is None:
+            return
+        while True:
+            rss = read_rss_mib(pid)
+            if rss is None:
+                return
+            result.rss_mib.append((round(time.perf_counter() - started, 3), rss))
+            await asyncio.sleep(self.rss_interval)
+    
+    @asynccontextmanager
+    async def _connect(self, index: int, workdir: str, errlog) -> AsyncIterator[Tuple[Any, Any, Optional[str]]]:
+        """建立到服务器的连接，返回 (读流, 写流, 进程号文件)；连接已运行的服务器时没有进程号文件"""
+        if self.url:
+            async with streamablehttp_client(self.url) as (read, write, _):
+                yield read, write, None
+            return
+        params, pid_file = self._parameters(workdir, index)
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            yield read, write, pid_file
+    
+    async def run_instance(self, index: int, workdir: str) -> InstanceResult:
+        """启动一个服务器实例（或建立一个客户端会话）并对其施加负载"""
+        result = InstanceResult(index)
+        errlog = sys.stderr if self.verbose else open(os.devnull, "w")
+        unknown: List[str] = []
+        try:
+            spawned = time.perf_counter()
+            async with self._connect(index, workdir, errlog) as (read, write, pid_file):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    result.startup_ms = round((time.perf_counter() - spawned) * 1000, 3)
+                    await self._call(session, FIRST_CALL_TOOL, {})
+                    result.first_call_ms = round((time.perf_counter() - spawned) * 1000, 3)
+                    
+                    available = {tool.name for tool in (await session.list_tools()).tools}
+                    unknown = sorted(set(self.tools) - available)
+                    if not unknown:
+                        await self._drive(session, pid_file, random.Random(self.seed + index), result)
+        finally:
+            if errlog is not sys.stderr:
+                errlog.close()
+        # 会话关闭后再抛出，避免被客户端的任务组包装成 ExceptionGroup
+        if unknown:
+            raise ValueError(f"服务器没有这些工具: {', '.join(unknown)}")
+        return result
+    
+    async def _drive(self, session: ClientSession, pid_file: Optional[str], rng: random.Random,
+                     result: InstanceResult):
+        """按权重持续调用工具，直到达到时长或调用数上限，同时采样服务器 RSS"""
+        pid: Optional[int] = None
+        if pid_file is not None:
+            try:
+                with open(pid_file, encoding="utf-8") as f:
+                    pid = int(f.read())
+            except (OSError, ValueError):
+                pid = None
+        started = time.perf_counter()
+        sampler = asyncio.ensure_future(self._sample_rss(pid, result, started))
+        deadline = started + self.duration
+        issued = 0
+        
+        async def worker():
+            nonlocal issued
+            while time.perf_counter() < deadline and (self.max_requests is None or issued < self.max_requests):
+                sequence = issued
+                issued += 1
+                name = rng.choices(self.tools, self.weights)[0]
+                arguments = TOOL_ARGUMENTS.get(name, lambda i: {})(sequence)
+                latency, ok = await self._call(session, name, arguments)
+                result.records.append((name, latency, ok))
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            sampler.cancel()
+        result.elapsed = time.perf_counter() - started
+    
+    async def run(self, instances: int = 1) -> Dict[str, Any]:
+        """并行运行多个实例，汇总报告"""
+        with tempfile.TemporaryDirectory(prefix="free-api-mcp-load-") as workdir:
+            results = await asyncio.gather(*(self.run_instance(i, workdir) for i in range(instances)))
+        
+        wall = max(r.elapsed for r in results)
+        records = [record for r in results for record in r.records]
+        per_tool: Dict[str, List[Tuple[float, bool]]] = {}
+        for name, latency, ok in records:
+            per_tool.setdefault(name, []).append((latency, ok))
+        return {
+            "overall": summarize([r[1] for r in records], sum(not r[2] for r in records), wall),
+            "tools": {
+                name: summarize([c[0] for c in calls], sum(not c[1] for c in calls), wall)
+                for name, calls in sorted(per_tool.items())
+            },
+            "instances": [r.report() for r in results],
+        }
+
+def _load_mix(path: Optional[str]) -> Dict[str, float]:
+    if not path:
+        return dict(DEFAULT_MIX)
+    with open(path, encoding="utf-8") as f:
+        mix = {name: float(weight) for name, weight in json.load(f).items()}
+    if not mix or any(weight < 0 for weight in mix.values()) or not any(mix.values()):
+        raise ValueError("调用权重必须为非负数且不能全为0")
+    return mix
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="通过 stdio 对 MCP 服务器进行端到端压测")
+    parser.add_argument("--instances", type=int, default=1, help="服务器进程数（指定 --url 时为客户端会话数）")
+    parser.add_argument("--url", help="连接已运行的 Streamable HTTP 服务器（如 http://127.0.0.1:8000/mcp），不启动子进程")
+    parser.add_argument("--concurrency", type=int, default=8, help="每个实例同时进行的调用数")
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长（秒）")
+    parser.add_argument("--requests", type=int, help="每个实例的最大调用数")
+    parser.add_argument("--mix", help="工具调用权重的 JSON 文件，如 {\"get_weather\": 3, \"create_uuid\": 1}")
+    parser.add_argument("--rss-interval", type=float, default=0.5, help="RSS 采样间隔（秒）")
+    parser.add_argument("--call-timeout", type=float, default=60.0, help="单次调用超时（秒）")
+    add_upstream_arguments(parser)
+    parser.add_argument("--keep-cache", action="store_true", help="服务器保留响应缓存")
+    parser.add_argument("--keep-rate-limit", action="store_true", help="服务器保留上游限流")
+    parser.add_argument("--output", help="结果写入该文件，默认输出到标准输出")
+    parser.add_argument("--verbose", action="store_true", help="输出服务器的标准错误")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    mix = _load_mix(args.mix)
+    server_args = upstream_argv(args)
+    if args.keep_cache:
+        server_args.append("--keep-cache")
+    if args.keep_rate_limit:
+        server_args.append("--keep-rate-limit")
+    
+    generator = LoadGenerator(
+        server_args, mix, concurrency=args.concurrency, duration=args.duration,
+        max_requests=args.requests, rss_interval=args.rss_interval,
+        call_timeout=args.call_timeout, seed=args.seed, verbose=args.verbose, url=args.url
+    )
+    report = asyncio.run(generator.run(args.instances))
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "instances": args.instances,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "mix": mix,
+            "url": args.url,
+            "server_args": server_args,
+        },
+        **report,
+    }
+    
+    overall = report["overall"]
+    print(f"{overall['calls']} 次调用, {overall['errors']} 次失败, p50={overall['p50_ms']}ms "
+          f"p95={overall['p95_ms']}ms p99={overall['p99_ms']}ms {overall['throughput_rps']}/s", file=sys.stderr)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
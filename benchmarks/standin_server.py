@@ -0,0 +1,37 @@
+"""
+接入替身上游的 MCP 服务器
+
+运行 src.main:main，所有上游请求由本地替身响应，供压测启动子进程使用。
+默认使用 stdio，也可以单进程运行 SSE / Streamable HTTP 服务供 load_gen --url 连接。
+
+用法:
+    python -m benchmarks.standin_server --latency 0.05 --error-rate 0.1 --pid-file server.pid
+    python -m benchmarks.standin_server --transport streamable-http --port 8000
+"""
+import argparse
+import os
+from typing import Optional, Sequence
+
+from src.main import main as server_main
+
+from .upstreams import add_upstream_arguments, installed, upstreams_from_args
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="运行接入替身上游的 MCP 服务器")
+    add_upstream_arguments(parser)
+    parser.add_argument("--keep-cache", action="store_true", help="保留响应缓存")
+    parser.add_argument("--keep-rate-limit", action="store_true", help="保留上游限流")
+    parser.add_argument("--pid-file", help="启动后把进程号写入该文件")
+    parser.add_argument("--transport", choices=("stdio", "sse", "streamable-http"), default="stdio",
+                        help="MCP传输方式（替身上游只能在单个进程内生效，不支持多进程）")
+    parser.add_argument("--port", type=int, default=8000, help="网络传输的监听端口")
+    args = parser.parse_args(argv)
+    
+    if args.pid_file:
+        with open(args.pid_file, "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+    with installed(upstreams_from_args(args), keep_cache=args.keep_cache, keep_rate_limit=args.keep_rate_limit):
+        server_main(["--transport", args.transport, "--port", str(args.port), "--workers", "1"])
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+MCP 工具基准测试
+
+通过 FastMCP 的工具调用入口驱动 src/main.py 中的全部工具，上游由本地替身提供。
+每个工具先单独并发运行，再把所有工具混合并发运行，报告 p50/p95/p99 延迟、
+吞吐量和每次调用的内存分配，结果以 JSON 输出，可与保存的基线比较。
+
+用法:
+    python -m benchmarks.tool_bench --iterations 50 --concurrency 8 --output result.json
+    python -m benchmarks.tool_bench --baseline baseline.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# 基准测试不写日志文件，注入的上游错误也不输出到终端
+os.environ.setdefault("ENABLE_LOGGING", "false")
+os.environ.setdefault("ENABLE_HEALTH_CHECK", "false")
+
+from src.core.fallback_manager import fallback_manager
+from src.core.http_client import http_manager, load_fault_rules
+from src.main import mcp
+
+from .upstreams import add_upstream_arguments, installed, upstreams_from_args
+from .workload import TOOL_ARGUMENTS, is_error, summarize
+
+def _result_text(result: Any) -> str:
+    """取出工具调用结果中的文本"""
+    if isinstance(result, tuple):
+        result = result[0]
+    return "".join(getattr(block, "text", "") for block in result)
+
+async def call_tool(name: str, arguments: Mapping[str, Any]) -> Tuple[float, bool]:
+    """调用一次工具，返回 (耗时, 是否成功)"""
+    start = time.perf_counter()
+    try:
+        text = _result_text(await mcp.call_tool(name, dict(arguments)))
+    except Exception:
+        return time.perf_counter() - start, False
+    return time.perf_counter() - start, not is_error(text)
+
+async def run_calls(calls: Sequence[Tuple[str, Mapping[str, Any]]],
+                    concurrency: int) -> Tuple[List[Tuple[str, float, bool]], float]:
+    """以给定并发度执行一组工具调用，返回 ([(工具, 耗时, 是否成功)], 总耗时)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(name: str, arguments: Mapping[str, Any]) -> Tuple[str, float, bool]:
+        async with semaphore:
+            latency, ok = await call_tool(name, arguments)
+        return name, latency, ok
+    
+    start = time.perf_counter()
+    records = await asyncio.gather(*(one(name, arguments) for name, arguments in calls))
+    return list(records), time.perf_counter() - start
+
+async def measure_allocations(name: str, iterations: int) -> Dict[str, Any]:
+    """
+    顺序调用工具并用 tracemalloc 统计内存分配
+    
+    Returns:
+        每次调用的平均峰值分配（KiB）和平均净增内存块数
+    """
+    arguments = TOOL_ARGUMENTS.get(name, lambda i: {})
+    peaks = []
+    tracemalloc.start()
+    try:
+        blocks_before = sys.getallocatedblocks()
+        for i in range(iterations):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            await call_tool(name, arguments(i))
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+        blocks_after = sys.getallocatedblocks()
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kib": round(sum(peaks) / len(peaks) / 1024, 2),
+        "alloc_blocks_per_call": round((blocks_after - blocks_before) / iterations, 1),
+    }
+
+async def run_suite(tools: Sequence[str], iterations: int, concurrency: int,
+                    alloc_iterations: int = 5) -> Dict[str, Any]:
+    """依次对每个工具运行基准，最后运行所有工具的混合负载"""
+    report: Dict[str, Any] = {"tools": {}}
+    for name in tools:
+        arguments = TOOL_ARGUMENTS.get(name, lambda i: {})
+        # 预热：创建客户端、填充端点统计，不计入结果
+        await call_tool(name, arguments(0))
+        fallback_manager.reset_failed_endpoints()
+        
+        records, wall = await run_calls([(name, arguments(i)) for i in range(iterations)], concurrency)
+        result = summarize([r[1] for r in records], sum(not r[2] for r in records), wall)
+        if alloc_iterations > 0:
+            result.update(await measure_allocations(name, alloc_iterations))
+        report["tools"][name] = result
+        fallback_manager.reset_failed_endpoints()
+        print(f"{name}: p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+              f"{result['throughput_rps']}/s", file=sys.stderr)
+    
+    mixed = [(name, TOOL_ARGUMENTS.get(name, lambda i: {})(i)) for i in range(iterations) for name in tools]
+    records, wall = await run_calls(mixed, concurrency)
+    report["mixed"] = summarize([r[1] for r in records], sum(not r[2] for r in records), wall)
+    return report
+
+def compare(report: Mapping[str, Any], baseline: Mapping[str, Any], tolerance: float = 0.2,
+            noise_floor_ms: float = 1.0) -> List[str]:
+    """
+    与基线比较，返回回归说明列表
+    
+    p95 延迟超过基线 (1 + tolerance) 倍且差值超过 noise_floor_ms，或吞吐量低于基线
+    (1 - tolerance) 倍时视为回归。基线中没有的工具不比较。
+    """
+    regressions = []
+    current = dict(report.get("tools", {}), mixed=report.get("mixed", {}))
+    previous = dict(baseline.get("tools", {}), mixed=baseline.get("mixed", {}))
+    for name, result in current.items():
+        base = previous.get(name)
+        if not base or not result:
+            continue
+        if (result["p95_ms"] > base["p95_ms"] * (1 + tolerance)
+                and result["p95_ms"] - base["p95_ms"] > noise_floor_ms):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: 吞吐量 {base['throughput_rps']}/s -> {result['throughput_rps']}/s")
+    return regressions
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="使用本地替身上游对全部 MCP 工具进行基准测试")
+    parser.add_argument("--iterations", type=int, default=50, help="每个工具的调用次数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发调用数")
+    parser.add_argument("--tools", default="", help="只测试这些工具（逗号分隔），默认全部")
+    add_upstream_arguments(parser)
+    parser.add_argument("--faults", help="故障注入规则的 JSON 文件，在替身上游之上注入延迟、超时和错误")
+    parser.add_argument("--alloc-iterations", type=int, default=5, help="统计内存分配的调用次数，0 表示不统计")
+    parser.add_argument("--keep-cache", action="store_true", help="保留响应缓存")
+    parser.add_argument("--keep-rate-limit", action="store_true", help="保留上游限流")
+    parser.add_argument("--output", help="结果写入该文件，默认输出到标准输出")
+    parser.add_argument("--baseline", help="与该基线结果比较，有回归时退出码为 1")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对退化幅度")
+    parser.add_argument("--verbose", action="store_true", help="输出服务端日志")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    available = [tool.name for tool in asyncio.run(mcp.list_tools())]
+    tools = [t.strip() for t in args.tools.split(",") if t.strip()] or available
+    unknown = sorted(set(tools) - set(available))
+    if unknown:
+        print(f"未知的工具: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    
+    upstreams = upstreams_from_args(args)
+    with installed(upstreams, keep_cache=args.keep_cache, keep_rate_limit=args.keep_rate_limit):
+        if args.faults:
+            http_manager.enable_fault_injection(load_fault_rules(args.faults), seed=args.seed)
+        try:
+            report = asyncio.run(run_suite(tools, args.iterations, args.concurrency, args.alloc_iterations))
+        finally:
+            http_manager.disable_fault_injection()
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "upstream": dataclasses.asdict(upstreams.default),
+            "keep_cache": args.keep_cache,
+            "keep_rate_limit": args.keep_rate_limit,
+            "faults": args.faults,
+        },
+        **report,
+        "upstream_requests": dict(sorted(upstreams.requests.items())),
+    }
+    
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"回归: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+本地替身上游
+
+为内置服务的每个端点主机提供固定格式的响应，可按服务配置延迟、抖动、错误率和
+响应体大小。通过 httpx.MockTransport 接入 HTTP 客户端，不发起任何网络请求。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import httpx
+
+from src.core.config import ServiceRegistry, config_manager
+from src.core.http_client import HTTPClientManager, http_manager
+
+@dataclass(frozen=True)
+class UpstreamProfile:
+    """替身上游的行为参数"""
+    latency: float = 0.02           # 基础延迟（秒）
+    jitter: float = 0.01            # 在基础延迟上叠加的均匀随机抖动（秒）
+    error_rate: float = 0.0         # 返回 503 的概率
+    payload_bytes: int = 0          # JSON 响应中额外填充的字节数
+    
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "UpstreamProfile":
+        """从配置字典创建，未知字段报错"""
+        unknown = set(data) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"未知的上游参数: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+_CURRENCIES = (
+    'USD', 'EUR', 'GBP', 'JPY', 'CNY', 'AUD', 'CAD', 'CHF', 'HKD', 'SGD',
+    'KRW', 'INR', 'RUB', 'BRL', 'ZAR', 'MXN', 'NOK', 'SEK', 'DKK', 'PLN'
+)
+_IMAGE = b"\x89PNG\r\n\x1a\n" + b"\x00" * 256
+
+def _ip_api(request: httpx.Request) -> Any:
+    return {
+        "status": "success", "country": "中国", "countryCode": "CN", "region": "BJ",
+        "regionName": "北京", "city": "北京", "zip": "100000", "lat": 39.9, "lon": 116.4,
+        "timezone": "Asia/Shanghai", "isp": "Stand-in ISP", "org": "Stand-in Org",
+        "as": "AS64512 Stand-in", "query": request.url.path.rsplit("/", 1)[-1]
+    }
+
+def _coingecko(request: httpx.Request) -> Any:
+    coin = request.url.params.get("ids", "bitcoin")
+    currency = request.url.params.get("vs_currencies", "usd")
+    return {coin: {currency: 43210.5, f"{currency}_market_cap": 850000000000, f"{currency}_24h_change": 1.25}}
+
+def _news(request: httpx.Request) -> Any:
+    size = int(request.url.params.get("pageSize", "5"))
+    return {
+        "status": "ok",
+        "articles": [{"title": f"替身新闻 {i}", "source": {"name": "Stand-in"}} for i in range(1, size + 1)]
+    }
+
+def _weather(request: httpx.Request) -> Any:
+    return {"weather": [{"description": "晴"}], "main": {"temp": 21.5, "feels_like": 20.8, "humidity": 45}}
+
+# 主机 -> 生成响应的函数；返回 bytes 或 str 时原样作为响应体，其余按 JSON 编码
+FIXTURES: Dict[str, Callable[[httpx.Request], Any]] = {
+    "ip-api.com": _ip_api,
+    "freeipapi.com": lambda r: {"countryName": "中国", "regionName": "北京", "cityName": "北京", "isp": "Stand-in ISP"},
+    "api.coingecko.com": _coingecko,
+    "api.coincap.io": lambda r: {"data": [{
+        "name": "Bitcoin", "symbol": "BTC", "priceUsd": "43210.5",
+        "marketCapUsd": "850000000000", "changePercent24Hr": "1.25"
+    }]},
+    "min-api.cryptocompare.com": lambda r: {r.url.params.get("tsyms", "USD"): 43210.5},
+    "api.quotable.io": lambda r: {"content": "Stand-in quote.", "author": "Stand-in"},
+    "zenquotes.io": lambda r: [{"q": "Stand-in quote.", "a": "Stand-in"}],
+    "v2.jokeapi.dev": lambda r: {"error": False, "type": "single", "joke": "Stand-in joke."},
+    "official-joke-api.appspot.com": lambda r: {"setup": "Stand-in setup?", "punchline": "Stand-in punchline."},
+    "api.exchangerate-api.com": lambda r: {"date": "2024-01-01", "rates": {c: 1.5 for c in _CURRENCIES}},
+    "api.fixer.io": lambda r: {"success": True, "date": "2024-01-01", "rates": {c: 1.5 for c in _CURRENCIES}},
+    "api.qrserver.com": lambda r: _IMAGE,
+    "api.goqr.me": lambda r: _IMAGE,
+    "tinyurl.com": lambda r: "https://tinyurl.com/standin",
+    "is.gd": lambda r: "https://is.gd/standin",
+    "newsapi.org": _news,
+    "newsdata.io": _news,
+    "api.openweathermap.org": _weather,
+    "api.weatherapi.com": _weather,
+    "api.thecatapi.com": lambda r: [{"url": "https://cdn2.thecatapi.com/images/standin.jpg", "width": 640, "height": 480}],
+    "cataas.com": lambda r: _IMAGE,
+    "dog.ceo": lambda r: {"status": "success", "message": "https://images.dog.ceo/breeds/hound-afghan/standin.jpg"},
+    "api.thedogapi.com": lambda r: [{"url": "https://cdn2.thedogapi.com/images/standin.jpg", "width": 640, "height": 480}],
+    "uselessfacts.jsph.pl": lambda r: {"text": "Stand-in fact."},
+    "api.api-ninjas.com": lambda r: [{"fact": "Stand-in fact."}],
+    "meme-api.com": lambda r: {"count": 1, "data": {"memes": [{"title": "Stand-in", "image": "https://i.imgflip.com/standin.jpg"}]}},
+    "www.reddit.com": lambda r: {"data": {"children": [{"data": {"title": "Stand-in", "url": "https://i.redd.it/standin.jpg"}}]}},
+    "history.muffinlabs.com": lambda r: {"data": {"Events": [
+        {"year": str(1900 + i), "text": f"Stand-in event {i}"} for i in range(1, 6)
+    ]}},
+    "www.thecolorapi.com": lambda r: {
+        "hex": {"value": "#" + r.url.params.get("hex", "000000").upper()},
+        "rgb": {"r": 0, "g": 0, "b": 0}, "hsl": {"h": 0, "s": 0, "l": 0}, "name": {"value": "Stand-in"}
+    },
+}
+
+class StandInUpstreams:
+    """
+    按服务注册表模拟所有上游
+    
+    Args:
+        profiles: 服务名 -> 行为参数，未列出的服务使用 default
+        default: 默认行为参数
+        registry: 服务注册表，默认使用当前配置
+        seed: 随机数种子，用于复现抖动和错误注入
+    """
+    
+    def __init__(self, profiles: Optional[Mapping[str, UpstreamProfile]] = None,
+                 default: UpstreamProfile = UpstreamProfile(),
+                 registry: Optional[ServiceRegistry] = None,
+                 seed: Optional[int] = None):
+        registry = registry if registry is not None else config_manager.services
+        profiles = profiles or {}
+        self.default = default
+        unknown = set(profiles) - set(registry.names())
+        if unknown:
+            raise ValueError(f"未知的服务: {', '.join(sorted(unknown))}")
+        
+        self._hosts: Dict[str, Tuple[str, UpstreamProfile]] = {}
+        for name in registry.names():
+            profile = profiles.get(name, default)
+            for info in registry.get(name).endpoints:
+                if info.host and not info.is_backup:
+                    self._hosts.setdefault(info.host, (name, profile))
+        self.missing_fixtures = sorted(host for host in self._hosts if host not in FIXTURES)
+        self.requests: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def _draw(self, profile: UpstreamProfile) -> Tuple[float, bool]:
+        """抽取本次请求的延迟和是否失败"""
+        with self._lock:
+            delay = profile.latency + self._random.uniform(0, profile.jitter)
+            failed = self._random.random() < profile.error_rate
+        return delay, failed
+    
+    def respond(self, request: httpx.Request) -> Tuple[float, httpx.Response]:
+        """生成响应，返回 (应等待的延迟, 响应)"""
+        host = request.url.host
+        self.requests[host] += 1
+        _, profile = self._hosts.get(host, ("", UpstreamProfile(latency=0, jitter=0)))
+        fixture = FIXTURES.get(host)
+        if fixture is None:
+            return 0.0, httpx.Response(404, text=f"no stand-in for {host}")
+        
+        delay, failed = self._draw(profile)
+        if failed:
+            return delay, httpx.Response(503, text="stand-in failure")
+        
+        body = fixture(request)
+        if isinstance(body, bytes):
+            return delay, httpx.Response(200, content=body + b"\x00" * profile.payload_bytes)
+        if isinstance(body, str):
+            return delay, httpx.Response(200, text=body)
+        if profile.payload_bytes:
+            target = body[0] if isinstance(body, list) else body
+            target["padding"] = "x" * profile.payload_bytes
+        return delay, httpx.Response(200, json=body)
+    
+    async def handle_async(self, request: httpx.Request) -> httpx.Response:
+        delay, response = self.respond(request)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return response
+    
+    def transport(self) -> httpx.MockTransport:
+        """创建接入替身上游的传输层"""
+        return httpx.MockTransport(self.handle_async)
+
+@contextmanager
+def installed(upstreams: StandInUpstreams, http: Optional[HTTPClientManager] = None,
+              keep_cache: bool = False, keep_rate_limit: bool = False) -> Iterator[StandInUpstreams]:
+    """
+    在代码块内让HTTP客户端管理器使用替身上游
+    
+    默认同时关闭响应缓存和上游限流，使每次调用都经过完整的请求路径；
+    退出时恢复原来的传输层、缓存和限流器。
+    """
+    http = http if http is not None else http_manager
+    saved_cache, saved_limiter = http.cache, http.rate_limiter
+    saved_transport = http.set_transport(upstreams.transport())
+    if not keep_cache:
+        http.cache = None
+    if not keep_rate_limit:
+        http.rate_limiter = None
+    try:
+        yield upstreams
+    finally:
+        http.set_transport(saved_transport)
+        http.cache, http.rate_limiter = saved_cache, saved_limiter
+
+def add_upstream_arguments(parser: argparse.ArgumentParser):
+    """添加配置替身上游行为的命令行参数"""
+    parser.add_argument("--latency", type=float, default=0.02, help="上游基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.01, help="上游延迟抖动（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="上游返回 503 的概率")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="JSON 响应额外填充的字节数")
+    parser.add_argument("--profiles", help="按服务覆盖上游参数的 JSON 文件，如 {\"weather\": {\"latency\": 0.2}}")
+    parser.add_argument("--seed", type=int, default=1, help="随机数种子")
+
+def upstream_argv(args: argparse.Namespace) -> List[str]:
+    """把替身上游参数还原为命令行参数，传给子进程"""
+    argv = [
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate), "--payload-bytes", str(args.payload_bytes),
+        "--seed", str(args.seed)
+    ]
+    if args.profiles:
+        argv += ["--profiles", os.path.abspath(args.profiles)]
+    return argv
+
+def upstreams_from_args(args: argparse.Namespace) -> StandInUpstreams:
+    """按命令行参数创建替身上游"""
+    profiles: Dict[str, UpstreamProfile] = {}
+    if args.profiles:
+        with open(args.profiles, encoding="utf-8") as f:
+            profiles = {name: UpstreamProfile.from_dict(values) for name, values in json.load(f).items()}
+    default = UpstreamProfile(args.latency, args.jitter, args.error_rate, args.payload_bytes)
+    upstreams = StandInUpstreams(profiles, default=default, seed=args.seed)
+    if upstreams.missing_fixtures:
+        print(f"以下上游没有替身响应，将返回 404: {', '.join(upstreams.missing_fixtures)}", file=sys.stderr)
+    return upstreams
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+基准负载定义
+
+各工具的调用参数、失败判定和延迟分布统计，供工具基准和 stdio 压测共用。
+"""
+import math
+from typing import Any, Callable, Dict, Sequence
+
+_COINS = ("bitcoin", "ethereum", "dogecoin", "solana")
+_CITIES = ("北京", "上海", "广州", "深圳", "杭州")
+
+# 工具名 -> 第 i 次调用的参数；参数随 i 变化，避免合并请求把并发调用折叠成一次
+TOOL_ARGUMENTS: Dict[str, Callable[[int], Dict[str, Any]]] = {
+    "query_ip_location": lambda i: {"ip_or_domain": f"203.0.113.{i % 250 + 1}"},
+    "query_ip_detailed_info": lambda i: {"ip_or_domain": f"198.51.100.{i % 250 + 1}"},
+    "check_ip_security": lambda i: {"ip_address": f"192.0.2.{i % 250 + 1}"},
+    "analyze_ip_comprehensive": lambda i: {"ip_or_domain": f"203.0.113.{i % 250 + 1}"},
+    "get_china_news": lambda i: {"limit": i % 10 + 1},
+    "get_news_by_country": lambda i: {"country": ("us", "gb", "jp", "de")[i % 4], "limit": i % 10 + 1},
+    "get_weather": lambda i: {"city": _CITIES[i % len(_CITIES)]},
+    "query_crypto_price": lambda i: {"crypto_symbol": _COINS[i % len(_COINS)], "vs_currency": ("usd", "cny")[i % 2]},
+    "query_exchange_rate": lambda i: {"from_currency": "USD", "to_currency": "CNY", "amount": float(i + 1)},
+    "create_qr_code": lambda i: {"text": f"bench-{i}"},
+    "create_short_url": lambda i: {"long_url": f"https://example.com/bench/{i}"},
+    "analyze_color": lambda i: {"color_input": f"{(i * 2654435761) & 0xFFFFFF:06x}"},
+    "create_random_password": lambda i: {"length": 8 + i % 24},
+}
+
+# 工具返回这些内容时视为失败（工具把错误作为文本返回，不抛出异常）
+_ERROR_MARKERS = ("不可用", "请求超时", "❌")
+
+def is_error(text: str) -> bool:
+    """工具返回的文本是否表示调用失败"""
+    return any(marker in text for marker in _ERROR_MARKERS)
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """最近秩法计算分位数，sorted_values 需已升序排列"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def summarize(latencies: Sequence[float], errors: int, wall: float) -> Dict[str, Any]:
+    """汇总一组调用的延迟分布和吞吐量（延迟单位为毫秒）"""
+    ordered = sorted(latencies)
+    return {
+        "calls": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "throughput_rps": round(len(ordered) / wall, 2) if wall > 0 else 0.0,
+    }
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+同步/异步桥接模块
+
+异步路径是请求处理的唯一实现，同步API通过后台事件循环线程运行协程，
+保证异步HTTP客户端始终绑定在同一个事件循环上，连接池得以复用。
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """获取（必要时启动）后台事件循环"""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(
+                target=_loop.run_forever,
+                name="free-api-mcp-sync-bridge",
+                daemon=True
+            )
+            _thread.start()
+        return _loop
+
+def in_bridge_loop() -> bool:
+    """当前线程是否为后台事件循环线程"""
+    return _thread is not None and threading.current_thread() is _thread
+
+class TaskFuture(concurrent.futures.Future):
+    """后台事件循环中任务的结果，可通过 cancel_task 取消正在运行的任务"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._loop = loop
+        self._task: Optional[asyncio.Task] = None
+    
+    def cancel_task(self):
+        """取消任务；任务尚未开始时直接取消 Future"""
+        if self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        else:
+            self.cancel()
+
+def submit(coro: Awaitable[T]) -> TaskFuture:
+    """
+    在后台事件循环中运行协程，不等待结果
+    
+    调用方的上下文变量会被复制到协程中。
+    
+    Args:
+        coro: 要运行的协程
+    
+    Returns:
+        协程结果的 TaskFuture
+    """
+    loop = _get_loop()
+    context = contextvars.copy_context()
+    result = TaskFuture(loop)
+    
+    def _schedule():
+        if not result.set_running_or_notify_cancel():
+            coro.close()
+            return
+        task = loop.create_task(coro, context=context)
+        
+        def _done(t: asyncio.Task):
+            if t.cancelled():
+                result.set_exception(concurrent.futures.CancelledError())
+            elif t.exception() is not None:
+                result.set_exception(t.exception())
+            else:
+                result.set_result(t.result())
+        
+        task.add_done_callback(_done)
+        result._task = task
+    
+    loop.call_soon_threadsafe(_schedule)
+    return result
+
+def run_sync(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """
+    在后台事件循环中运行协程并阻塞等待结果
+    
+    调用方的上下文变量会被复制到协程中。
+    
+    Args:
+        coro: 要运行的协程
+        timeout: 可选的等待超时时间（秒）
+    
+    Returns:
+        协程的返回值
+    """
+    if in_bridge_loop():
+        coro.close()
+        raise RuntimeError("不能在后台事件循环线程中同步等待协程")
+    
+    result = submit(coro)
+    try:
+        return result.result(timeout)
+    except concurrent.futures.TimeoutError:
+        result.cancel_task()
+        raise TimeoutError("同步调用等待超时")
+
+def shutdown():
+    """停止后台事件循环"""
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop, _thread = None, None
+    if loop is not None and loop.is_running():
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=1.0)
\ No newline at end of file
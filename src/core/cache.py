@@ -0,0 +1,372 @@
+"""
+响应缓存模块
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+import httpx
+
+# 与原始响应体编码相关的响应头，缓存解码后的响应体时不保留
+_ENCODING_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+@dataclass
+class CacheEntry:
+    """缓存的HTTP响应"""
+    url: str
+    status_code: int
+    headers: Tuple[Tuple[str, str], ...]
+    content: bytes
+    expires_at: float
+    
+    @property
+    def size(self) -> int:
+        """条目占用的近似字节数"""
+        return len(self.content) + len(self.url) + sum(len(k) + len(v) for k, v in self.headers)
+    
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """条目是否仍在有效期内"""
+        return (now if now is not None else time.time()) < self.expires_at
+    
+    def staleness(self, now: Optional[float] = None) -> float:
+        """已过期的秒数，仍在有效期内时为负数"""
+        return (now if now is not None else time.time()) - self.expires_at
+    
+    @classmethod
+    def from_response(cls, response: httpx.Response, ttl: float) -> "CacheEntry":
+        """
+        从已读取的HTTP响应创建缓存条目
+        
+        保存的是解码后的响应体，因此去掉描述传输编码的响应头，否则重建时会按 gzip 等再次解码。
+        """
+        return cls(
+            url=str(response.request.url),
+            status_code=response.status_code,
+            headers=tuple((k, v) for k, v in response.headers.items() if k.lower() not in _ENCODING_HEADERS),
+            content=response.content,
+            expires_at=time.time() + ttl
+        )
+    
+    def to_response(self) -> httpx.Response:
+        """重建HTTP响应对象"""
+        return httpx.Response(
+            self.status_code,
+            headers=list(self.headers),
+            content=self.content,
+            request=httpx.Request("GET", self.url)
+        )
+
+def make_cache_key(url: str, params: Optional[Mapping[str, Any]] = None,
+                   headers: Optional[Mapping[str, str]] = None) -> str:
+    """
+    根据URL、查询参数和请求头生成缓存键
+    
+    查询参数会合并到URL中并按名称排序，保证参数顺序不同的相同请求命中同一条目。
+    """
+    merged = httpx.URL(url)
+    if params:
+        merged = merged.copy_merge_params(params)
+    key = str(merged.copy_with(params=sorted(merged.params.multi_items())))
+    if headers:
+        key += "|" + "&".join(f"{k.lower()}={v}" for k, v in sorted(headers.items()))
+    return key
+
+class CacheBackend:
+    """缓存后端接口"""
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """读取缓存条目，不存在或已过期时返回None"""
+        raise NotImplementedError
+    
+    def get_stale(self, key: str) -> Optional[CacheEntry]:
+        """读取缓存条目，忽略有效期；用于上游不可用时的降级"""
+        return None
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """写入缓存条目"""
+        raise NotImplementedError
+    
+    def delete(self, key: str) -> None:
+        """删除缓存条目"""
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        raise NotImplementedError
+    
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        return {}
+    
+    def hot_entries(self, limit: int) -> List[Tuple[str, CacheEntry]]:
+        """最常被读取的条目（键, 条目），用于启动时预热内存缓存；不支持时返回空列表"""
+        return []
+    
+    async def get_async(self, key: str) -> Optional[CacheEntry]:
+        """在事件循环中读取缓存条目；访问磁盘或网络的实现不应阻塞事件循环"""
+        return self.get(key)
+    
+    async def get_stale_async(self, key: str) -> Optional[CacheEntry]:
+        """在事件循环中读取缓存条目，忽略有效期"""
+        return self.get_stale(key)
+    
+    async def set_async(self, key: str, entry: CacheEntry) -> None:
+        """在事件循环中写入缓存条目"""
+        self.set(key, entry)
+
+class LRUCache(CacheBackend):
+    """
+    内存LRU缓存
+    
+    同时限制条目数量和总字节数，超出任一上限时淘汰最久未使用的条目。
+    过期条目不会被立即删除，可通过 get_stale 读取。
+    """
+    
+    def __init__(self, max_entries: int = 512, max_bytes: int = 16 * 1024 * 1024,
+                 max_entry_bytes: int = 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if not entry.is_fresh():
+                # 过期条目保留到被淘汰或覆盖为止，供降级时读取
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def get_stale(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            return self._entries.get(key)
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        size = entry.size
+        if size > self.max_entry_bytes or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            self._evict()
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+    
+    def resize(self, max_entries: int, max_bytes: int):
+        """调整容量上限，超出部分立即淘汰"""
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _evict(self) -> None:
+        """淘汰最久未使用的条目直到满足容量上限（调用方需持有锁）"""
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def _remove(self, key: str) -> None:
+        """移除条目（调用方需持有锁）"""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+class TieredCache(LRUCache):
+    """
+    多级缓存
+    
+    进程内LRU缓存未命中时依次读取后面各级缓存（如多个进程共享的缓存、磁盘缓存），
+    命中的条目回填到内存和更靠前的各级；写入和删除同时作用于所有级别。
+    后面各级不可用时应返回未命中而不是抛出异常。异步接口在线程池中访问后面各级，
+    内存命中时不切换线程。
+    
+    Args:
+        *tiers: 内存之后的各级缓存后端，按读取顺序排列
+        其余参数同 LRUCache
+    """
+    
+    def __init__(self, *tiers: CacheBackend, max_entries: int = 512, max_bytes: int = 16 * 1024 * 1024,
+                 max_entry_bytes: int = 1024 * 1024):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes, max_entry_bytes=max_entry_bytes)
+        self.tiers: Tuple[CacheBackend, ...] = tiers
+        self.backing_hits = 0
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = super().get(key)
+        if entry is not None:
+            return entry
+        return self._get_backing(key)
+    
+    async def get_async(self, key: str) -> Optional[CacheEntry]:
+        entry = super().get(key)
+        if entry is not None or not self.tiers:
+            return entry
+        return await asyncio.to_thread(self._get_backing, key)
+    
+    def _get_backing(self, key: str) -> Optional[CacheEntry]:
+        """依次读取后面各级，命中时回填"""
+        for level, tier in enumerate(self.tiers):
+            entry = tier.get(key)
+            if entry is None or not entry.is_fresh():
+                continue
+            for upper in self.tiers[:level]:
+                upper.set(key, entry)
+            super().set(key, entry)
+            with self._lock:
+                self.backing_hits += 1
+            return entry
+        return None
+    
+    def get_stale(self, key: str) -> Optional[CacheEntry]:
+        entry = super().get_stale(key)
+        return entry if entry is not None else self._get_stale_backing(key)
+    
+    async def get_stale_async(self, key: str) -> Optional[CacheEntry]:
+        entry = super().get_stale(key)
+        if entry is not None or not self.tiers:
+            return entry
+        return await asyncio.to_thread(self._get_stale_backing, key)
+    
+    def _get_stale_backing(self, key: str) -> Optional[CacheEntry]:
+        """依次读取后面各级，忽略有效期"""
+        for tier in self.tiers:
+            entry = tier.get_stale(key)
+            if entry is not None:
+                return entry
+        return None
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        super().set(key, entry)
+        self._set_backing(key, entry)
+    
+    async def set_async(self, key: str, entry: CacheEntry) -> None:
+        super().set(key, entry)
+        if self.tiers:
+            await asyncio.to_thread(self._set_backing, key, entry)
+    
+    def _set_backing(self, key: str, entry: CacheEntry):
+        """写入后面各级"""
+        if entry.size <= self.max_entry_bytes:
+            for tier in self.tiers:
+                tier.set(key, entry)
+    
+    def delete(self, key: str) -> None:
+        super().delete(key)
+        for tier in self.tiers:
+            tier.delete(key)
+    
+    def clear(self) -> None:
+        super().clear()
+        for tier in self.tiers:
+            tier.clear()
+    
+    def warm(self, limit: int) -> int:
+        """
+        把后面各级中最常用的条目预先载入内存（启动时调用）
+        
+        Returns:
+            载入的条目数
+        """
+        loaded = 0
+        for tier in self.tiers:
+            for key, entry in tier.hot_entries(limit - loaded):
+                if key not in self._entries:
+                    super().set(key, entry)
+                    loaded += 1
+            if loaded >= limit:
+                break
+        return loaded
+    
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["backing_hits"] = self.backing_hits
+        stats["tiers"] = [tier.stats() for tier in self.tiers]
+        return stats
+
+class NegativeCache:
+    """
+    “不存在”结果的短期缓存
+    
+    记录上游明确表示不存在的查询（无效的币种、无法解析的域名），有效期内相同的查询直接返回，
+    不再访问上游。与响应缓存和端点的失败统计分开维护，条目数超过上限时淘汰最久未使用的条目。
+    """
+    
+    def __init__(self, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取未过期的结果，没有时返回 None"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[1] <= self._clock():
+                if item is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+    
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """记录结果，ttl 不大于 0 时不记录"""
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""
+上游流量录制与回放模块
+
+录制模式把经过的上游请求和响应追加写入紧凑的二进制录像文件（cassette），
+回放模式按录像返回响应，可以保持原始耗时或以最快速度返回，用于离线复现线上流量。
+
+录像文件格式（小端）：
+    文件头 b"FAMCAS1\\n"
+    若干条记录：请求键摘要(16字节) | 元数据长度(u32) | 响应体长度(u32) |
+                开始时间(f64，相对录制开始的秒数) | 耗时(f64) | 元数据JSON | 原始响应体
+索引文件（<录像文件>.idx）：
+    文件头 b"FAMIDX1\\n" | 覆盖的录像文件长度(u64) | 若干条 (请求键摘要, 记录偏移(u64))
+
+回放时录像文件通过 mmap 映射，只把索引载入内存，按请求键 O(1) 定位记录，
+响应体在命中时才从映射中读取。索引缺失或与录像文件不一致时扫描记录头重建。
+请求键只保存摘要，元数据中也只记录主机和路径，查询参数中的密钥不会写入录像。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import httpx
+
+from .cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MAGIC = b"FAMCAS1\n"
+INDEX_MAGIC = b"FAMIDX1\n"
+_RECORD = struct.Struct("<16sIIdd")
+_INDEX_HEADER = struct.Struct("<Q")
+_INDEX_ENTRY = struct.Struct("<16sQ")
+
+# 回放时保持原始耗时 / 以最快速度返回
+TIMING_ORIGINAL = "original"
+TIMING_FAST = "fast"
+
+# 传输层已处理分块编码，录制的原始响应体不再分块
+_SKIPPED_HEADERS = frozenset({"transfer-encoding"})
+
+class CassetteMiss(httpx.RequestError):
+    """回放时录像中没有对应请求（不是网络错误，不会重试）"""
+
+def request_digest(method: str, url: str) -> bytes:
+    """请求键摘要：请求方法加规范化后的URL（查询参数排序）"""
+    return hashlib.blake2b(f"{method} {make_cache_key(url)}".encode("utf-8"), digest_size=16).digest()
+
+@dataclass
+class CassetteRecord:
+    """一条录制的上游交互"""
+    host: str
+    path: str
+    started: float
+    duration: float
+    status_code: int = 0
+    headers: Tuple[Tuple[str, str], ...] = ()
+    content: bytes = b""
+    error: str = ""                 # 录制时的传输层异常类型名，为空表示收到了响应
+    
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        """重建响应；录制的是传输层异常时抛出同类型异常"""
+        if self.error:
+            error_type = getattr(httpx, self.error, None)
+            if not (isinstance(error_type, type) and issubclass(error_type, httpx.TransportError)):
+                error_type = httpx.TransportError
+            raise error_type(f"录制的上游错误: {self.error}", request=request)
+        return httpx.Response(self.status_code, headers=list(self.headers), content=self.content, request=request)
+
+class CassetteWriter:
+    """
+    录像写入器
+    
+    记录逐条追加并立即刷新，进程异常退出时已写入的记录仍可回放（索引在回放时重建）。
+    
+    Args:
+        path: 录像文件路径，已存在时覆盖
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.origin = time.perf_counter()
+        self._file: Optional[BinaryIO] = open(path, "wb")
+        self._file.write(CASSETTE_MAGIC)
+        self._file.flush()
+        self._offset = len(CASSETTE_MAGIC)
+        self._index: List[Tuple[bytes, int]] = []
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._index)
+    
+    def write(self, method: str, url: str, record: CassetteRecord):
+        """追加一条记录"""
+        meta = {"method": method, "host": record.host, "path": record.path}
+        if record.error:
+            meta["error"] = record.error
+        else:
+            meta["status"] = record.status_code
+            meta["headers"] = [list(item) for item in record.headers]
+        meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = request_digest(method, url)
+        data = _RECORD.pack(digest, len(meta_bytes), len(record.content), record.started, record.duration)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(data + meta_bytes + record.content)
+            self._file.flush()
+            self._index.append((digest, self._offset))
+            self._offset += len(data) + len(meta_bytes) + len(record.content)
+    
+    def close(self):
+        """关闭录像并写入索引"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            entries = b"".join(_INDEX_ENTRY.pack(digest, offset) for digest, offset in self._index)
+            temp_path = self.path + ".idx.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(INDEX_MAGIC + _INDEX_HEADER.pack(self._offset) + entries)
+            os.replace(temp_path, self.path + ".idx")
+
+class CassetteReader:
+    """
+    内存映射的录像读取器
+    
+    同一请求录制了多次时按录制顺序依次返回，用完后从头循环。
+    
+    Args:
+        path: 录像文件路径
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(CASSETTE_MAGIC)) != CASSETTE_MAGIC:
+                raise ValueError(f"不是有效的录像文件: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index: Dict[bytes, List[int]] = {}
+        self._cursors: Dict[bytes, int] = {}
+        self._lock = threading.Lock()
+        self._count = 0
+        if not self._load_index():
+            logger.info("录像索引缺失或已过期，扫描重建: %s", path)
+            self._scan()
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def _add(self, digest: bytes, offset: int):
+        self._index.setdefault(digest, []).append(offset)
+        self._count += 1
+    
+    def _load_index(self) -> bool:
+        """从索引文件加载，索引与录像文件长度不一致时返回 False"""
+        try:
+            with open(self.path + ".idx", "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        header_size = len(INDEX_MAGIC) + _INDEX_HEADER.size
+        if not data.startswith(INDEX_MAGIC) or (len(data) - header_size) % _INDEX_ENTRY.size:
+            return False
+        (covered,) = _INDEX_HEADER.unpack_from(data, len(INDEX_MAGIC))
+        if covered != len(self._mmap):
+            return False
+        for digest, offset in _INDEX_ENTRY.iter_unpack(data[header_size:]):
+            self._add(digest, offset)
+        return True
+    
+    def _scan(self):
+        """扫描记录头建立索引，末尾不完整的记录（录制中断）被忽略"""
+        offset = len(CASSETTE_MAGIC)
+        size = len(self._mmap)
+        while offset + _RECORD.size <= size:
+            digest, meta_len, body_len, _, _ = _RECORD.unpack_from(self._mmap, offset)
+            end = offset + _RECORD.size + meta_len + body_len
+            if end > size:
+                break
+            self._add(digest, offset)
+            offset = end
+    
+    def _read(self, offset: int) -> CassetteRecord:
+        _, meta_len, body_len, started, duration = _RECORD.unpack_from(self._mmap, offset)
+        meta_start = offset + _RECORD.size
+        meta = json.loads(self._mmap[meta_start:meta_start + meta_len])
+        body_start = meta_start + meta_len
+        return CassetteRecord(
+            host=meta["host"],
+            path=meta["path"],
+            started=started,
+            duration=duration,
+            status_code=meta.get("status", 0),
+            headers=tuple(tuple(item) for item in meta.get("headers", ())),
+            content=self._mmap[body_start:body_start + body_len],
+            error=meta.get("error", "")
+        )
+    
+    def lookup(self, method: str, url: str) -> Optional[CassetteRecord]:
+        """查找请求对应的下一条记录，没有录制时返回 None"""
+        digest = request_digest(method, url)
+        offsets = self._index.get(digest)
+        if not offsets:
+            return None
+        with self._lock:
+            position = self._cursors.get(digest, 0)
+            self._cursors[digest] = (position + 1) % len(offsets)
+        return self._read(offsets[position])
+    
+    def records(self) -> List[CassetteRecord]:
+        """按开始时间排列的全部记录"""
+        offsets = sorted(offset for group in self._index.values() for offset in group)
+        return sorted((self._read(offset) for offset in offsets), key=lambda r: r.started)
+    
+    def rewind(self):
+        """重置各请求的回放位置"""
+        with self._lock:
+            self._cursors.clear()
+    
+    def close(self):
+        self._mmap.close()
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    录制传输层：转发请求到实际的传输层，并把响应（或传输层异常）写入录像
+    
+    Args:
+        writer: 录像写入器
+        inner: 实际发送请求的传输层
+    """
+    
+    def __init__(self, writer: CassetteWriter, inner: httpx.AsyncBaseTransport):
+        self.writer = writer
+        self.inner = inner
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        record = CassetteRecord(host=request.url.host, path=request.url.path,
+                                started=start - self.writer.origin, duration=0.0)
+        try:
+            response = await self.inner.handle_async_request(request)
+            try:
+                # 保存原始（未解压）的响应体，回放时由客户端按 Content-Encoding 解码
+                content = b"".join([chunk async for chunk in response.stream])
+            finally:
+                await response.aclose()
+        except httpx.TransportError as e:
+            record.duration = time.perf_counter() - start
+            record.error = type(e).__name__
+            self.writer.write(request.method, str(request.url), record)
+            raise
+        
+        record.duration = time.perf_counter() - start
+        record.status_code = response.status_code
+        record.headers = tuple((k, v) for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS)
+        record.content = content
+        self.writer.write(request.method, str(request.url), record)
+        return httpx.Response(response.status_code, headers=list(record.headers), content=content,
+                              request=request, extensions=response.extensions)
+    
+    async def aclose(self):
+        await self.inner.aclose()
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    回放传输层：按录像返回响应，不访问网络
+    
+    Args:
+        reader: 录像读取器
+        timing: TIMING_ORIGINAL 按录制时的耗时延迟返回，TIMING_FAST 立即返回
+    """
+    
+    def __init__(self, reader: CassetteReader, timing: str = TIMING_ORIGINAL):
+        if timing not in (TIMING_ORIGINAL, TIMING_FAST):
+            raise ValueError(f"未知的回放方式: {timing}")
+        self.reader = reader
+        self.timing = timing
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        record = self.reader.lookup(request.method, str(request.url))
+        if record is None:
+            raise CassetteMiss(f"录像中没有该请求: {request.method} {request.url.host}{request.url.path}",
+                               request=request)
+        if self.timing == TIMING_ORIGINAL and record.duration > 0:
+            await asyncio.sleep(record.duration)
+        return record.to_response(request)
\ No newline at end of file
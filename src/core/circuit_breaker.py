@@ -0,0 +1,209 @@
+"""
+端点熔断器模块
+"""
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+class CircuitState(Enum):
+    """熔断器状态"""
+    CLOSED = "closed"        # 正常放行
+    OPEN = "open"            # 熔断中，拒绝请求
+    HALF_OPEN = "half_open"  # 冷却结束，放行单个探测请求
+
+class CircuitBreaker:
+    """
+    单个端点的熔断器
+    
+    在滑动时间窗口内统计请求结果，失败率达到阈值后熔断；冷却结束后进入半开状态，
+    只放行一个探测请求：探测成功则恢复，失败则重新熔断并延长冷却时间。
+    """
+    
+    def __init__(self,
+                 failure_rate_threshold: float = 0.5,
+                 min_requests: int = 3,
+                 window_seconds: float = 60.0,
+                 cooldown_seconds: float = 30.0,
+                 max_cooldown_seconds: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.base_cooldown = cooldown_seconds
+        self.max_cooldown = max_cooldown_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._results: Deque[Tuple[float, bool]] = deque()
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._cooldown = cooldown_seconds
+        self._probe_in_flight = False
+        self.last_error = ""
+    
+    @property
+    def state(self) -> CircuitState:
+        """当前状态（冷却结束的熔断器视为半开）"""
+        with self._lock:
+            if self._state is CircuitState.OPEN and self._cooldown_elapsed():
+                return CircuitState.HALF_OPEN
+            return self._state
+    
+    def allow_request(self) -> bool:
+        """是否放行请求；半开状态下放行的请求即为探测请求"""
+        with self._lock:
+            if self._state is CircuitState.CLOSED:
+                return True
+            if self._state is CircuitState.OPEN:
+                if not self._cooldown_elapsed():
+                    return False
+                self._state = CircuitState.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self):
+        """记录一次成功请求"""
+        with self._lock:
+            if self._state is not CircuitState.CLOSED:
+                self._close()
+                return
+            self._append(True)
+    
+    def record_failure(self, error: str = ""):
+        """记录一次失败请求"""
+        with self._lock:
+            self.last_error = error
+            if self._state is CircuitState.HALF_OPEN:
+                # 探测失败，重新熔断并延长冷却时间
+                self._open(min(self._cooldown * 2, self.max_cooldown))
+                return
+            if self._state is CircuitState.OPEN:
+                return
+            self._append(False)
+            total = len(self._results)
+            failures = sum(1 for _, ok in self._results if not ok)
+            if total >= self.min_requests and failures / total >= self.failure_rate_threshold:
+                self._open(self.base_cooldown)
+    
+    def release(self):
+        """请求被取消或未实际发出时释放探测名额"""
+        with self._lock:
+            if self._state is CircuitState.HALF_OPEN:
+                self._probe_in_flight = False
+    
+    def half_open(self):
+        """外部探测表明端点可能已恢复时提前结束冷却，放行一个探测请求；只有真实请求成功才恢复"""
+        with self._lock:
+            if self._state is CircuitState.OPEN:
+                self._state = CircuitState.HALF_OPEN
+                self._probe_in_flight = False
+    
+    def force_open(self, cooldown: Optional[float] = None):
+        """立即熔断，冷却时间默认为基础值"""
+        with self._lock:
+            self._open(self.base_cooldown if cooldown is None else cooldown)
+    
+    def configure(self, failure_rate_threshold: Optional[float] = None,
+                  min_requests: Optional[int] = None,
+                  window_seconds: Optional[float] = None,
+                  cooldown_seconds: Optional[float] = None,
+                  max_cooldown_seconds: Optional[float] = None):
+        """更新阈值参数，保留当前状态和统计"""
+        with self._lock:
+            if failure_rate_threshold is not None:
+                self.failure_rate_threshold = failure_rate_threshold
+            if min_requests is not None:
+                self.min_requests = min_requests
+            if window_seconds is not None:
+                self.window_seconds = window_seconds
+            if cooldown_seconds is not None:
+                self.base_cooldown = cooldown_seconds
+            if max_cooldown_seconds is not None:
+                self.max_cooldown = max_cooldown_seconds
+    
+    def reset(self):
+        """恢复为关闭状态并清空统计"""
+        with self._lock:
+            self._close()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """状态快照"""
+        with self._lock:
+            state = self._state
+            remaining = 0.0
+            if state is CircuitState.OPEN:
+                remaining = max(0.0, self._opened_at + self._cooldown - self._clock())
+                if remaining == 0.0:
+                    state = CircuitState.HALF_OPEN
+            total = len(self._results)
+            failures = sum(1 for _, ok in self._results if not ok)
+            return {
+                "state": state.value,
+                "failure_rate": failures / total if total else 0.0,
+                "requests": total,
+                "cooldown_remaining": remaining,
+                "last_error": self.last_error
+            }
+    
+    def _cooldown_elapsed(self) -> bool:
+        return self._clock() - self._opened_at >= self._cooldown
+    
+    def _append(self, ok: bool):
+        now = self._clock()
+        self._results.append((now, ok))
+        while self._results and now - self._results[0][0] > self.window_seconds:
+            self._results.popleft()
+    
+    def _open(self, cooldown: float):
+        self._state = CircuitState.OPEN
+        self._opened_at = self._clock()
+        self._cooldown = cooldown
+        self._probe_in_flight = False
+        self._results.clear()
+    
+    def _close(self):
+        self._state = CircuitState.CLOSED
+        self._cooldown = self.base_cooldown
+        self._probe_in_flight = False
+        self._results.clear()
+
+class CircuitBreakerRegistry:
+    """按端点维护熔断器"""
+    
+    def __init__(self, **breaker_kwargs):
+        self._breaker_kwargs = breaker_kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, endpoint: str) -> CircuitBreaker:
+        """获取端点的熔断器，不存在时创建"""
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(endpoint, CircuitBreaker(**self._breaker_kwargs))
+        return breaker
+    
+    def configure(self, **breaker_kwargs):
+        """更新新建熔断器的参数，并应用到已有的熔断器"""
+        with self._lock:
+            self._breaker_kwargs = {**self._breaker_kwargs, **breaker_kwargs}
+            breakers = list(self._breakers.values())
+        for breaker in breakers:
+            breaker.configure(**breaker_kwargs)
+    
+    def find(self, endpoint: str) -> Optional[CircuitBreaker]:
+        """查找端点的熔断器，不创建新实例"""
+        return self._breakers.get(endpoint)
+    
+    def items(self) -> Iterator[Tuple[str, CircuitBreaker]]:
+        """遍历所有端点及其熔断器"""
+        with self._lock:
+            return iter(list(self._breakers.items()))
+    
+    def open_endpoints(self) -> Iterator[str]:
+        """当前未关闭（熔断或半开）的端点"""
+        return (ep for ep, breaker in self.items() if breaker.state is not CircuitState.CLOSED)
\ No newline at end of file
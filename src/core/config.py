@@ -3,28 +3,96 @@
 """
 import os
 import logging
-from typing import Dict, Any, List
-from dataclasses import dataclass, field
+import signal
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, Callable, List, Mapping, Optional
 from datetime import datetime
 
-@dataclass
-class ServiceConfig:
-    """API服务配置"""
-    name: str
-    primary_endpoint: str
-    fallback_endpoints: List[str] = field(default_factory=list)
-    timeout: int = 5
-    retry_count: int = 2
-    api_key: str = ""
-    enabled: bool = True
+from .log_config import setup_logging
+from .service_registry import RateLimit, ServiceConfig, ServiceRegistry, load_document
+
+logger = logging.getLogger(__name__)
+
+# 当前正在执行的服务配置，由 FallbackManager 设置，供HTTP层读取服务级参数
+current_service_config: ContextVar[Optional[ServiceConfig]] = ContextVar(
+    "current_service_config", default=None
+)
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """某一时刻的完整配置，整体替换，保证读取方看到一致的配置"""
+    settings: Mapping[str, Any]
+    services: ServiceRegistry
+    version: int
+
+def _coerce(default: Any, value: Any) -> Any:
+    """把配置文件中的值转换为与默认值相同的类型"""
+    if isinstance(default, bool):
+        if isinstance(value, str):
+            return value.lower() == "true"
+        return bool(value)
+    if isinstance(default, (int, float)) and not isinstance(value, bool):
+        return type(default)(value)
+    if isinstance(default, str):
+        return str(value)
+    raise ValueError(f"无法转换配置值: {value!r}")
+
+# 配置变更监听器：listener(旧配置, 新配置)
+ReloadListener = Callable[[ConfigSnapshot, ConfigSnapshot], None]
 
 class ConfigManager:
-    """配置管理器"""
+    """
+    配置管理器
+    
+    配置由环境变量和可选的配置文件（CONFIG_FILE）组成，支持在运行时重新加载：
+    新配置构建完成后整体替换，已开始的请求继续使用旧的配置对象。
+    """
     
-    def __init__(self):
-        self._config = self._load_config()
+    def __init__(self, config_file: Optional[str] = None):
+        """
+        Args:
+            config_file: 配置文件路径，默认读取环境变量 CONFIG_FILE
+        """
+        self._config_file = config_file
+        self._reload_lock = threading.Lock()
+        self._listeners: List[ReloadListener] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self._snapshot = self._build_snapshot(version=1)
+        self._file_mtime = self._config_file_mtime()
         self._setup_logging()
     
+    @property
+    def _config(self) -> Mapping[str, Any]:
+        return self._snapshot.settings
+    
+    def _build_snapshot(self, version: int) -> ConfigSnapshot:
+        """读取环境变量和配置文件，构建新的配置快照"""
+        settings = self._load_config()
+        if self._config_file is not None:
+            settings["config_file"] = self._config_file
+        document = load_document(settings["config_file"]) if settings["config_file"] else {}
+        
+        overrides = document.get("settings", {})
+        unknown = set(overrides) - set(settings)
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(sorted(unknown))}")
+        for key, value in overrides.items():
+            settings[key] = _coerce(settings[key], value)
+        
+        services = ServiceRegistry.load(self._builtin_services(settings), document.get("services"))
+        return ConfigSnapshot(settings=MappingProxyType(settings), services=services, version=version)
+    
+    def _config_file_mtime(self) -> Optional[float]:
+        path = self._config.get("config_file")
+        try:
+            return os.stat(path).st_mtime if path else None
+        except OSError:
+            return None
+    
     def _load_config(self) -> Dict[str, Any]:
         """加载配置"""
         return {
@@ -37,52 +105,219 @@ class ConfigManager:
             "enable_logging": os.getenv("ENABLE_LOGGING", "true").lower() == "true",
             "log_level": os.getenv("LOG_LEVEL", "INFO").upper(),
             "log_file": os.getenv("LOG_FILE", "free-api-mcp.log"),
+            "log_max_bytes": int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            "log_backup_count": int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            "log_repeat_interval": float(os.getenv("LOG_REPEAT_INTERVAL", "60")),
+            "log_repeat_burst": int(os.getenv("LOG_REPEAT_BURST", "5")),
+            
+            # 调用链追踪配置
+            "trace_sample_rate": float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+            "trace_buffer_size": int(os.getenv("TRACE_BUFFER_SIZE", "100")),
+            "trace_file": os.getenv("TRACE_FILE", ""),
             
             # 性能配置
             "default_timeout": int(os.getenv("DEFAULT_TIMEOUT", "5")),
+            "tool_deadline": float(os.getenv("TOOL_DEADLINE", "15")),
+            "http_max_connections": int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+            "http_max_keepalive": int(os.getenv("HTTP_MAX_KEEPALIVE", "10")),
             "max_retries": int(os.getenv("MAX_RETRIES", "2")),
+            "retry_base_delay": float(os.getenv("RETRY_BASE_DELAY", "0.2")),
+            "retry_max_delay": float(os.getenv("RETRY_MAX_DELAY", "5")),
+            "retry_budget": int(os.getenv("RETRY_BUDGET", "3")),
+            "retry_budget_delay": float(os.getenv("RETRY_BUDGET_DELAY", "10")),
+            
+            # 缓存配置
+            "enable_cache": os.getenv("ENABLE_CACHE", "true").lower() == "true",
+            "cache_max_entries": int(os.getenv("CACHE_MAX_ENTRIES", "512")),
+            "cache_max_bytes": int(os.getenv("CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            
+            # 磁盘缓存配置（为空表示不使用）
+            "disk_cache_file": os.getenv("DISK_CACHE_FILE", ""),
+            "disk_cache_max_bytes": int(os.getenv("DISK_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            "disk_cache_max_stale": float(os.getenv("DISK_CACHE_MAX_STALE", "604800")),
+            "disk_cache_warm_entries": int(os.getenv("DISK_CACHE_WARM_ENTRIES", "256")),
+            
+            # 负缓存配置（记住不存在的查询和无法解析的域名，不计入端点的失败统计）
+            "negative_cache_max_entries": int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "1024")),
+            "negative_dns_ttl": float(os.getenv("NEGATIVE_DNS_TTL", "60")),
+            
+            # 后台刷新配置（在缓存过期前主动刷新最近被请求过的汇率表、历史事件和新闻头条）
+            "refresh_enabled": os.getenv("REFRESH_ENABLED", "true").lower() == "true",
+            "refresh_idle_after": float(os.getenv("REFRESH_IDLE_AFTER", "3600")),
+            "refresh_jitter": float(os.getenv("REFRESH_JITTER", "0.1")),
+            "refresh_rate_reserve": float(os.getenv("REFRESH_RATE_RESERVE", "0.5")),
+            "refresh_max_concurrency": int(os.getenv("REFRESH_MAX_CONCURRENCY", "2")),
+            "refresh_retry_delay": float(os.getenv("REFRESH_RETRY_DELAY", "30")),
+            
+            # 共享状态进程配置（为空表示不使用，各进程独立维护缓存、限流和熔断状态）
+            "sidecar_socket": os.getenv("SIDECAR_SOCKET", ""),
+            "sidecar_timeout": float(os.getenv("SIDECAR_TIMEOUT", "0.05")),
+            "sidecar_retry_interval": float(os.getenv("SIDECAR_RETRY_INTERVAL", "5")),
+            "sidecar_health_interval": float(os.getenv("SIDECAR_HEALTH_INTERVAL", "1")),
+            "sidecar_max_entries": int(os.getenv("SIDECAR_MAX_ENTRIES", "4096")),
+            "sidecar_max_bytes": int(os.getenv("SIDECAR_MAX_BYTES", str(64 * 1024 * 1024))),
+            
+            # 上游流量录制与回放配置
+            "cassette_mode": os.getenv("CASSETTE_MODE", "").lower(),
+            "cassette_file": os.getenv("CASSETTE_FILE", "free-api-mcp.cassette"),
+            "cassette_timing": os.getenv("CASSETTE_TIMING", "original").lower(),
+            
+            # 故障注入配置（用于测试备用端点切换，生产环境不要开启）
+            "enable_fault_injection": os.getenv("ENABLE_FAULT_INJECTION", "false").lower() == "true",
+            "fault_rules": os.getenv("FAULT_RULES", ""),
+            
+            # 上游限流配置
+            "enable_rate_limit": os.getenv("ENABLE_RATE_LIMIT", "true").lower() == "true",
+            "rate_limit_max_wait": float(os.getenv("RATE_LIMIT_MAX_WAIT", "1")),
+            
+            # 端点排序配置
+            "endpoint_ewma_alpha": float(os.getenv("ENDPOINT_EWMA_ALPHA", "0.2")),
+            "endpoint_exploration_rate": float(os.getenv("ENDPOINT_EXPLORATION_RATE", "0.05")),
+            
+            # 熔断器配置
+            "circuit_failure_rate": float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+            "circuit_min_requests": int(os.getenv("CIRCUIT_MIN_REQUESTS", "3")),
+            "circuit_window": float(os.getenv("CIRCUIT_WINDOW", "60")),
+            "circuit_cooldown": float(os.getenv("CIRCUIT_COOLDOWN", "30")),
+            "circuit_max_cooldown": float(os.getenv("CIRCUIT_MAX_COOLDOWN", "300")),
+            
+            # MCP传输配置
+            "mcp_transport": os.getenv("MCP_TRANSPORT", "stdio").lower(),
+            "mcp_host": os.getenv("MCP_HOST", "127.0.0.1"),
+            "mcp_port": int(os.getenv("MCP_PORT", "8000")),
+            "mcp_workers": int(os.getenv("MCP_WORKERS", "1")),
+            "mcp_stateless_http": os.getenv("MCP_STATELESS_HTTP", "false").lower() == "true",
+            "mcp_json_response": os.getenv("MCP_JSON_RESPONSE", "true").lower() == "true",
+            "mcp_allowed_hosts": os.getenv("MCP_ALLOWED_HOSTS", ""),
             
             # 服务配置
             "enable_health_check": os.getenv("ENABLE_HEALTH_CHECK", "true").lower() == "true",
+            "config_file": os.getenv("CONFIG_FILE", os.getenv("SERVICES_FILE", "")),
+            "config_watch_interval": float(os.getenv("CONFIG_WATCH_INTERVAL", "2")),
         }
     
     def _setup_logging(self):
-        """设置日志配置"""
+        """设置日志配置：基于队列的异步写入，日志文件按大小轮转，重复日志限流"""
         if not self._config["enable_logging"]:
             return
-            
-        log_level = getattr(logging, self._config["log_level"], logging.INFO)
-        log_file = self._config["log_file"]
         
-        # 创建日志格式
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        setup_logging(
+            level=getattr(logging, self._config["log_level"], logging.INFO),
+            log_file=self._config["log_file"],
+            max_bytes=self._config["log_max_bytes"],
+            backup_count=self._config["log_backup_count"],
+            repeat_interval=self._config["log_repeat_interval"],
+            repeat_burst=self._config["log_repeat_burst"]
         )
-        
-        # 配置根日志记录器
-        logger = logging.getLogger()
-        logger.setLevel(log_level)
-        
-        # 清除现有处理器
-        for handler in logger.handlers[:]:
-            logger.removeHandler(handler)
-        
-        # 文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        
-        # 控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
     
     def get(self, key: str, default: Any = None) -> Any:
         """获取配置值"""
-        return self._config.get(key, default)
+        return self._snapshot.settings.get(key, default)
+    
+    @property
+    def services(self) -> ServiceRegistry:
+        """服务注册表"""
+        return self._snapshot.services
+    
+    @property
+    def version(self) -> int:
+        """配置版本，每次成功重新加载后加1"""
+        return self._snapshot.version
+    
+    def snapshot(self) -> ConfigSnapshot:
+        """当前配置快照"""
+        return self._snapshot
     
     def get_service_config(self, service_name: str) -> ServiceConfig:
         """获取服务配置"""
+        return self._snapshot.services.get(service_name)
+    
+    def add_reload_listener(self, listener: ReloadListener):
+        """注册配置变更监听器，重新加载成功后以 (旧配置, 新配置) 调用"""
+        self._listeners.append(listener)
+    
+    def reload(self) -> bool:
+        """
+        重新加载配置并整体替换
+        
+        新配置无效时保留当前配置。
+        
+        Returns:
+            是否加载成功
+        """
+        with self._reload_lock:
+            old = self._snapshot
+            self._file_mtime = self._config_file_mtime()
+            try:
+                new = self._build_snapshot(version=old.version + 1)
+            except Exception as e:
+                logger.error("重新加载配置失败，继续使用当前配置: %s", e)
+                return False
+            self._snapshot = new
+        
+        changed = sorted(k for k in new.settings if new.settings[k] != old.settings.get(k))
+        logger.info("配置已重新加载（版本 %s），变更项: %s", new.version, ', '.join(changed) or '无')
+        if new.settings["log_level"] != old.settings["log_level"]:
+            logging.getLogger().setLevel(getattr(logging, new.settings["log_level"], logging.INFO))
+        for listener in list(self._listeners):
+            try:
+                listener(old, new)
+            except Exception as e:
+                logger.error("配置变更监听器执行失败: %s", e)
+        return True
+    
+    def watch(self, interval: Optional[float] = None) -> bool:
+        """
+        在后台线程中监视配置文件，文件修改后自动重新加载
+        
+        Args:
+            interval: 检查间隔（秒），默认使用 CONFIG_WATCH_INTERVAL
+        
+        Returns:
+            是否启动了监视线程（未配置 CONFIG_FILE 或间隔为0时不启动）
+        """
+        interval = self.get("config_watch_interval") if interval is None else interval
+        if not self.get("config_file") or interval <= 0 or self._watcher is not None:
+            return False
+        
+        def run():
+            while not self._stop_watching.wait(interval):
+                mtime = self._config_file_mtime()
+                if mtime is not None and mtime != self._file_mtime:
+                    logger.info("检测到配置文件变更: %s", self.get('config_file'))
+                    self.reload()
+        
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=run, name="free-api-mcp-config-watcher", daemon=True)
+        self._watcher.start()
+        return True
+    
+    def stop_watching(self):
+        """停止监视配置文件"""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=1.0)
+            self._watcher = None
+    
+    def install_sighup_handler(self) -> bool:
+        """
+        收到 SIGHUP 时重新加载配置（需在主线程调用）
+        
+        Returns:
+            当前平台是否支持 SIGHUP
+        """
+        if not hasattr(signal, "SIGHUP"):
+            return False
+        
+        def handler(signum, frame):
+            # 信号处理函数中只启动线程，避免在任意字节码位置执行加载逻辑
+            threading.Thread(target=self.reload, name="free-api-mcp-config-reload", daemon=True).start()
+        
+        signal.signal(signal.SIGHUP, handler)
+        return True
+    
+    def _builtin_services(self, settings: Mapping[str, Any]) -> Dict[str, ServiceConfig]:
+        """内置服务配置"""
         configs = {
             "ip_location": ServiceConfig(
                 name="ip_location",
@@ -90,7 +325,11 @@ class ConfigManager:
                 fallback_endpoints=[
                     "https://freeipapi.com/api/json/{}",
                     "http://ip-api.com/json/{}?fields=country,regionName,city,isp"
-                ]
+                ],
+                cache_ttl=3600,
+                stale_if_error=7 * 86400,
+                hedge=True,
+                rate_limits={"ip-api.com": RateLimit(45, 60)}
             ),
             "cryptocurrency": ServiceConfig(
                 name="cryptocurrency", 
@@ -98,21 +337,29 @@ class ConfigManager:
                 fallback_endpoints=[
                     "https://api.coincap.io/v2/assets",
                     "https://min-api.cryptocompare.com/data/price"
-                ]
+                ],
+                cache_ttl=30,
+                stale_while_revalidate=30,
+                stale_if_error=3600,
+                negative_cache_ttl=300,
+                hedge=True,
+                rate_limits={"api.coingecko.com": RateLimit(30, 60)}
             ),
             "quotes": ServiceConfig(
                 name="quotes",
                 primary_endpoint="https://api.quotable.io/random",
                 fallback_endpoints=[
                     "https://zenquotes.io/api/random"
-                ]
+                ],
+                hedge=True
             ),
             "jokes": ServiceConfig(
                 name="jokes", 
                 primary_endpoint="https://v2.jokeapi.dev/joke/Any?safe-mode",
                 fallback_endpoints=[
                     "https://official-joke-api.appspot.com/random_joke"
-                ]
+                ],
+                hedge=True
             ),
             "exchange_rate": ServiceConfig(
                 name="exchange_rate",
@@ -120,14 +367,19 @@ class ConfigManager:
                 fallback_endpoints=[
                     "https://api.fixer.io/latest?base={}",
                     "backup://local-rates"  # 本地备用汇率
-                ]
+                ],
+                cache_ttl=1800,
+                stale_while_revalidate=1800,
+                stale_if_error=7 * 86400
             ),
             "qr_code": ServiceConfig(
                 name="qr_code",
                 primary_endpoint="https://api.qrserver.com/v1/create-qr-code/",
                 fallback_endpoints=[
                     "https://api.goqr.me/qr/create"
-                ]
+                ],
+                cache_ttl=86400,
+                stale_if_error=30 * 86400
             ),
             "url_shortener": ServiceConfig(
                 name="url_shortener",
@@ -142,7 +394,12 @@ class ConfigManager:
                 fallback_endpoints=[
                     "https://newsdata.io/api/1/news"
                 ],
-                api_key=self.get("news_api_key")
+                api_key=settings["news_api_key"],
+                requires_key=True,
+                cache_ttl=300,
+                stale_while_revalidate=300,
+                stale_if_error=86400,
+                rate_limits={"newsapi.org": RateLimit(100, 86400)}
             ),
             "weather": ServiceConfig(
                 name="weather",
@@ -150,7 +407,11 @@ class ConfigManager:
                 fallback_endpoints=[
                     "https://api.weatherapi.com/v1/current.json"
                 ],
-                api_key=self.get("weather_api_key")
+                api_key=settings["weather_api_key"],
+                requires_key=True,
+                cache_ttl=600,
+                stale_while_revalidate=600,
+                stale_if_error=3 * 3600
             ),
             # 娱乐服务
             "cat_images": ServiceConfig(
@@ -184,21 +445,22 @@ class ConfigManager:
             "history_today": ServiceConfig(
                 name="history_today",
                 primary_endpoint="https://history.muffinlabs.com/date",
-                fallback_endpoints=[]
+                fallback_endpoints=[],
+                cache_ttl=3600,
+                stale_while_revalidate=3600,
+                stale_if_error=86400
             ),
             # 实用工具服务
             "color_info": ServiceConfig(
                 name="color_info",
                 primary_endpoint="https://www.thecolorapi.com/id",
-                fallback_endpoints=[]
+                fallback_endpoints=[],
+                cache_ttl=86400,
+                stale_if_error=30 * 86400
             )
         }
         
-        return configs.get(service_name, ServiceConfig(
-            name=service_name,
-            primary_endpoint="",
-            fallback_endpoints=[]
-        ))
+        return configs
 
 # 全局配置管理器实例
 config_manager = ConfigManager()
\ No newline at end of file
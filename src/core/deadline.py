@@ -0,0 +1,90 @@
+"""
+请求时间预算模块
+
+每次工具调用携带一个截止时间，经由 FallbackManager、重试和HTTP层逐级传递，
+每次尝试只使用剩余的时间预算，保证单次调用的最坏耗时有上限。
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from .config import config_manager
+from .error_handler import DeadlineExceededError
+
+T = TypeVar("T")
+
+class Deadline:
+    """截止时间（基于单调时钟）"""
+    
+    def __init__(self, timeout: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            timeout: 从现在起的时间预算（秒）
+            clock: 时钟函数，便于测试
+        """
+        self._clock = clock
+        self.expires_at = clock() + timeout
+    
+    def remaining(self) -> float:
+        """剩余时间（秒），已过期时为0"""
+        return max(0.0, self.expires_at - self._clock())
+    
+    @property
+    def expired(self) -> bool:
+        """是否已过期"""
+        return self._clock() >= self.expires_at
+    
+    def clamp(self, timeout: float) -> float:
+        """
+        把单次操作的超时时间限制在剩余预算内
+        
+        Raises:
+            DeadlineExceededError: 预算已用完
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceededError()
+        return min(timeout, remaining)
+
+# 当前调用的截止时间
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+def remaining_timeout(timeout: float) -> float:
+    """按当前截止时间限制超时时间，没有截止时间时原样返回"""
+    deadline = current_deadline.get()
+    return deadline.clamp(timeout) if deadline is not None else timeout
+
+@contextmanager
+def deadline_scope(timeout: Optional[float] = None) -> Iterator[Deadline]:
+    """
+    在作用域内设置截止时间
+    
+    已存在更早的截止时间时沿用外层的，嵌套调用不会延长整体预算。
+    
+    Args:
+        timeout: 时间预算（秒），默认使用 TOOL_DEADLINE 配置
+    """
+    if timeout is None:
+        timeout = config_manager.get("tool_deadline", 15.0)
+    outer = current_deadline.get()
+    deadline = Deadline(timeout)
+    if outer is not None and outer.expires_at <= deadline.expires_at:
+        yield outer
+        return
+    token = current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        current_deadline.reset(token)
+
+def with_deadline(timeout: Optional[float] = None) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """为异步工具函数的每次调用设置截止时间的装饰器"""
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with deadline_scope(timeout):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
\ No newline at end of file
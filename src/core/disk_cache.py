@@ -0,0 +1,271 @@
+"""
+持久化响应缓存模块
+
+作为进程内缓存之后的一级，把上游响应保存在 SQLite 数据库（WAL 模式）中，进程重启或重新部署后
+汇率表、历史上的今天、货币列表等数据仍可直接返回。多个进程可以共用同一个数据库文件。
+
+条目按有效期判断是否新鲜；过期超过 max_stale 秒的条目在整理时删除，在此之前仍可作为降级数据读取。
+数据库超过 max_bytes 时按最近访问时间淘汰，直到降到上限的 compact_ratio 以下。
+每个条目记录读取次数，启动时把读取最多的条目预先载入内存缓存；读取次数先在内存中累计，
+按批写回数据库，读取本身不产生写事务。条目数和总字节数随本进程的写入和删除增量维护，
+整理时按数据库重新统计（包括其他进程的写入），stats() 不查询数据库。
+
+数据库中保存完整的请求URL（可能包含查询参数中的API密钥），数据库文件及其 -wal/-shm 文件
+的权限都设为仅当前用户可读写。这里的接口都是阻塞的，事件循环中经 TieredCache 的异步接口在线程池中调用。
+"""
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import CacheBackend, CacheEntry
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    content BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at);
+"""
+
+class SQLiteCache(CacheBackend):
+    """
+    基于 SQLite 的持久化缓存
+    
+    Args:
+        path: 数据库文件路径
+        max_bytes: 条目总字节数上限
+        max_stale: 过期条目保留的秒数，供上游不可用时降级读取
+        compact_every: 每写入多少个条目整理一次
+        compact_ratio: 超出上限时淘汰到上限的该比例以下，避免每次写入都触发整理
+        flush_hits_every: 累计多少次读取后把读取次数和访问时间写回数据库
+    """
+    
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, max_stale: float = 86400.0,
+                 compact_every: int = 100, compact_ratio: float = 0.9, flush_hits_every: int = 64):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_stale = max_stale
+        self.compact_every = compact_every
+        self.compact_ratio = compact_ratio
+        self.flush_hits_every = flush_hits_every
+        self._lock = threading.Lock()
+        self._writes = 0
+        # 尚未写回的读取：键 -> (读取次数, 最近访问时间)
+        self._pending_hits: Dict[str, Tuple[int, float]] = {}
+        self._pending_reads = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._entries = 0
+        self._bytes = 0
+        created = not os.path.exists(path)
+        if created:
+            # 先以仅当前用户可读写的权限创建文件，SQLite 创建 -wal/-shm 文件时沿用数据库文件的权限
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        # 连接在线程池的各线程和同步调用的线程之间共用，由 self._lock 串行化
+        self._conn: Optional[sqlite3.Connection] = sqlite3.connect(path, timeout=1.0, check_same_thread=False,
+                                                                   isolation_level=None)
+        if created:
+            self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._restrict_permissions()
+        self.compact()
+    
+    def _restrict_permissions(self):
+        """把数据库文件及其 -wal/-shm 文件的权限设为仅当前用户可读写（兼容旧版本创建的文件）"""
+        for suffix in ("", "-wal", "-shm"):
+            with contextlib.suppress(OSError):
+                if os.stat(self.path + suffix).st_mode & 0o077:
+                    os.chmod(self.path + suffix, 0o600)
+    
+    def _execute(self, sql: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        """执行语句；数据库出错时记录日志并返回空结果，缓存失败不影响请求"""
+        with self._lock:
+            if self._conn is None:
+                return []
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                self.errors += 1
+                logger.warning("磁盘缓存操作失败: %s", e)
+                return []
+    
+    @staticmethod
+    def _entry(row: Tuple[Any, ...]) -> CacheEntry:
+        url, status, headers, content, expires_at = row
+        return CacheEntry(
+            url=url,
+            status_code=status,
+            headers=tuple(tuple(item) for item in json.loads(headers)),
+            content=content,
+            expires_at=expires_at
+        )
+    
+    def _read(self, key: str, fresh: bool) -> Optional[CacheEntry]:
+        now = time.time()
+        rows = self._execute("SELECT url, status, headers, content, expires_at FROM entries WHERE key = ?", (key,))
+        if not rows or (fresh and rows[0][4] <= now):
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._lock:
+            count, _ = self._pending_hits.get(key, (0, now))
+            self._pending_hits[key] = (count + 1, now)
+            self._pending_reads += 1
+            flush = self._pending_reads >= self.flush_hits_every
+        if flush:
+            self.flush_hits()
+        return self._entry(rows[0])
+    
+    def _adjust(self, entries: int, size: int):
+        """增量更新条目数和总字节数"""
+        with self._lock:
+            self._entries += entries
+            self._bytes += size
+    
+    def _recount(self) -> int:
+        """按数据库重新统计条目数和总字节数，返回总字节数"""
+        rows = self._execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries")
+        with self._lock:
+            if rows:
+                self._entries, self._bytes = rows[0]
+            return self._bytes
+    
+    def flush_hits(self):
+        """把累计的读取次数和访问时间在一个事务中写回数据库"""
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+            self._pending_reads = 0
+            if not pending or self._conn is None:
+                return
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "UPDATE entries SET hits = hits + ?, accessed = MAX(accessed, ?) WHERE key = ?",
+                    [(count, accessed, key) for key, (count, accessed) in pending.items()]
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                self.errors += 1
+                logger.warning("磁盘缓存读取次数写回失败: %s", e)
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        return self._read(key, fresh=True)
+    
+    def get_stale(self, key: str) -> Optional[CacheEntry]:
+        return self._read(key, fresh=False)
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        headers = json.dumps([list(item) for item in entry.headers], ensure_ascii=False)
+        # 覆盖的旧条目大小用于增量统计；与其他写入交错时的偏差在下次整理时纠正
+        previous = self._execute("SELECT size FROM entries WHERE key = ?", (key,))
+        # 覆盖时保留读取次数，预热依据的是长期的访问频率
+        written = self._execute(
+            "INSERT INTO entries (key, url, status, headers, content, expires_at, size, accessed) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET url = excluded.url, status = excluded.status, "
+            "headers = excluded.headers, content = excluded.content, expires_at = excluded.expires_at, "
+            "size = excluded.size, accessed = excluded.accessed RETURNING key",
+            (key, entry.url, entry.status_code, headers, entry.content, entry.expires_at, entry.size, time.time())
+        )
+        if written:
+            if previous:
+                self._adjust(0, entry.size - previous[0][0])
+            else:
+                self._adjust(1, entry.size)
+        self._writes += 1
+        if self._writes % self.compact_every == 0:
+            self.compact()
+    
+    def delete(self, key: str) -> None:
+        rows = self._execute("DELETE FROM entries WHERE key = ? RETURNING size", (key,))
+        if rows:
+            self._adjust(-1, -rows[0][0])
+    
+    def clear(self) -> None:
+        self._execute("DELETE FROM entries")
+        self._execute("PRAGMA incremental_vacuum")
+        self._recount()
+    
+    def compact(self) -> int:
+        """
+        删除超过保留期的过期条目，总大小超过上限时按最近访问时间淘汰
+        
+        Returns:
+            删除的条目数
+        """
+        # 淘汰依据访问时间，先写回累计的读取
+        self.flush_hits()
+        removed = len(self._execute("DELETE FROM entries WHERE expires_at < ? RETURNING key",
+                                    (time.time() - self.max_stale,)))
+        total = self._recount()
+        if total > self.max_bytes:
+            # 按访问时间从旧到新累计大小，删除累计到释放目标为止的条目
+            sizes = self._execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM (SELECT key, size, SUM(size) OVER (ORDER BY accessed, key) AS freed FROM entries) "
+                "WHERE freed - size < ?) RETURNING size",
+                (total - self.max_bytes * self.compact_ratio,)
+            )
+            evicted = len(sizes)
+            self._adjust(-evicted, -sum(size for size, in sizes))
+            self.evictions += evicted
+            removed += evicted
+        if removed:
+            self._execute("PRAGMA incremental_vacuum")
+            logger.debug("磁盘缓存整理完成，删除 %d 个条目", removed)
+        return removed
+    
+    def total_bytes(self) -> int:
+        """条目总字节数"""
+        rows = self._execute("SELECT COALESCE(SUM(size), 0) FROM entries")
+        return rows[0][0] if rows else 0
+    
+    def hot_entries(self, limit: int) -> List[Tuple[str, CacheEntry]]:
+        if limit <= 0:
+            return []
+        self.flush_hits()
+        rows = self._execute(
+            "SELECT key, url, status, headers, content, expires_at FROM entries "
+            "ORDER BY hits DESC, accessed DESC LIMIT ?", (limit,)
+        )
+        return [(row[0], self._entry(row[1:])) for row in rows]
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._entries, self._bytes
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors
+        }
+    
+    def close(self):
+        self.flush_hits()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
\ No newline at end of file
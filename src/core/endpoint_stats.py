@@ -0,0 +1,95 @@
+"""
+端点统计模块
+"""
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+class EndpointStats:
+    """
+    单个端点的观测统计
+    
+    保存最近成功请求的耗时窗口（用于分位数），以及耗时和成功率的指数加权移动平均（EWMA）。
+    """
+    
+    def __init__(self, window_size: int = 100, alpha: float = 0.2):
+        self.alpha = alpha
+        self._latencies: Deque[float] = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self.ewma_latency: Optional[float] = None
+        self.ewma_success: Optional[float] = None
+        self.requests = 0
+    
+    def record_latency(self, seconds: float):
+        """记录一次成功请求的耗时"""
+        with self._lock:
+            self._latencies.append(seconds)
+            self.ewma_latency = self._ewma(self.ewma_latency, seconds)
+    
+    def record_result(self, success: bool):
+        """记录一次请求结果"""
+        with self._lock:
+            self.requests += 1
+            self.ewma_success = self._ewma(self.ewma_success, 1.0 if success else 0.0)
+    
+    @property
+    def sample_count(self) -> int:
+        """窗口内的样本数量"""
+        return len(self._latencies)
+    
+    def score(self) -> Optional[float]:
+        """
+        端点的期望代价：EWMA耗时除以EWMA成功率，越小越好
+        
+        还没有成功样本时返回None。
+        """
+        with self._lock:
+            if self.ewma_latency is None:
+                return None
+            success = self.ewma_success if self.ewma_success is not None else 1.0
+            return self.ewma_latency / max(success, 0.01)
+    
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return value
+        return self.alpha * value + (1 - self.alpha) * current
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        计算窗口内耗时的分位数
+        
+        Args:
+            q: 分位数，取值 0~1
+        
+        Returns:
+            分位数耗时（秒），没有样本时返回None
+        """
+        with self._lock:
+            samples: List[float] = sorted(self._latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))
+        return samples[index]
+
+class EndpointStatsRegistry:
+    """按端点维护统计信息"""
+    
+    def __init__(self, window_size: int = 100, alpha: float = 0.2):
+        self.window_size = window_size
+        self.alpha = alpha
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, endpoint: str) -> EndpointStats:
+        """获取端点的统计对象，不存在时创建"""
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(endpoint, EndpointStats(self.window_size, self.alpha))
+        return stats
+    
+    def snapshot(self) -> Dict[str, EndpointStats]:
+        """所有端点统计的快照"""
+        with self._lock:
+            return dict(self._stats)
\ No newline at end of file
@@ -5,7 +5,6 @@ import logging
 import httpx
 import json
 from typing import Optional
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +16,71 @@ class APIError(Exception):
         self.endpoint = endpoint
         super().__init__(self.message)
 
+class RateLimitedError(Exception):
+    """本地限流：上游额度已用完，请求未发出"""
+    def __init__(self, host: str, retry_after: float):
+        self.host = host
+        self.retry_after = retry_after
+        super().__init__(f"{host} 请求过于频繁，{retry_after:.1f}秒后可用")
+
+class NotFoundError(ValueError):
+    """上游正常响应，但查询的对象不存在（如无效的币种），属于输入问题而不是端点故障"""
+
+class DeadlineExceededError(Exception):
+    """本次调用的时间预算已用完"""
+    def __init__(self, message: str = "请求超出时间预算"):
+        super().__init__(message)
+
+def find_cause(e: BaseException, exc_type: type) -> Optional[BaseException]:
+    """在异常链（__cause__/__context__）中查找指定类型的异常"""
+    seen = set()
+    while e is not None and id(e) not in seen:
+        if isinstance(e, exc_type):
+            return e
+        seen.add(id(e))
+        e = e.__cause__ or e.__context__
+    return None
+
+# 错误类别
+ERROR_TIMEOUT = "timeout"
+ERROR_HTTP_STATUS = "http_status"
+ERROR_DECODE = "decode"
+ERROR_CONNECT = "connect"
+ERROR_NETWORK = "network"
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_DEADLINE = "deadline"
+ERROR_NOT_FOUND = "not_found"
+ERROR_UNKNOWN = "unknown"
+
+def classify_error(e: BaseException) -> str:
+    """
+    判断异常所属的错误类别
+    
+    Args:
+        e: 异常对象
+        
+    Returns:
+        错误类别（ERROR_* 常量之一）
+    """
+    if isinstance(e, RateLimitedError):
+        return ERROR_RATE_LIMITED
+    if isinstance(e, DeadlineExceededError):
+        return ERROR_DEADLINE
+    if isinstance(e, NotFoundError):
+        return ERROR_NOT_FOUND
+    if isinstance(e, httpx.TimeoutException):
+        return ERROR_TIMEOUT
+    if isinstance(e, httpx.HTTPStatusError):
+        return ERROR_HTTP_STATUS
+    if isinstance(e, json.JSONDecodeError):
+        return ERROR_DECODE
+    if isinstance(e, httpx.ConnectError):
+        return ERROR_CONNECT
+    if isinstance(e, httpx.TransportError):
+        # 连接被重置、协议错误等传输层错误
+        return ERROR_NETWORK
+    return ERROR_UNKNOWN
+
 def handle_api_error(e: Exception, service_name: str, endpoint: str = "") -> str:
     """
     统一的API错误处理函数
@@ -29,25 +93,34 @@ def handle_api_error(e: Exception, service_name: str, endpoint: str = "") -> str
     Returns:
         格式化的错误信息
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     error_msg = f"{service_name}服务暂时不可用"
+    category = classify_error(e)
     
-    if isinstance(e, httpx.TimeoutException):
+    if category == ERROR_TIMEOUT:
         error_msg += "：请求超时"
-        logger.error(f"[{timestamp}] {service_name} timeout error: {endpoint}")
-    elif isinstance(e, httpx.HTTPStatusError):
+        logger.error("%s timeout error: %s", service_name, endpoint)
+    elif category == ERROR_HTTP_STATUS:
         status_code = e.response.status_code
         error_msg += f"：HTTP {status_code}"
-        logger.error(f"[{timestamp}] {service_name} HTTP error {status_code}: {endpoint}")
-    elif isinstance(e, json.JSONDecodeError):
+        logger.error("%s HTTP error %s: %s", service_name, status_code, endpoint)
+    elif category == ERROR_DECODE:
         error_msg += "：数据解析失败"
-        logger.error(f"[{timestamp}] {service_name} JSON decode error: {endpoint}")
-    elif isinstance(e, httpx.ConnectError):
+        logger.error("%s JSON decode error: %s", service_name, endpoint)
+    elif category == ERROR_CONNECT:
         error_msg += "：连接失败"
-        logger.error(f"[{timestamp}] {service_name} connection error: {endpoint}")
+        logger.error("%s connection error: %s", service_name, endpoint)
+    elif category == ERROR_DEADLINE:
+        error_msg += "：请求超出时间预算"
+        logger.warning("%s deadline exceeded: %s", service_name, endpoint)
+    elif category == ERROR_RATE_LIMITED:
+        error_msg += "：请求过于频繁"
+        logger.warning("%s rate limited: %s", service_name, endpoint)
+    elif category == ERROR_NOT_FOUND:
+        error_msg += f"：{str(e)}"
+        logger.info("%s not found: %s, endpoint: %s", service_name, e, endpoint)
     else:
         error_msg += f"：{str(e)}"
-        logger.error(f"[{timestamp}] {service_name} unknown error: {e}, endpoint: {endpoint}")
+        logger.error("%s unknown error: %s, endpoint: %s", service_name, e, endpoint)
     
     return error_msg
 
@@ -63,6 +136,5 @@ def format_success_response(data: dict, service_name: str, endpoint: str = "") -
     Returns:
         格式化的响应字符串
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    logger.info(f"[{timestamp}] {service_name} success: {endpoint}")
+    logger.info("%s success: %s", service_name, endpoint)
     return data
\ No newline at end of file
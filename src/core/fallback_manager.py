@@ -1,88 +1,705 @@
 """
 备用端点管理器
 """
+import asyncio
 import logging
-from typing import List, Callable, Any, Optional
-from .config import ServiceConfig
-from .http_client import http_manager
-from .error_handler import handle_api_error
+import random
+import time
+from typing import Dict, Iterator, List, Callable, Any, Awaitable, Hashable, Mapping, Optional, Tuple
+from .async_runner import run_sync
+from .cache import NegativeCache
+from .circuit_breaker import CircuitBreakerRegistry, CircuitState
+from .config import ConfigSnapshot, ServiceConfig, config_manager, current_service_config
+from .deadline import Deadline, current_deadline
+from .endpoint_stats import EndpointStatsRegistry
+from .retry import RetryBudget, current_retry_budget
+from .sidecar import SidecarClient, SidecarUnavailable, call_in_background
+from .http_client import (
+    ResponseSources, current_prefetch, current_response_sources, current_stale_ages, current_stale_limit,
+    http_manager
+)
+from .error_handler import DeadlineExceededError, NotFoundError, RateLimitedError, find_cause, handle_api_error
+from .metrics import metrics
+from .singleflight import SingleFlight
+from .tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+FALLBACK_CALLS = metrics.counter(
+    "fallback_calls_total", "服务调用结果（success/stale/not_found/exhausted/timeout）", ("service", "outcome")
+)
+ENDPOINT_ATTEMPTS = metrics.counter(
+    "endpoint_attempts_total", "端点尝试结果（success/not_found/failure/rate_limited）", ("service", "endpoint", "outcome")
+)
+ENDPOINT_LATENCY = metrics.histogram(
+    "endpoint_latency_seconds", "端点成功请求的耗时", ("service", "endpoint")
+)
+FALLBACK_HOPS = metrics.counter(
+    "fallback_hops_total", "主端点失败后切换到下一个端点的次数", ("service",)
+)
+HEDGED_REQUESTS = metrics.counter(
+    "hedged_requests_total", "启动的对冲请求数", ("service",)
+)
+
+def _service_label() -> str:
+    """当前服务名，用作指标标签"""
+    service_config = current_service_config.get()
+    return service_config.name if service_config is not None else "-"
+
+def format_age(seconds: float) -> str:
+    """把秒数格式化为易读的时长"""
+    if seconds < 60:
+        return f"{int(seconds)}秒"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}分钟"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}小时"
+    return f"{seconds / 86400:.1f}天"
+
 class FallbackManager:
     """备用端点管理器"""
     
     def __init__(self):
-        self.failed_endpoints = set()
+        self.breakers = CircuitBreakerRegistry(**self._breaker_settings(config_manager.snapshot().settings))
+        # 兼容旧接口：以集合形式访问熔断中的端点
+        self.failed_endpoints = FailedEndpoints(self.breakers)
+        self.singleflight = SingleFlight()
+        self.endpoint_stats = EndpointStatsRegistry(alpha=config_manager.get("endpoint_ewma_alpha", 0.2))
+        # 对冲延迟使用观测分位数所需的最少样本数
+        self.min_hedge_samples = 5
+        # 动态排序：每个端点所需的最少样本数，以及随机探索其他端点的概率
+        self.min_order_samples = 5
+        self.exploration_rate = config_manager.get("endpoint_exploration_rate", 0.05)
+        self._random = random.Random()
+        # 共享状态进程：与其他进程交换熔断的端点，每隔 health_sync_interval 秒同步一次
+        self.sidecar: Optional[SidecarClient] = http_manager.sidecar
+        self.health_sync_interval = config_manager.get("sidecar_health_interval", 1.0)
+        self._health_synced = 0.0
+        # 上游明确表示不存在的查询，按服务的 negative_cache_ttl 短期记住，不计入端点的失败统计
+        self.negative_cache = NegativeCache(config_manager.get("negative_cache_max_entries", 1024))
     
-    def execute_with_fallback(self, 
-                            service_config: ServiceConfig,
-                            request_func: Callable[[str], Any],
-                            *args, **kwargs) -> str:
+    @staticmethod
+    def _breaker_settings(settings: Mapping[str, Any]) -> Dict[str, Any]:
+        """从配置中读取熔断器参数"""
+        return {
+            "failure_rate_threshold": settings.get("circuit_failure_rate", 0.5),
+            "min_requests": settings.get("circuit_min_requests", 3),
+            "window_seconds": settings.get("circuit_window", 60.0),
+            "cooldown_seconds": settings.get("circuit_cooldown", 30.0),
+            "max_cooldown_seconds": settings.get("circuit_max_cooldown", 300.0)
+        }
+    
+    def apply_config(self, old: ConfigSnapshot, new: ConfigSnapshot):
+        """配置重新加载后更新熔断器参数和探索概率"""
+        self.breakers.configure(**self._breaker_settings(new.settings))
+        self.exploration_rate = new.settings.get("endpoint_exploration_rate", self.exploration_rate)
+        self.sidecar = http_manager.sidecar
+        self.health_sync_interval = new.settings.get("sidecar_health_interval", self.health_sync_interval)
+        self.negative_cache.max_entries = new.settings.get("negative_cache_max_entries",
+                                                           self.negative_cache.max_entries)
+    
+    async def execute_with_fallback_async(self,
+                                          service_config: ServiceConfig,
+                                          request_func: Callable[..., Awaitable[Any]],
+                                          *args, coalesce_key: Optional[Hashable] = None,
+                                          **kwargs) -> str:
         """
-        使用备用端点执行请求
+        使用备用端点异步执行请求
         
         Args:
             service_config: 服务配置
-            request_func: 请求执行函数
+            request_func: 异步请求执行函数，第一个参数为端点
             *args, **kwargs: 传递给请求函数的参数
-            
+            coalesce_key: 可选的合并键，相同服务和键的并发调用共享一次执行结果；
+                          服务配置了 negative_cache_ttl 时也用于记住“不存在”的结果
+        
         Returns:
             请求结果或错误信息
         """
         if not service_config.enabled:
             return f"{service_config.name}服务已禁用"
         
-        # 尝试主端点
-        endpoints = [service_config.primary_endpoint] + service_config.fallback_endpoints
+        negative_key = None
+        if coalesce_key is not None and service_config.negative_cache_ttl > 0:
+            negative_key = (service_config.name, coalesce_key)
+            cached = self.negative_cache.get(negative_key)
+            if cached is not None:
+                self._record_outcome(service_config, "not_found")
+                return cached
         
-        for endpoint in endpoints:
-            if endpoint in self.failed_endpoints:
-                logger.debug(f"跳过已失败的端点: {endpoint}")
-                continue
-                
+        async def run() -> str:
+            # 让HTTP层在本次执行中读取服务级配置（如缓存有效期、重试次数）
+            token = current_service_config.set(service_config)
+            budget_token = current_retry_budget.set(RetryBudget(
+                max_retries=config_manager.get("retry_budget", 3),
+                max_delay=config_manager.get("retry_budget_delay", 10.0)
+            ))
             try:
-                logger.info(f"尝试端点: {endpoint}")
-                result = request_func(endpoint, *args, **kwargs)
-                
-                # 如果成功，从失败列表中移除
-                if endpoint in self.failed_endpoints:
-                    self.failed_endpoints.remove(endpoint)
-                    logger.info(f"端点恢复正常: {endpoint}")
-                
-                return result
-                
-            except Exception as e:
-                logger.warning(f"端点失败: {endpoint}, 错误: {e}")
-                self.failed_endpoints.add(endpoint)
-                continue
+                return await self._try_endpoints(service_config, request_func, *args, **kwargs)
+            except NotFoundError as e:
+                self._record_outcome(service_config, "not_found")
+                message = f"❌ {e}"
+                if negative_key is not None:
+                    self.negative_cache.set(negative_key, message, service_config.negative_cache_ttl)
+                return message
+            finally:
+                current_retry_budget.reset(budget_token)
+                current_service_config.reset(token)
+        
+        # 没有外层截止时间时，本次执行使用默认的工具时间预算
+        deadline = current_deadline.get()
+        deadline_token = None
+        if deadline is None:
+            deadline = Deadline(config_manager.get("tool_deadline", 15.0))
+            deadline_token = current_deadline.set(deadline)
+        try:
+            with tracer.span("fallback", service=service_config.name):
+                if not deadline.expired:
+                    try:
+                        async with asyncio.timeout(deadline.remaining()):
+                            if coalesce_key is None:
+                                return await run()
+                            return await self.singleflight.do(self._flight_key(service_config, coalesce_key), run)
+                    except (TimeoutError, DeadlineExceededError):
+                        # 加入合并调用时由 SingleFlight 按本次的截止时间限时
+                        pass
+                # 时间预算用完后仍返回不访问上游的过期缓存和本地备用数据
+                result = await self._serve_offline(service_config, request_func, *args, **kwargs)
+                return result if result is not None else self._deadline_exceeded(service_config)
+        finally:
+            if deadline_token is not None:
+                current_deadline.reset(deadline_token)
+    
+    def _flight_key(self, service_config: ServiceConfig, coalesce_key: Hashable) -> Hashable:
+        """
+        调用合并键
+        
+        后台预取可以加入进行中的用户调用（数据由用户调用更新），用户调用不会加入预取：
+        预取不返回过期缓存和本地备用数据，额度紧张时直接放弃，这些行为不能传给用户。
+        """
+        key: Hashable = (service_config.name, coalesce_key)
+        prefetch = current_prefetch.get()
+        if prefetch is None:
+            return key
+        if self.singleflight.running(key):
+            prefetch.joined += 1
+            return key
+        return ("prefetch",) + key
+    
+    def _deadline_exceeded(self, service_config: ServiceConfig) -> str:
+        """
+        时间预算用完时的错误信息
+        
+        与端点都失败时一样包含“不可用”，调用方据此改用自带的预设内容。
+        """
+        self._record_outcome(service_config, "timeout")
+        error_msg = f"{service_config.name}服务暂时不可用：请求超时，请稍后再试"
+        logger.error(error_msg)
+        return error_msg
+    
+    @staticmethod
+    def _record_outcome(service_config: ServiceConfig, outcome: str):
+        """记录服务调用结果"""
+        FALLBACK_CALLS.labels(service_config.name, outcome).inc()
+        tracer.current().set_attribute("outcome", outcome)
+    
+    async def _try_endpoints(self,
+                             service_config: ServiceConfig,
+                             request_func: Callable[..., Awaitable[Any]],
+                             *args, **kwargs) -> str:
+        """
+        尝试主端点和备用端点
+        
+        网络端点都失败后，由 _serve_offline 返回过期缓存或 backup:// 本地备用数据。
+        
+        Raises:
+            NotFoundError: 没有端点成功，且尝试过的端点都表示查询的对象不存在，或主端点表示不存在
+        """
+        await self.sync_shared_health_async()
+        backups = {info.url for info in service_config.endpoints if info.is_backup}
+        ordered = self.order_endpoints(service_config)
+        endpoints = [ep for ep in ordered if ep not in backups]
+        
+        if service_config.hedge and len(endpoints) > 1:
+            succeeded, result = await self._run_hedged(
+                service_config, endpoints, request_func, *args, **kwargs
+            )
+        else:
+            succeeded, result = await self._run_sequential(endpoints, request_func, *args, **kwargs)
+        
+        if succeeded:
+            self._record_outcome(service_config, "success")
+            return result
+        
+        # 查询的对象不存在时，过期缓存和本地备用数据都没有意义。只有尝试过的端点都这样回答，
+        # 或主端点这样回答时才下结论；其他端点超时或出错时可能只是个别端点的数据不全
+        not_found: Dict[str, NotFoundError] = {}
+        for endpoint, error in result:
+            cause = find_cause(error, NotFoundError)
+            if cause is not None:
+                not_found[endpoint] = cause
+        if not_found and (len(not_found) == len(result) or service_config.primary_endpoint in not_found):
+            raise not_found.get(service_config.primary_endpoint) or next(iter(not_found.values()))
+        
+        offline = await self._serve_offline(service_config, request_func, *args, **kwargs)
+        if offline is not None:
+            return offline
+        
+        deadline = current_deadline.get()
+        if deadline is not None and deadline.expired:
+            return self._deadline_exceeded(service_config)
         
         # 所有端点都失败
+        self._record_outcome(service_config, "exhausted")
         error_msg = f"{service_config.name}服务的所有端点都不可用，请稍后再试"
         logger.error(error_msg)
         return error_msg
     
+    async def _serve_offline(self,
+                             service_config: ServiceConfig,
+                             request_func: Callable[..., Awaitable[Any]],
+                             *args, **kwargs) -> Optional[str]:
+        """
+        网络端点都失败或时间预算用完后，先按 stale_if_error 返回过期缓存，最后才使用 backup:// 本地备用数据
+        
+        两者都不访问上游，时间预算用完后同样执行。后台预取时都不使用，没有可用数据时返回 None。
+        """
+        stale = await self._serve_stale(service_config, request_func, *args, **kwargs)
+        if stale is not None:
+            return stale
+        
+        backups = [info.url for info in service_config.endpoints if info.is_backup]
+        if not backups or current_prefetch.get() is not None:
+            return None
+        token = current_service_config.set(service_config)
+        try:
+            succeeded, result = await self._run_sequential(
+                backups, request_func, *args, check_deadline=False, **kwargs
+            )
+        finally:
+            current_service_config.reset(token)
+        if not succeeded:
+            return None
+        self._record_outcome(service_config, "success")
+        return result
+    
+    async def _serve_stale(self,
+                           service_config: ServiceConfig,
+                           request_func: Callable[..., Awaitable[Any]],
+                           *args, **kwargs) -> Optional[str]:
+        """
+        所有网络端点都失败后，用过期不超过 stale_if_error 秒的缓存重新执行请求函数
+        
+        此时HTTP层只读取缓存，不访问上游，也不计入端点的成功或失败统计。
+        结果末尾标注数据已过期的时长，没有可用缓存时返回 None。
+        """
+        # 后台预取只关心上游的新数据
+        if service_config.stale_if_error <= 0 or current_prefetch.get() is not None:
+            return None
+        ages: List[float] = []
+        tokens = (current_stale_limit.set(service_config.stale_if_error), current_stale_ages.set(ages),
+                  current_service_config.set(service_config))
+        try:
+            for info in service_config.endpoints:
+                if info.is_backup:
+                    continue
+                ages.clear()
+                try:
+                    result = await request_func(info.url, *args, **kwargs)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.debug("端点没有可用的缓存: %s, %s", info.url, e)
+                    continue
+                if not ages:
+                    # 请求函数没有经过HTTP层（如本地计算），结果不是来自缓存
+                    continue
+                logger.warning("%s服务的端点都不可用，返回过期缓存", service_config.name)
+                self._record_outcome(service_config, "stale")
+                return f"{result}\n\n⚠️ 上游暂时不可用，以上为缓存数据（已过期{format_age(max(ages))}）"
+            return None
+        finally:
+            current_service_config.reset(tokens[2])
+            current_stale_ages.reset(tokens[1])
+            current_stale_limit.reset(tokens[0])
+    
+    async def _run_sequential(self,
+                              endpoints: List[str],
+                              request_func: Callable[..., Awaitable[Any]],
+                              *args, check_deadline: bool = True, **kwargs) -> Tuple[bool, Any]:
+        """
+        依次尝试各端点，返回 (是否成功, 结果)；都失败时结果为各端点及其异常的列表
+        
+        check_deadline 为 False 时时间预算用完后仍继续尝试（用于不访问上游的本地备用端点）。
+        """
+        attempted = False
+        errors: List[Tuple[str, Exception]] = []
+        for endpoint in endpoints:
+            deadline = current_deadline.get()
+            if check_deadline and deadline is not None and deadline.expired:
+                logger.warning("时间预算已用完，停止尝试备用端点")
+                break
+            if not self.breakers.get(endpoint).allow_request():
+                logger.debug("跳过熔断中的端点: %s", endpoint)
+                continue
+            
+            logger.debug("尝试端点: %s", endpoint)
+            if attempted:
+                FALLBACK_HOPS.labels(_service_label()).inc()
+            attempted = True
+            try:
+                result = await self._attempt(endpoint, request_func, *args, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._mark_failure(endpoint, e)
+                errors.append((endpoint, e))
+                continue
+            self._mark_success(endpoint)
+            return True, result
+        return False, errors
+    
+    async def _run_hedged(self,
+                          service_config: ServiceConfig,
+                          endpoints: List[str],
+                          request_func: Callable[..., Awaitable[Any]],
+                          *args, **kwargs) -> Tuple[bool, Any]:
+        """
+        对冲执行：当前端点在对冲延迟内未响应时并行启动下一个端点
+        
+        首个有效结果胜出，其余进行中的请求被取消。都失败时结果为各端点及其异常的列表。
+        """
+        queue = list(endpoints)
+        errors: List[Tuple[str, Exception]] = []
+        pending: Dict["asyncio.Task[Any]", str] = {}
+        last_endpoint = ""
+        
+        def launch() -> bool:
+            """启动下一个熔断器放行的端点"""
+            nonlocal last_endpoint
+            while queue:
+                endpoint = queue.pop(0)
+                if not self.breakers.get(endpoint).allow_request():
+                    logger.debug("跳过熔断中的端点: %s", endpoint)
+                    continue
+                last_endpoint = endpoint
+                logger.debug("尝试端点: %s", endpoint)
+                task = asyncio.ensure_future(self._attempt(endpoint, request_func, *args, **kwargs))
+                pending[task] = endpoint
+                return True
+            return False
+        
+        if not launch():
+            return False, errors
+        try:
+            while pending:
+                delay = self.hedge_delay(service_config, last_endpoint) if queue else None
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info("端点响应缓慢，启动对冲请求: %s 已等待 %.3fs", last_endpoint, delay)
+                    if launch():
+                        HEDGED_REQUESTS.labels(service_config.name).inc()
+                    continue
+                
+                for task in done:
+                    endpoint = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        self._mark_failure(endpoint, e)
+                        errors.append((endpoint, e))
+                        continue
+                    self._mark_success(endpoint)
+                    return True, result
+                
+                # 已完成的请求都失败，立即尝试下一个端点
+                if not pending and queue and launch():
+                    FALLBACK_HOPS.labels(service_config.name).inc()
+            return False, errors
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def order_endpoints(self, service_config: ServiceConfig) -> List[str]:
+        """
+        确定本次请求的端点顺序
+        
+        有足够样本的端点按期望代价（EWMA耗时/EWMA成功率）升序排在前面，样本不足的端点按配置顺序排在其后；
+        并以 exploration_rate 的概率把一个其他端点提到最前，持续采样。
+        backup:// 本地备用端点始终排在最后。
+        """
+        endpoints = list(service_config.all_endpoints)
+        if not service_config.adaptive_order:
+            return endpoints
+        
+        movable = [info.url for info in service_config.endpoints if not info.is_backup]
+        pinned = [info.url for info in service_config.endpoints if info.is_backup]
+        if len(movable) < 2:
+            return endpoints
+        
+        scored: List[Tuple[float, str]] = []
+        cold: List[str] = []
+        for ep in movable:
+            stats = self.endpoint_stats.get(ep)
+            score = stats.score()
+            if score is not None and stats.requests >= self.min_order_samples:
+                scored.append((score, ep))
+            else:
+                cold.append(ep)
+        movable = [ep for _, ep in sorted(scored, key=lambda item: item[0])] + cold
+        
+        if self.exploration_rate > 0 and self._random.random() < self.exploration_rate:
+            explored = self._random.choice(movable[1:])
+            movable.remove(explored)
+            movable.insert(0, explored)
+            logger.debug("探索端点: %s", explored)
+        
+        return movable + pinned
+    
+    def hedge_delay(self, service_config: ServiceConfig, endpoint: str) -> float:
+        """
+        计算端点的对冲延迟
+        
+        样本充足时取观测耗时的分位数，否则取超时时间的一半。
+        """
+        stats = self.endpoint_stats.get(endpoint)
+        observed = None
+        if stats.sample_count >= self.min_hedge_samples:
+            observed = stats.percentile(service_config.hedge_percentile)
+        delay = observed if observed is not None else service_config.timeout / 2
+        return max(service_config.hedge_min_delay, min(delay, service_config.timeout))
+    
+    async def _attempt(self, endpoint: str,
+                       request_func: Callable[..., Awaitable[Any]],
+                       *args, **kwargs) -> Any:
+        """
+        执行一次端点请求并记录成功请求的耗时
+        
+        只由缓存返回的请求耗时不代表端点的响应速度，不计入耗时统计（对冲延迟的分位数窗口、
+        排序用的 EWMA 耗时）和耗时直方图，否则缓存命中率高时分位数接近零，缓存未命中的
+        正常请求也会触发对冲，命中缓存较多的端点也会被排到前面。
+        
+        请求中取得的上游响应在请求函数成功返回后才写入缓存，请求函数抛出异常（如响应内容是错误信息）
+        时丢弃。
+        """
+        sources = ResponseSources()
+        token = current_response_sources.set(sources)
+        start = time.perf_counter()
+        try:
+            with tracer.span("endpoint", endpoint=endpoint):
+                result = await request_func(endpoint, *args, **kwargs)
+        except asyncio.CancelledError:
+            # 被取消的请求没有结果，释放熔断器的探测名额
+            self.breakers.get(endpoint).release()
+            raise
+        finally:
+            current_response_sources.reset(token)
+        latency = time.perf_counter() - start
+        if not sources.cache_only:
+            self.endpoint_stats.get(endpoint).record_latency(latency)
+            ENDPOINT_LATENCY.labels(_service_label(), endpoint).observe(latency)
+        await sources.commit()
+        return result
+    
+    def _mark_success(self, endpoint: str, outcome: str = "success"):
+        """端点请求成功（包括正常返回“不存在”的请求）"""
+        ENDPOINT_ATTEMPTS.labels(_service_label(), endpoint, outcome).inc()
+        self.endpoint_stats.get(endpoint).record_result(True)
+        breaker = self.breakers.get(endpoint)
+        recovering = breaker.state is not CircuitState.CLOSED
+        breaker.record_success()
+        if recovering:
+            logger.info("端点恢复正常: %s", endpoint)
+            self._share_health(endpoint, False)
+    
+    def _mark_failure(self, endpoint: str, error: Exception):
+        """端点请求失败"""
+        if find_cause(error, RateLimitedError) is not None:
+            # 本地限流时请求并未发出，不计入端点的失败统计
+            logger.info("端点额度不足，切换备用端点: %s", endpoint)
+            ENDPOINT_ATTEMPTS.labels(_service_label(), endpoint, "rate_limited").inc()
+            self.breakers.get(endpoint).release()
+            return
+        if find_cause(error, NotFoundError) is not None:
+            # 端点正常响应，只是查询的对象不存在，不影响端点的健康状态
+            logger.debug("端点返回不存在: %s", endpoint)
+            self._mark_success(endpoint, "not_found")
+            return
+        logger.warning("端点失败: %s, 错误: %s", endpoint, error)
+        ENDPOINT_ATTEMPTS.labels(_service_label(), endpoint, "failure").inc()
+        self.endpoint_stats.get(endpoint).record_result(False)
+        breaker = self.breakers.get(endpoint)
+        breaker.record_failure(str(error))
+        if breaker.state is CircuitState.OPEN:
+            logger.warning("端点已熔断: %s", endpoint)
+            self._share_health(endpoint, True, breaker.snapshot()["cooldown_remaining"])
+    
+    def _share_health(self, endpoint: str, is_open: bool, cooldown: float = 0.0):
+        """把端点熔断或恢复报告给共享状态进程（在事件循环中时交给线程池，不等待完成）"""
+        if self.sidecar is not None:
+            call_in_background(self.sidecar.report_health, endpoint, is_open, cooldown)
+    
+    def _health_sync_due(self, force: bool) -> bool:
+        """是否需要访问共享状态进程同步熔断端点，需要时记录同步时间"""
+        if self.sidecar is None:
+            return False
+        now = time.monotonic()
+        if not force and now - self._health_synced < self.health_sync_interval:
+            return False
+        self._health_synced = now
+        return True
+    
+    def sync_shared_health(self, force: bool = False):
+        """
+        读取其他进程报告的熔断端点，在本进程中同样熔断到冷却结束
+        
+        最多每 health_sync_interval 秒访问一次共享状态进程。
+        """
+        if self._health_sync_due(force):
+            self._pull_shared_health()
+    
+    async def sync_shared_health_async(self, force: bool = False):
+        """在事件循环中同步熔断端点，访问共享状态进程的部分在线程池中执行"""
+        if self._health_sync_due(force):
+            await asyncio.to_thread(self._pull_shared_health)
+    
+    def _pull_shared_health(self):
+        """读取其他进程报告的熔断端点并在本进程中熔断"""
+        sidecar = self.sidecar
+        if sidecar is None:
+            return
+        try:
+            remote = sidecar.open_endpoints()
+        except (SidecarUnavailable, ValueError):
+            return
+        for endpoint, remaining in remote.items():
+            breaker = self.breakers.get(endpoint)
+            if remaining > 0 and breaker.state is CircuitState.CLOSED:
+                logger.info("其他进程报告端点熔断，%.0f秒内跳过: %s", remaining, endpoint)
+                breaker.force_open(remaining)
+    
+    def record_probe(self, endpoint: str, healthy: Optional[bool], error: str = ""):
+        """
+        记录健康检查的探测结果
+        
+        探测不带API密钥、不走真实的查询参数，结果只作参考：探测通过时熔断中的端点提前进入半开状态，
+        由下一个真实请求决定是否恢复；探测失败计入熔断器。探测耗时和结果都不计入端点统计，
+        以免影响端点排序和对冲延迟。
+        
+        Args:
+            endpoint: 配置中的端点
+            healthy: 端点是否健康，None 表示无法判断（如 4xx）
+            error: 失败原因
+        """
+        if healthy is None:
+            return
+        breaker = self.breakers.get(endpoint)
+        if healthy:
+            if breaker.state is CircuitState.OPEN:
+                logger.info("健康检查通过，熔断中的端点进入半开状态: %s", endpoint)
+                breaker.half_open()
+            return
+        breaker.record_failure(error or "健康检查失败")
+        if breaker.state is CircuitState.OPEN:
+            logger.warning("端点已熔断: %s", endpoint)
+            self._share_health(endpoint, True, breaker.snapshot()["cooldown_remaining"])
+    
+    def execute_with_fallback(self, 
+                            service_config: ServiceConfig,
+                            request_func: Callable[[str], Any],
+                            *args, **kwargs) -> str:
+        """
+        使用备用端点执行请求（execute_with_fallback_async 的同步包装）
+        
+        同步的请求函数会在线程池中执行，不会阻塞事件循环。
+        
+        Args:
+            service_config: 服务配置
+            request_func: 请求执行函数
+            *args, **kwargs: 传递给请求函数的参数
+        
+        Returns:
+            请求结果或错误信息
+        """
+        async def run_in_thread(endpoint: str, *a, **kw) -> Any:
+            return await asyncio.to_thread(request_func, endpoint, *a, **kw)
+        
+        return run_sync(
+            self.execute_with_fallback_async(service_config, run_in_thread, *args, **kwargs)
+        )
+    
     def reset_failed_endpoints(self, service_name: Optional[str] = None):
         """
         重置失败端点列表
         
+        熔断器会在冷却结束后自动探测恢复，此方法用于立即恢复。
+        
         Args:
             service_name: 可选，指定服务名称只重置该服务的端点
         """
         if service_name:
             # 移除特定服务的失败端点
-            to_remove = [ep for ep in self.failed_endpoints if service_name in ep]
+            service_config = config_manager.get_service_config(service_name)
+            service_endpoints = set(service_config.all_endpoints)
+            to_remove = [ep for ep in self.failed_endpoints if ep in service_endpoints or service_name in ep]
             for ep in to_remove:
                 self.failed_endpoints.remove(ep)
-            logger.info(f"已重置 {service_name} 服务的失败端点")
+            logger.info("已重置 %s 服务的失败端点", service_name)
         else:
             # 清空所有失败端点
             self.failed_endpoints.clear()
             logger.info("已重置所有失败端点")
     
     def get_failed_endpoints(self) -> List[str]:
-        """获取当前失败的端点列表"""
+        """获取当前失败（熔断或半开）的端点列表"""
         return list(self.failed_endpoints)
+    
+    def get_circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有端点的熔断器状态"""
+        return {endpoint: breaker.snapshot() for endpoint, breaker in self.breakers.items()}
+
+class FailedEndpoints:
+    """
+    熔断中端点的集合视图
+    
+    保留旧的 failed_endpoints 集合接口：add 立即熔断端点，remove/clear 恢复端点。
+    """
+    
+    def __init__(self, breakers: CircuitBreakerRegistry):
+        self._breakers = breakers
+    
+    def __contains__(self, endpoint: object) -> bool:
+        breaker = self._breakers.find(endpoint) if isinstance(endpoint, str) else None
+        return breaker is not None and breaker.state is not CircuitState.CLOSED
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._breakers.open_endpoints()))
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self._breakers.open_endpoints())
+    
+    def add(self, endpoint: str):
+        """立即熔断端点"""
+        self._breakers.get(endpoint).force_open()
+    
+    def remove(self, endpoint: str):
+        """恢复端点，端点不在集合中时抛出KeyError"""
+        if endpoint not in self:
+            raise KeyError(endpoint)
+        self._breakers.get(endpoint).reset()
+    
+    def discard(self, endpoint: str):
+        """恢复端点"""
+        breaker = self._breakers.find(endpoint)
+        if breaker is not None:
+            breaker.reset()
+    
+    def clear(self):
+        """恢复所有端点"""
+        for _, breaker in self._breakers.items():
+            breaker.reset()
 
 # 全局备用管理器实例
-fallback_manager = FallbackManager()
\ No newline at end of file
+fallback_manager = FallbackManager()
+config_manager.add_reload_listener(fallback_manager.apply_config)
+metrics.gauge("open_circuits", "熔断中或半开的端点数", function=lambda: len(fallback_manager.get_failed_endpoints()))
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+健康检查模块
+
+并发探测所有服务的主端点和备用端点，记录各端点的耗时，并把探测结果反馈给 FallbackManager。
+"""
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .config import ConfigManager, config_manager
+from .error_handler import DeadlineExceededError, RateLimitedError, find_cause
+from .fallback_manager import FallbackManager, fallback_manager
+from .http_client import HTTPClientManager, http_manager
+
+logger = logging.getLogger(__name__)
+
+# 参与健康检查的服务
+HEALTH_CHECK_SERVICES = [
+    "ip_location", "news", "weather", "cryptocurrency", "quotes", "jokes", "exchange_rate",
+    "cat_images", "dog_images", "random_facts", "meme_images", "history_today", "color_info"
+]
+
+@dataclass
+class EndpointHealth:
+    """单个端点的探测结果"""
+    service: str
+    endpoint: str
+    primary: bool
+    status_code: Optional[int] = None
+    latency: Optional[float] = None
+    error: str = ""
+    skipped: bool = False
+    
+    @property
+    def reachable(self) -> bool:
+        """端点是否可达（4xx 说明服务在线，只是测试参数不被接受）"""
+        return self.status_code is not None and self.status_code < 500
+    
+    @property
+    def healthy(self) -> Optional[bool]:
+        """
+        端点是否健康
+        
+        探测不带API密钥，401/403/429 等 4xx 不能说明真实请求能否成功，返回 None（未知）；
+        跳过的探测（本地备用端点，或本地限流、时间预算用完而未发出的请求）同样返回 None；
+        2xx/3xx 为健康，5xx 和网络错误为不健康。
+        """
+        if self.skipped:
+            return None
+        if self.status_code is None or self.status_code >= 500:
+            return False
+        return True if self.status_code < 400 else None
+    
+    @property
+    def status(self) -> str:
+        """状态描述"""
+        if self.skipped:
+            return f"⚠️ 跳过检查: {self.error[:50]}" if self.error else "⚠️ 跳过检查"
+        if self.status_code is None:
+            return f"❌ 失败: {self.error[:50]}"
+        if self.status_code < 400:
+            label = "✅ 正常"
+        else:
+            label = f"⚠️ HTTP {self.status_code}"
+        return f"{label} ({self.latency * 1000:.0f}ms)"
+
+def probe_url(service_name: str, endpoint: str) -> Optional[str]:
+    """
+    生成端点的探测URL
+    
+    Returns:
+        探测URL；本地备用端点返回None
+    """
+    if endpoint.startswith("backup://"):
+        return None
+    url = endpoint.split('?')[0]  # 移除查询参数
+    
+    # 特殊处理需要参数的端点
+    if "{}" in url:
+        if service_name == "exchange_rate":
+            url = url.replace("{}", "USD")  # 使用USD作为测试货币
+        elif service_name == "ip_location":
+            url = url.replace("{}", "8.8.8.8")  # 使用Google DNS作为测试IP
+        else:
+            url = url.replace("{}", "test")  # 通用测试值
+    
+    # 特殊处理加密货币API
+    if service_name == "cryptocurrency" and "coingecko" in url:
+        # 为CoinGecko API添加必要的参数
+        url = f"{url}?ids=bitcoin&vs_currencies=usd"
+    return url
+
+class HealthChecker:
+    """并发健康检查器"""
+    
+    def __init__(self,
+                 http: HTTPClientManager = http_manager,
+                 fallback: FallbackManager = fallback_manager,
+                 config: ConfigManager = config_manager,
+                 timeout: float = 2.0,
+                 max_concurrency: int = 10):
+        self.http = http
+        self.fallback = fallback
+        self.config = config
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.last_results: List[EndpointHealth] = []
+        self.last_checked: Optional[float] = None
+    
+    async def check_endpoint(self, service_name: str, endpoint: str, primary: bool,
+                             semaphore: Optional[asyncio.Semaphore] = None) -> EndpointHealth:
+        """探测单个端点，并把结果反馈给 FallbackManager"""
+        result = EndpointHealth(service=service_name, endpoint=endpoint, primary=primary)
+        url = probe_url(service_name, endpoint)
+        if url is None:
+            result.skipped = True
+            return result
+        
+        async with semaphore or contextlib.nullcontext():
+            start = time.perf_counter()
+            try:
+                # 探测不使用缓存，也不在服务上下文中执行，因此不会重试
+                response = await self.http.get_async(url, timeout=self.timeout, cache_ttl=0)
+                result.status_code = response.status_code
+            except Exception as e:
+                status_code = getattr(getattr(e, "response", None), "status_code", None)
+                if status_code is not None:
+                    result.status_code = status_code
+                else:
+                    result.error = str(e) or type(e).__name__
+                    # 本地限流或时间预算用完时请求没有发出，不能说明端点的状态
+                    result.skipped = (find_cause(e, RateLimitedError) is not None
+                                      or find_cause(e, DeadlineExceededError) is not None)
+            result.latency = time.perf_counter() - start
+        
+        if result.skipped:
+            return result
+        self.fallback.record_probe(endpoint, result.healthy, result.error or f"HTTP {result.status_code}")
+        return result
+    
+    async def check_all(self, services: Optional[List[str]] = None) -> List[EndpointHealth]:
+        """
+        并发探测所有服务的全部端点
+        
+        Args:
+            services: 要检查的服务，默认为 HEALTH_CHECK_SERVICES
+        
+        Returns:
+            按服务和端点顺序排列的探测结果
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        probes = []
+        for service_name in services or HEALTH_CHECK_SERVICES:
+            service_config = self.config.get_service_config(service_name)
+            for index, endpoint in enumerate(service_config.all_endpoints):
+                probes.append(self.check_endpoint(service_name, endpoint, index == 0, semaphore))
+        
+        results = list(await asyncio.gather(*probes))
+        self.last_results = results
+        self.last_checked = time.time()
+        return results
+
+def format_report(results: List[EndpointHealth], elapsed: Optional[float] = None) -> str:
+    """把探测结果格式化为健康检查报告"""
+    lines = []
+    for result in results:
+        if result.primary:
+            lines.append(f"{result.service}: {result.status}")
+        else:
+            lines.append(f"  ↳ 备用 {result.endpoint}: {result.status}")
+    
+    probed = [r for r in results if not r.skipped]
+    reachable = sum(1 for r in probed if r.reachable)
+    summary = f"\n共检查 {len(probed)} 个端点，可达 {reachable} 个"
+    if elapsed is not None:
+        summary += f"，耗时 {elapsed * 1000:.0f}ms"
+    lines.append(summary)
+    return "\n".join(lines)
+
+# 全局健康检查器实例
+health_checker = HealthChecker()
\ No newline at end of file
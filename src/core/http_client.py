@@ -1,18 +1,308 @@
 """
 HTTP客户端配置和管理
 """
+import asyncio
+import atexit
+import contextvars
+import fnmatch
 import httpx
+import json
 import logging
-from typing import Optional, Dict, Any
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field, fields
+from typing import Optional, Dict, Any, Awaitable, Callable, Hashable, List, Mapping, Set, Tuple, Union
+
+from .async_runner import run_sync
+from .cache import CacheBackend, CacheEntry, LRUCache, TieredCache, make_cache_key
+from .cassette import (
+    TIMING_ORIGINAL, CassetteReader, CassetteWriter, RecordingTransport, ReplayTransport
+)
+from .config import ConfigSnapshot, ServiceConfig, config_manager, current_service_config
+from .deadline import current_deadline, remaining_timeout
+from .disk_cache import SQLiteCache
+from .error_handler import RateLimitedError
+from .metrics import metrics
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy
+from .sidecar import SidecarCache, SidecarClient, SidecarRateLimiter
+from .singleflight import SingleFlight
+from .tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# 所有端点都失败后的降级读取：设置为允许的最大过期秒数时，请求只读取缓存，不访问上游
+current_stale_limit: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "current_stale_limit", default=None
+)
+# 降级读取时记录返回的各缓存条目已过期的秒数，由 FallbackManager 设置为新列表
+current_stale_ages: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "current_stale_ages", default=None
+)
+
+@dataclass
+class PrefetchState:
+    """
+    后台预取的状态，由刷新调度器设置到 current_prefetch 中
+    
+    预取请求跳过新鲜缓存直接访问上游并写入缓存；额度不足时不排队、不返回过期缓存，
+    剩余令牌不超过桶容量的 rate_reserve 比例时放弃，把额度留给用户请求。
+    预取可以加入进行中的相同用户请求，用户请求不会加入预取，以免得到预取的降级行为。
+    """
+    rate_reserve: float = 0.5
+    fetched: int = 0  # 从上游取得的新响应数
+    joined: int = 0  # 加入的进行中用户调用数，数据由用户调用更新
+
+# 后台预取：为 None 时为普通请求
+current_prefetch: contextvars.ContextVar[Optional[PrefetchState]] = contextvars.ContextVar(
+    "current_prefetch", default=None
+)
+
+@dataclass
+class ResponseSources:
+    """
+    一次端点请求中各响应的来源和待写入缓存的响应，由 FallbackManager 设置到 current_response_sources 中
+    
+    只由缓存返回、没有访问上游的请求，其耗时不代表端点的响应速度。上游的 2xx 响应可能只是
+    错误信息，等请求函数成功处理后才由 FallbackManager 调用 commit() 写入缓存。
+    """
+    upstream: int = 0  # 发往上游的请求数（包括失败的尝试）
+    cached: int = 0  # 由缓存（包括过期缓存）返回的响应数
+    pending: List[Callable[[], Awaitable[None]]] = field(default_factory=list)  # 待写入缓存的操作
+    
+    @property
+    def cache_only(self) -> bool:
+        """是否只由缓存返回"""
+        return self.cached > 0 and self.upstream == 0
+    
+    async def commit(self):
+        """写入请求中取得的响应"""
+        pending, self.pending = self.pending, []
+        for write in pending:
+            await write()
+
+current_response_sources: contextvars.ContextVar[Optional[ResponseSources]] = contextvars.ContextVar(
+    "current_response_sources", default=None
+)
+
+def _note_response_source(upstream: bool):
+    """在 current_response_sources 中记录一次响应的来源"""
+    sources = current_response_sources.get()
+    if sources is None:
+        return
+    if upstream:
+        sources.upstream += 1
+    else:
+        sources.cached += 1
+
+# 返回过期缓存时在响应头中标注已过期的秒数
+STALE_HEADER = "x-cache-stale"
+
+class StaleCacheMiss(httpx.RequestError):
+    """降级读取时没有足够新的缓存（请求未发出，不会重试）"""
+
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "发往上游的HTTP请求数（含重试）", ("host", "status")
+)
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "上游HTTP请求耗时", ("host",)
+)
+CACHE_LOOKUPS = metrics.counter(
+    "http_cache_lookups_total", "响应缓存查询结果", ("result",)
+)
+
+FAULT_INJECTIONS = metrics.counter(
+    "fault_injections_total", "注入的上游故障次数", ("host", "fault")
+)
+
+# 注入故障使用的延迟分布
+LATENCY_DISTRIBUTIONS = ("uniform", "exponential", "lognormal")
+
+@dataclass(frozen=True)
+class FaultRule:
+    """
+    单个上游主机的故障注入规则
+    
+    每次请求先按延迟分布等待，再按概率依次判定超时、连接重置、HTTP错误和
+    响应体损坏（各概率之和不超过1），都未命中时正常转发。
+    """
+    latency: float = 0.0                # 额外延迟（秒）：uniform 为下限，exponential 为均值，lognormal 为中位数
+    jitter: float = 0.0                 # uniform 为叠加的随机范围（秒），lognormal 为对数标准差
+    latency_distribution: str = "uniform"
+    timeout_rate: float = 0.0           # 挂起直到请求超时
+    reset_rate: float = 0.0             # 连接被重置
+    error_rate: float = 0.0             # 返回 error_status
+    error_status: int = 503
+    retry_after: Optional[float] = None # 错误响应附带的 Retry-After（秒）
+    malformed_rate: float = 0.0         # 正常转发但截断响应体
+    
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "FaultRule":
+        """从配置字典创建并校验，未知字段报错"""
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"未知的故障注入参数: {', '.join(sorted(unknown))}")
+        rule = cls(**data)
+        rates = (rule.timeout_rate, rule.reset_rate, rule.error_rate, rule.malformed_rate)
+        if any(r < 0 for r in rates) or sum(rates) > 1:
+            raise ValueError("故障概率必须为非负数且总和不超过1")
+        if rule.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"未知的延迟分布: {rule.latency_distribution}")
+        return rule
+
+def load_fault_rules(value: Union[str, Mapping[str, Any]]) -> Dict[str, FaultRule]:
+    """
+    解析故障注入规则：主机（可用 * 通配）-> 规则
+    
+    Args:
+        value: 规则字典、JSON 字符串或 JSON 文件路径
+    """
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return {}
+        if not text.startswith("{"):
+            with open(text, encoding="utf-8") as f:
+                text = f.read()
+        value = json.loads(text)
+    return {host: FaultRule.from_dict(rule) for host, rule in value.items()}
+
+class FaultInjectionTransport(httpx.AsyncBaseTransport):
+    """
+    故障注入传输层：按主机规则注入延迟、超时、连接重置、HTTP错误和损坏的响应体
+    
+    用于验证备用端点切换、重试、对冲请求和熔断器在上游异常时的行为。
+    未匹配任何规则的主机直接转发。
+    
+    Args:
+        rules: 主机（可用 * 通配，精确匹配优先）-> 规则
+        inner: 实际发送请求的传输层
+        seed: 随机数种子，用于复现
+    """
+    
+    def __init__(self, rules: Mapping[str, FaultRule], inner: httpx.AsyncBaseTransport,
+                 seed: Optional[int] = None):
+        self.inner = inner
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.set_rules(rules)
+    
+    def set_rules(self, rules: Mapping[str, FaultRule]):
+        """替换规则"""
+        self.rules = dict(rules)
+        self._matched: Dict[str, Optional[FaultRule]] = {}
+    
+    def rule_for(self, host: str) -> Optional[FaultRule]:
+        """主机对应的规则"""
+        if host not in self._matched:
+            rule = self.rules.get(host)
+            if rule is None:
+                rule = next((r for pattern, r in self.rules.items() if fnmatch.fnmatchcase(host, pattern)), None)
+            self._matched[host] = rule
+        return self._matched[host]
+    
+    def _draw(self, rule: FaultRule) -> Tuple[float, float]:
+        """抽取本次请求的额外延迟和判定故障用的随机数"""
+        with self._lock:
+            if rule.latency_distribution == "exponential":
+                delay = self._random.expovariate(1 / rule.latency) if rule.latency > 0 else 0.0
+            elif rule.latency_distribution == "lognormal":
+                delay = rule.latency * self._random.lognormvariate(0, rule.jitter) if rule.latency > 0 else 0.0
+            else:
+                delay = rule.latency + self._random.uniform(0, rule.jitter)
+            return delay, self._random.random()
+    
+    @staticmethod
+    def _inject(host: str, fault: str):
+        FAULT_INJECTIONS.labels(host, fault).inc()
+        tracer.current().set_attribute("fault", fault)
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        rule = self.rule_for(host)
+        if rule is None:
+            return await self.inner.handle_async_request(request)
+        
+        read_timeout = (request.extensions.get("timeout") or {}).get("read")
+        delay, roll = self._draw(rule)
+        if delay > 0:
+            self._inject(host, "latency")
+            if read_timeout is not None and delay >= read_timeout:
+                await asyncio.sleep(read_timeout)
+                raise httpx.ReadTimeout("注入的延迟超过读超时", request=request)
+            await asyncio.sleep(delay)
+        
+        if roll < rule.timeout_rate:
+            self._inject(host, "timeout")
+            # 模拟上游挂起：等到读超时；没有超时设置时等待至请求被取消
+            await asyncio.sleep(read_timeout if read_timeout is not None else float("inf"))
+            raise httpx.ReadTimeout("注入的超时", request=request)
+        roll -= rule.timeout_rate
+        if roll < rule.reset_rate:
+            self._inject(host, "reset")
+            raise httpx.ReadError("注入的连接重置", request=request)
+        roll -= rule.reset_rate
+        if roll < rule.error_rate:
+            self._inject(host, "status")
+            headers = {"Retry-After": str(rule.retry_after)} if rule.retry_after is not None else {}
+            return httpx.Response(rule.error_status, headers=headers, text="injected fault", request=request)
+        roll -= rule.error_rate
+        
+        response = await self.inner.handle_async_request(request)
+        if roll >= rule.malformed_rate:
+            return response
+        self._inject(host, "malformed")
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        # 截断后的响应体已解码，去掉编码和长度头
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        return httpx.Response(response.status_code, headers=headers,
+                              content=content[:len(content) // 2], request=request)
+    
+    async def aclose(self):
+        await self.inner.aclose()
+
 class HTTPClientManager:
     """HTTP客户端管理器"""
     
-    def __init__(self):
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[CacheBackend] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 limits: Optional[httpx.Limits] = None):
         self._client: Optional[httpx.Client] = None
-        self._async_client: Optional[httpx.AsyncClient] = None
+        self._transport = transport
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.limits = limits or httpx.Limits(max_keepalive_connections=10, max_connections=20)
+        self.singleflight = SingleFlight()
+        # 异步客户端的连接池绑定在创建它的事件循环上，因此按事件循环分别维护；
+        # 连接池参数变化时递增代数，各事件循环在下次使用时替换客户端
+        self._generation = 0
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[int, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._retiring: Set["asyncio.Task[None]"] = set()
+        # 被替换的客户端在该时间（秒）后关闭，让进行中的请求先完成
+        self.retire_delay = 30.0
+        # 录制或回放中的录像，以及开始前的传输层
+        self.cassette: Optional[Union[CassetteWriter, CassetteReader]] = None
+        self._cassette_mode = ""
+        self._pre_cassette_transport: Optional[httpx.AsyncBaseTransport] = None
+        # 故障注入传输层，启用后一直保留，关闭时若被其他传输层包装则只清空规则
+        self.faults: Optional[FaultInjectionTransport] = None
+        # 共享状态进程客户端，启用后缓存和限流器由多个进程共享
+        self.sidecar: Optional[SidecarClient] = None
+        # 持久化缓存，启用后作为最后一级缓存，进程重启后仍可读取
+        self.disk_cache: Optional[SQLiteCache] = None
+        # 正在后台刷新的缓存条目
+        self._revalidating: Dict[str, "asyncio.Task[httpx.Response]"] = {}
     
     @property
     def client(self) -> httpx.Client:
@@ -20,10 +310,7 @@ class HTTPClientManager:
         if self._client is None:
             self._client = httpx.Client(
                 timeout=5.0,
-                limits=httpx.Limits(
-                    max_keepalive_connections=10,
-                    max_connections=20
-                ),
+                limits=self.limits,
                 headers={
                     "User-Agent": "Free-API-MCP/1.0"
                 }
@@ -32,54 +319,548 @@ class HTTPClientManager:
     
     @property
     def async_client(self) -> httpx.AsyncClient:
-        """获取异步HTTP客户端"""
-        if self._async_client is None:
-            self._async_client = httpx.AsyncClient(
+        """获取当前事件循环对应的异步HTTP客户端"""
+        loop = asyncio.get_running_loop()
+        generation, client = self._async_clients.get(loop, (None, None))
+        if client is None or client.is_closed or generation != self._generation:
+            if client is not None and not client.is_closed:
+                self._retire(loop, client)
+            client = httpx.AsyncClient(
+                transport=self._transport,
                 timeout=5.0,
-                limits=httpx.Limits(
-                    max_keepalive_connections=10,
-                    max_connections=20
-                ),
+                limits=self.limits,
                 headers={
                     "User-Agent": "Free-API-MCP/1.0"
                 }
             )
-        return self._async_client
+            self._async_clients[loop] = (self._generation, client)
+        return client
+    
+    def _retire(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+        """延迟关闭被替换的客户端"""
+        async def close_later():
+            await asyncio.sleep(self.retire_delay)
+            await client.aclose()
+        
+        task = loop.create_task(close_later())
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+    
+    def set_transport(self, transport: Optional[httpx.AsyncBaseTransport]) -> Optional[httpx.AsyncBaseTransport]:
+        """
+        替换异步客户端使用的传输层（如测试或压测中的本地替身上游）
+        
+        各事件循环在下一次请求时换用新客户端，旧客户端延迟关闭。
+        
+        Returns:
+            原来的传输层
+        """
+        previous, self._transport = self._transport, transport
+        self._generation += 1
+        return previous
+    
+    def _inner_transport(self) -> httpx.AsyncBaseTransport:
+        """包装用的实际传输层：已设置的传输层，或按连接池参数新建的默认传输层"""
+        return self._transport if self._transport is not None else httpx.AsyncHTTPTransport(limits=self.limits)
+    
+    def enable_fault_injection(self, rules: Mapping[str, FaultRule],
+                               seed: Optional[int] = None) -> FaultInjectionTransport:
+        """
+        启用故障注入；已启用时只替换规则
+        
+        Args:
+            rules: 主机（可用 * 通配）-> 故障规则，见 load_fault_rules
+            seed: 随机数种子
+        """
+        if self.faults is not None:
+            self.faults.set_rules(rules)
+            if seed is not None:
+                self.faults._random.seed(seed)
+            return self.faults
+        self.faults = FaultInjectionTransport(rules, self._inner_transport(), seed)
+        self.set_transport(self.faults)
+        logger.warning("已启用上游故障注入: %s", ", ".join(sorted(rules)) or "无规则")
+        return self.faults
+    
+    def disable_fault_injection(self):
+        """关闭故障注入，恢复原来的传输层"""
+        faults, self.faults = self.faults, None
+        if faults is None:
+            return
+        if self._transport is faults:
+            self.set_transport(faults.inner)
+        else:
+            # 之后又被录制等传输层包装，保留在链中但不再注入
+            faults.set_rules({})
+    
+    def configure_faults(self, settings: Mapping[str, Any]) -> bool:
+        """
+        按配置（enable_fault_injection / fault_rules）启用或关闭故障注入
+        
+        Returns:
+            是否启用了故障注入
+        """
+        if settings["enable_fault_injection"]:
+            self.enable_fault_injection(load_fault_rules(settings["fault_rules"]))
+        else:
+            self.disable_fault_injection()
+        return self.faults is not None
+    
+    def start_recording(self, path: str) -> CassetteWriter:
+        """
+        开始录制上游流量，之后发出的请求和响应写入录像文件
+        
+        Args:
+            path: 录像文件路径，已存在时覆盖
+        """
+        self.stop_cassette()
+        writer = CassetteWriter(path)
+        self._pre_cassette_transport = self.set_transport(RecordingTransport(writer, self._inner_transport()))
+        self.cassette, self._cassette_mode = writer, "record"
+        return writer
+    
+    def start_replay(self, path: str, timing: str = TIMING_ORIGINAL) -> CassetteReader:
+        """
+        开始回放录像，之后的请求由录像响应，不访问网络
+        
+        Args:
+            path: 录像文件路径
+            timing: original 按录制时的耗时返回，fast 立即返回
+        """
+        reader = CassetteReader(path)
+        try:
+            transport = ReplayTransport(reader, timing)
+        except ValueError:
+            reader.close()
+            raise
+        self.stop_cassette()
+        self._pre_cassette_transport = self.set_transport(transport)
+        self.cassette, self._cassette_mode = reader, "replay"
+        return reader
+    
+    def stop_cassette(self):
+        """停止录制或回放，恢复原来的传输层；录制的录像在此时写入索引"""
+        cassette, self.cassette = self.cassette, None
+        if cassette is None:
+            return
+        self.set_transport(self._pre_cassette_transport)
+        self._pre_cassette_transport = None
+        self._cassette_mode = ""
+        cassette.close()
+    
+    def configure_cassette(self, settings: Mapping[str, Any]) -> bool:
+        """
+        按配置（cassette_mode / cassette_file / cassette_timing）开始或停止录制、回放
+        
+        Returns:
+            是否处于录制或回放状态
+        """
+        mode = settings["cassette_mode"]
+        if mode == "record":
+            self.start_recording(settings["cassette_file"])
+        elif mode == "replay":
+            self.start_replay(settings["cassette_file"], settings["cassette_timing"])
+        else:
+            if mode:
+                logger.warning("未知的录像模式，已忽略: %s", mode)
+            self.stop_cassette()
+        return self.cassette is not None
+    
+    def _new_cache(self, settings: Mapping[str, Any]) -> LRUCache:
+        """
+        按配置创建响应缓存
+        
+        内存缓存之后依次为共享状态进程中的缓存和磁盘缓存（已启用时），
+        有磁盘缓存时把其中最常用的条目预先载入内存。
+        """
+        tiers = []
+        if self.sidecar is not None:
+            tiers.append(SidecarCache(self.sidecar))
+        if self.disk_cache is not None:
+            tiers.append(self.disk_cache)
+        if not tiers:
+            return LRUCache(max_entries=settings["cache_max_entries"], max_bytes=settings["cache_max_bytes"])
+        cache = TieredCache(*tiers, max_entries=settings["cache_max_entries"], max_bytes=settings["cache_max_bytes"])
+        if self.disk_cache is not None:
+            warmed = cache.warm(min(settings["disk_cache_warm_entries"], settings["cache_max_entries"]))
+            if warmed:
+                logger.info("从磁盘缓存预热 %d 个条目", warmed)
+        return cache
+    
+    def _new_rate_limiter(self, settings: Mapping[str, Any]) -> RateLimiter:
+        """按配置创建限流器，启用共享状态进程时令牌桶由各进程共享"""
+        if self.sidecar is not None:
+            return SidecarRateLimiter(self.sidecar, max_wait=settings["rate_limit_max_wait"])
+        return RateLimiter(max_wait=settings["rate_limit_max_wait"])
+    
+    def configure_sidecar(self, settings: Mapping[str, Any]) -> bool:
+        """
+        按配置连接或断开共享状态进程（SIDECAR_SOCKET 为空表示不使用）
+        
+        切换时重建缓存和限流器，进程内已缓存的条目和令牌桶状态不保留。
+        
+        Returns:
+            是否启用了共享状态进程
+        """
+        path = settings["sidecar_socket"]
+        previous = self.sidecar
+        if not path:
+            self.sidecar = None
+        elif previous is None or previous.path != path:
+            self.sidecar = SidecarClient(path, timeout=settings["sidecar_timeout"],
+                                         retry_interval=settings["sidecar_retry_interval"])
+        else:
+            previous.timeout = settings["sidecar_timeout"]
+            previous.retry_interval = settings["sidecar_retry_interval"]
+        if self.sidecar is previous:
+            return self.sidecar is not None
+        
+        if self.cache is not None:
+            self.cache = self._new_cache(settings)
+        if self.rate_limiter is not None:
+            self.rate_limiter = self._new_rate_limiter(settings)
+        if previous is not None:
+            previous.close()
+        if self.sidecar is not None:
+            logger.info("使用共享状态进程: %s", path)
+        return self.sidecar is not None
+    
+    def configure_disk_cache(self, settings: Mapping[str, Any]) -> bool:
+        """
+        按配置打开或关闭磁盘缓存（DISK_CACHE_FILE 为空表示不使用）
+        
+        数据库文件变化时重建响应缓存并从磁盘预热；数据库无法打开时只记录警告。
+        
+        Returns:
+            是否启用了磁盘缓存
+        """
+        path = settings["disk_cache_file"]
+        previous = self.disk_cache
+        if previous is not None and previous.path == path:
+            previous.max_bytes = settings["disk_cache_max_bytes"]
+            previous.max_stale = settings["disk_cache_max_stale"]
+            return True
+        self.disk_cache = None
+        if path:
+            try:
+                self.disk_cache = SQLiteCache(path, max_bytes=settings["disk_cache_max_bytes"],
+                                              max_stale=settings["disk_cache_max_stale"])
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("无法打开磁盘缓存 %s: %s", path, e)
+        if self.cache is not None and (previous is not None or self.disk_cache is not None):
+            self.cache = self._new_cache(settings)
+        if previous is not None:
+            previous.close()
+        if self.disk_cache is not None:
+            logger.info("使用磁盘缓存: %s", path)
+        return self.disk_cache is not None
+    
+    def apply_config(self, old: ConfigSnapshot, new: ConfigSnapshot):
+        """
+        配置重新加载后更新连接池、缓存和限流设置
+        
+        连接池参数变化时，各事件循环在下一次请求时换用新客户端，旧客户端延迟关闭。
+        """
+        settings = new.settings
+        limits = httpx.Limits(
+            max_keepalive_connections=settings["http_max_keepalive"],
+            max_connections=settings["http_max_connections"]
+        )
+        if limits != self.limits:
+            self.limits = limits
+            self._generation += 1
+            # 同步客户端可能正在其他线程中使用，只丢弃引用，下次使用时按新参数创建
+            self._client = None
+        self.retire_delay = settings["tool_deadline"]
+        
+        sidecar_keys = ("sidecar_socket", "sidecar_timeout", "sidecar_retry_interval")
+        if any(settings[k] != old.settings.get(k) for k in sidecar_keys):
+            self.configure_sidecar(settings)
+        
+        disk_keys = ("disk_cache_file", "disk_cache_max_bytes", "disk_cache_max_stale")
+        if any(settings[k] != old.settings.get(k) for k in disk_keys):
+            self.configure_disk_cache(settings)
+        
+        if not settings["enable_cache"]:
+            self.cache = None
+        elif self.cache is None:
+            self.cache = self._new_cache(settings)
+        elif isinstance(self.cache, LRUCache):
+            self.cache.resize(settings["cache_max_entries"], settings["cache_max_bytes"])
+        
+        if not settings["enable_rate_limit"]:
+            self.rate_limiter = None
+        elif self.rate_limiter is None:
+            self.rate_limiter = self._new_rate_limiter(settings)
+        else:
+            self.rate_limiter.max_wait = settings["rate_limit_max_wait"]
+        
+        fault_keys = ("enable_fault_injection", "fault_rules")
+        if any(settings[k] != old.settings.get(k) for k in fault_keys):
+            self.configure_faults(settings)
+        
+        cassette_keys = ("cassette_mode", "cassette_file", "cassette_timing")
+        if any(settings[k] != old.settings.get(k) for k in cassette_keys):
+            self.configure_cassette(settings)
     
     def close(self):
-        """关闭客户端连接"""
+        """关闭同步客户端连接（异步客户端请使用 aclose）"""
         if self._client:
             self._client.close()
-        if self._async_client:
-            # 注意：异步客户端需要在异步上下文中关闭
-            pass
+            self._client = None
     
-    def get(self, url: str, params: Optional[Dict[str, Any]] = None, 
-            headers: Optional[Dict[str, str]] = None, timeout: float = 5.0) -> httpx.Response:
+    async def aclose(self):
+        """关闭当前事件循环的异步客户端连接"""
+        loop = asyncio.get_running_loop()
+        _, client = self._async_clients.pop(loop, (None, None))
+        if client is not None:
+            await client.aclose()
+    
+    def _resolve_cache_ttl(self, cache_ttl: Optional[float]) -> float:
+        """确定本次请求的缓存有效期：显式参数优先，其次为当前服务配置"""
+        if self.cache is None:
+            return 0
+        if cache_ttl is not None:
+            return cache_ttl
+        service_config = current_service_config.get()
+        return service_config.cache_ttl if service_config is not None else 0
+    
+    def _apply_rate_limits(self, service_config: Optional[ServiceConfig]):
+        """按当前服务配置设置各上游主机的令牌桶"""
+        if self.rate_limiter is None or service_config is None:
+            return
+        for host, limit in service_config.rate_limits.items():
+            self.rate_limiter.configure(host, limit)
+    
+    async def get_async(self, url: str, params: Optional[Dict[str, Any]] = None,
+                        headers: Optional[Dict[str, str]] = None, timeout: float = 5.0,
+                        cache_ttl: Optional[float] = None) -> httpx.Response:
         """
-        发送GET请求
+        异步发送GET请求
         
         Args:
             url: 请求URL
             params: 查询参数
             headers: 请求头
             timeout: 超时时间
-            
+            cache_ttl: 响应缓存有效期（秒），默认使用当前服务配置的 cache_ttl
+        
+        过期不超过服务配置的 stale_while_revalidate 秒的缓存直接返回并在后台刷新，
+        返回过期缓存时响应头 x-cache-stale 为已过期的秒数。设置了 current_prefetch 时
+        跳过缓存查询，直接请求上游并更新缓存。
+        
         Returns:
             HTTP响应对象
         """
-        try:
-            response = self.client.get(
-                url, 
-                params=params, 
-                headers=headers, 
-                timeout=timeout
-            )
-            response.raise_for_status()
+        ttl = self._resolve_cache_ttl(cache_ttl)
+        request_key = make_cache_key(url, params, headers)
+        stale_limit = current_stale_limit.get()
+        if stale_limit is not None:
+            return await self._serve_stale(request_key, stale_limit, url)
+        
+        service_config = current_service_config.get()
+        prefetch = current_prefetch.get()
+        revalidating: Optional[CacheEntry] = None
+        if ttl > 0 and prefetch is None:
+            entry = await self.cache.get_async(request_key)
+            if entry is not None:
+                logger.debug("缓存命中: %s", request_key)
+                CACHE_LOOKUPS.labels("hit").inc()
+                tracer.current().set_attribute("cache", "hit")
+                _note_response_source(upstream=False)
+                return entry.to_response()
+            window = service_config.stale_while_revalidate if service_config is not None else 0
+            stale = await self.cache.get_stale_async(request_key) if window > 0 else None
+            if stale is not None and stale.staleness() <= window:
+                revalidating = stale
+            else:
+                CACHE_LOOKUPS.labels("miss").inc()
+        
+        self._apply_rate_limits(service_config)
+        parsed_url = httpx.URL(url)
+        host = parsed_url.host
+        attempt = 0
+        
+        async def send() -> httpx.Response:
+            nonlocal attempt
+            attempt += 1
+            # span 只记录主机和路径，避免查询参数中的密钥写入调用链
+            with tracer.span("http GET", host=host, path=parsed_url.path, attempt=attempt) as span:
+                if self.rate_limiter is not None:
+                    if prefetch is not None:
+                        await self.rate_limiter.acquire(host, 0, reserve=prefetch.rate_reserve)
+                    else:
+                        deadline = current_deadline.get()
+                        max_wait = self.rate_limiter.max_wait
+                        if deadline is not None:
+                            max_wait = min(max_wait, deadline.remaining())
+                        await self.rate_limiter.acquire(host, max_wait)
+                # 每次尝试只使用剩余的时间预算
+                attempt_timeout = remaining_timeout(timeout)
+                start = time.perf_counter()
+                status = "error"
+                try:
+                    response = await self.async_client.get(
+                        url, 
+                        params=params, 
+                        headers=headers, 
+                        timeout=attempt_timeout
+                    )
+                    status = str(response.status_code)
+                    span.set_attribute("status", response.status_code)
+                    span.set_attribute("bytes", len(response.content))
+                    if response.status_code == 429 and self.rate_limiter is not None:
+                        self.rate_limiter.drain(host)
+                    response.raise_for_status()
+                except Exception as e:
+                    logger.error("HTTP GET error for %s: %s", url, e)
+                    raise
+                finally:
+                    HTTP_REQUESTS.labels(host, status).inc()
+                    HTTP_LATENCY.labels(host).observe(time.perf_counter() - start)
+                    _note_response_source(upstream=True)
+                return response
+        
+        retry_policy = RetryPolicy.for_service(service_config)
+        
+        async def fetch() -> httpx.Response:
+            try:
+                response = await retry_policy.run(send, url)
+            except RateLimitedError:
+                # 额度不足时优先返回过期缓存（服务配置了 stale_if_error 时不超过该过期时间），
+                # 没有缓存则交给上层切换备用端点
+                if prefetch is not None:
+                    raise
+                stale = await self.cache.get_stale_async(request_key) if self.cache is not None else None
+                limit = service_config.stale_if_error if service_config is not None else 0
+                if stale is None or (limit > 0 and stale.staleness() > limit):
+                    raise
+                logger.info("上游限流，返回过期缓存: %s", url)
+                CACHE_LOOKUPS.labels("stale").inc()
+                tracer.current().set_attribute("cache", "stale")
+                _note_response_source(upstream=False)
+                return self._stale_response(stale)
+            if ttl > 0:
+                entry = CacheEntry.from_response(response, ttl)
+                sources = current_response_sources.get()
+                if sources is not None:
+                    # 请求函数成功处理响应后才写入，不缓存 2xx 的错误信息
+                    sources.pending.append(lambda: self.cache.set_async(request_key, entry))
+                else:
+                    await self.cache.set_async(request_key, entry)
             return response
-        except Exception as e:
-            logger.error(f"HTTP GET error for {url}: {e}")
-            raise
+        
+        if revalidating is not None:
+            # 过期不久的条目直接返回，同时在后台刷新
+            self._revalidate(request_key, fetch)
+            CACHE_LOOKUPS.labels("revalidate").inc()
+            tracer.current().set_attribute("cache", "revalidate")
+            _note_response_source(upstream=False)
+            return self._stale_response(revalidating)
+        
+        # 相同的并发请求共享同一次上游调用；预取使用单独的键，用户请求不会加入预取
+        flight_key: Hashable = request_key
+        if prefetch is not None and not self.singleflight.running(request_key):
+            flight_key = ("prefetch", request_key)
+        response = await self.singleflight.do(flight_key, fetch)
+        if prefetch is not None and STALE_HEADER not in response.headers:
+            prefetch.fetched += 1
+        return response
+    
+    @staticmethod
+    def _stale_response(entry: CacheEntry) -> httpx.Response:
+        """由过期条目重建响应，并在响应头中标注已过期的秒数"""
+        response = entry.to_response()
+        response.headers[STALE_HEADER] = str(int(max(0.0, entry.staleness())))
+        return response
+    
+    async def _serve_stale(self, request_key: str, limit: float, url: str) -> httpx.Response:
+        """
+        降级读取：只返回过期不超过 limit 秒的缓存，不访问上游
+        
+        Raises:
+            StaleCacheMiss: 没有足够新的缓存
+        """
+        entry = await self.cache.get_stale_async(request_key) if self.cache is not None else None
+        if entry is None or entry.staleness() > limit:
+            parsed = httpx.URL(url)
+            raise StaleCacheMiss(f"没有可用的缓存: {parsed.host}{parsed.path}", request=httpx.Request("GET", url))
+        CACHE_LOOKUPS.labels("stale").inc()
+        tracer.current().set_attribute("cache", "stale")
+        _note_response_source(upstream=False)
+        ages = current_stale_ages.get()
+        if ages is not None:
+            ages.append(max(0.0, entry.staleness()))
+        return self._stale_response(entry)
+    
+    def _revalidate(self, request_key: str, fetch: Callable[[], Awaitable[httpx.Response]]):
+        """在后台刷新缓存条目，同一条目同时只刷新一次"""
+        if request_key in self._revalidating:
+            return
+        # 后台刷新不受本次调用的时间预算限制，并作为独立的调用链记录；
+        # 刷新结果没有请求函数处理，直接写入缓存
+        context = contextvars.copy_context()
+        context.run(current_deadline.set, None)
+        context.run(current_response_sources.set, None)
+        context.run(tracer.detach)
+        task = asyncio.get_running_loop().create_task(self.singleflight.do(request_key, fetch), context=context)
+        self._revalidating[request_key] = task
+        
+        def done(task: "asyncio.Task[httpx.Response]"):
+            self._revalidating.pop(request_key, None)
+            if not task.cancelled() and task.exception() is not None:
+                logger.info("后台刷新缓存失败: %s", task.exception())
+        
+        task.add_done_callback(done)
+    
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, 
+            headers: Optional[Dict[str, str]] = None, timeout: float = 5.0,
+            cache_ttl: Optional[float] = None) -> httpx.Response:
+        """
+        发送GET请求（get_async 的同步包装）
+        
+        Args:
+            url: 请求URL
+            params: 查询参数
+            headers: 请求头
+            timeout: 超时时间
+            cache_ttl: 响应缓存有效期（秒），默认使用当前服务配置的 cache_ttl
+        
+        Returns:
+            HTTP响应对象
+        """
+        return run_sync(self.get_async(url, params=params, headers=headers,
+                                       timeout=timeout, cache_ttl=cache_ttl))
+    
+    def clear_cache(self):
+        """清空响应缓存"""
+        if self.cache is not None:
+            self.cache.clear()
 
 # 全局HTTP客户端管理器实例
-http_manager = HTTPClientManager()
\ No newline at end of file
+http_manager = HTTPClientManager(
+    cache=LRUCache(
+        max_entries=config_manager.get("cache_max_entries"),
+        max_bytes=config_manager.get("cache_max_bytes")
+    ) if config_manager.get("enable_cache") else None,
+    rate_limiter=RateLimiter(
+        max_wait=config_manager.get("rate_limit_max_wait")
+    ) if config_manager.get("enable_rate_limit") else None,
+    limits=httpx.Limits(
+        max_keepalive_connections=config_manager.get("http_max_keepalive"),
+        max_connections=config_manager.get("http_max_connections")
+    )
+)
+http_manager.configure_sidecar(config_manager.snapshot().settings)
+http_manager.configure_disk_cache(config_manager.snapshot().settings)
+config_manager.add_reload_listener(http_manager.apply_config)
+# 退出时关闭录像，写入索引
+atexit.register(http_manager.stop_cassette)
+
+def _cache_stat(name: str) -> float:
+    cache = http_manager.cache
+    return cache.stats().get(name, 0) if cache is not None else 0
+
+metrics.gauge("http_cache_entries", "响应缓存条目数", function=lambda: _cache_stat("entries"))
+metrics.gauge("http_cache_bytes", "响应缓存占用字节数", function=lambda: _cache_stat("bytes"))
+metrics.gauge("http_inflight_requests", "进行中的去重上游请求数", function=lambda: http_manager.singleflight.in_flight())
\ No newline at end of file
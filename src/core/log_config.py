@@ -0,0 +1,120 @@
+"""
+日志配置模块
+
+业务线程只把日志记录放入队列，由 QueueListener 在后台线程写入按大小轮转的日志文件和控制台；
+重复的警告和错误按消息模板限流，避免上游故障时产生日志风暴。
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+class RepeatFilter(logging.Filter):
+    """
+    重复日志限流过滤器
+    
+    同一位置、同一消息模板的日志在 interval 秒内最多输出 burst 条，其余被抑制；
+    下一个时间窗口放行的第一条日志会附带被抑制的条数。低于 min_level 的日志不受限制。
+    """
+    
+    def __init__(self, interval: float = 60.0, burst: int = 5, min_level: int = logging.WARNING,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.min_level = min_level
+        self._clock = clock
+        self._windows: Dict[Hashable, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level or self.interval <= 0:
+            return True
+        
+        # 使用未格式化的消息模板作为键，参数不同的同类日志归为一组
+        key: Tuple[Hashable, ...] = (record.name, record.pathname, record.lineno, str(record.msg))
+        now = self._clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = int(window[2]) if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg}（此前 {self.interval:.0f} 秒内另有 {suppressed} 条相同日志被抑制）"
+                return True
+            window[1] += 1
+            if window[1] <= self.burst:
+                return True
+            window[2] += 1
+            return False
+
+def setup_logging(level: int = logging.INFO,
+                  log_file: Optional[str] = None,
+                  max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5,
+                  repeat_interval: float = 60.0,
+                  repeat_burst: int = 5,
+                  console: bool = True) -> QueueListener:
+    """
+    为根日志记录器配置基于队列的异步日志
+    
+    Args:
+        level: 日志级别
+        log_file: 日志文件路径，为空时不写文件
+        max_bytes: 单个日志文件的大小上限，超过后轮转
+        backup_count: 保留的轮转文件数量
+        repeat_interval: 重复日志限流的时间窗口（秒），0 表示不限流
+        repeat_burst: 每个时间窗口内同一条日志最多输出的次数
+        console: 是否输出到控制台（stderr）
+    
+    Returns:
+        已启动的 QueueListener
+    """
+    global _listener
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: List[logging.Handler] = []
+    if log_file:
+        file_handler = RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+    
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RepeatFilter(interval=repeat_interval, burst=repeat_burst))
+    
+    with _lock:
+        shutdown_logging()
+        root = logging.getLogger()
+        root.setLevel(level)
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    return _listener
+
+def shutdown_logging():
+    """停止后台日志线程，写出队列中剩余的日志并关闭文件"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+atexit.register(shutdown_logging)
\ No newline at end of file
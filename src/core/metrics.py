@@ -0,0 +1,320 @@
+"""
+指标模块
+
+进程内的计数器、仪表和固定分桶直方图。每个标签组合对应一个子指标，首次使用时创建并缓存，
+之后的更新只做一次字典查找和加锁累加；调用方也可以保存 labels() 返回的子指标直接更新。
+"""
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .tracing import tracer
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# 默认耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+    
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+class _GaugeChild:
+    __slots__ = ("value", "_lock")
+    
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+    
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """按分桶线性插值估算分位数，没有样本时返回None"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index >= len(self.buckets):
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+class _Metric:
+    """带标签的指标基类"""
+    
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def labels(self, *values: str):
+        """获取标签值对应的子指标"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+        return child
+    
+    def children(self) -> Iterator[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return iter(list(self._children.items()))
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    
+    kind = "counter"
+    
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1.0):
+        """无标签计数器加 amount"""
+        self.labels().inc(amount)
+
+class Gauge(_Metric):
+    """
+    仪表
+    
+    可以直接设置数值，也可以提供回调函数，在采集时读取当前值。
+    """
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+    
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+    
+    def set(self, value: float):
+        """设置无标签仪表的值"""
+        self.labels().set(value)
+    
+    def children(self) -> Iterator[Tuple[Tuple[str, ...], object]]:
+        if self.function is not None:
+            child = _GaugeChild()
+            try:
+                child.set(float(self.function()))
+            except Exception:
+                child.set(math.nan)
+            return iter([((), child)])
+        return super().children()
+
+class Histogram(_Metric):
+    """固定分桶直方图"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        """无标签直方图记录一个样本"""
+        self.labels().observe(value)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class MetricsRegistry:
+    """指标注册表"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"指标 {metric.name} 已注册为 {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """注册（或获取已注册的）计数器"""
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        """注册（或获取已注册的）仪表"""
+        gauge = self._register(Gauge(name, documentation, labelnames, function))
+        if function is not None:
+            gauge.function = function
+        return gauge
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """注册（或获取已注册的）直方图"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def get(self, name: str) -> Optional[_Metric]:
+        """按名称获取指标"""
+        return self._metrics.get(name)
+    
+    def collect(self) -> List[_Metric]:
+        """所有已注册的指标（按名称排序）"""
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+    
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式导出所有指标"""
+        lines: List[str] = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for values, child in metric.children():
+                if isinstance(child, _HistogramChild):
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (math.inf,), list(child.counts)):
+                        cumulative += count
+                        labels = _format_labels(metric.labelnames, values, f'le="{_format_value(bound)}"')
+                        lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                    labels = _format_labels(metric.labelnames, values)
+                    lines.append(f"{metric.name}_sum{labels} {_format_value(child.sum)}")
+                    lines.append(f"{metric.name}_count{labels} {child.count}")
+                else:
+                    labels = _format_labels(metric.labelnames, values)
+                    lines.append(f"{metric.name}{labels} {_format_value(child.value)}")
+        return "\n".join(lines) + "\n"
+    
+    def render_summary(self) -> str:
+        """以便于阅读的文本格式汇总有数据的指标"""
+        lines: List[str] = []
+        for metric in self.collect():
+            rows = []
+            for values, child in metric.children():
+                label = ",".join(f"{n}={v}" for n, v in zip(metric.labelnames, values)) or "-"
+                if isinstance(child, _HistogramChild):
+                    if child.count == 0:
+                        continue
+                    p50, p95 = child.quantile(0.5), child.quantile(0.95)
+                    rows.append(
+                        f"  {label}: {child.count}次, 平均 {child.sum / child.count * 1000:.0f}ms, "
+                        f"p50≈{p50 * 1000:.0f}ms, p95≈{p95 * 1000:.0f}ms"
+                    )
+                elif child.value:
+                    rows.append(f"  {label}: {_format_value(child.value)}")
+            if rows:
+                lines.append(f"{metric.name}（{metric.documentation}）")
+                lines.extend(rows)
+        return "\n".join(lines) if lines else "暂无指标数据"
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+TOOL_CALLS = metrics.counter("tool_calls_total", "MCP工具调用次数", ("tool", "outcome"))
+TOOL_LATENCY = metrics.histogram("tool_duration_seconds", "MCP工具调用耗时", ("tool",))
+
+def instrument_tool(func: F) -> F:
+    """记录工具调用次数和耗时并开启调用链根 span 的装饰器，支持同步和异步函数"""
+    name = func.__name__
+    ok = TOOL_CALLS.labels(name, "ok")
+    failed = TOOL_CALLS.labels(name, "exception")
+    latency = TOOL_LATENCY.labels(name)
+    
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                with tracer.span(f"tool {name}", tool=name):
+                    result = await func(*args, **kwargs)
+            except BaseException:
+                failed.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - start)
+            ok.inc()
+            return result
+        return async_wrapper  # type: ignore[return-value]
+    
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            with tracer.span(f"tool {name}", tool=name):
+                result = func(*args, **kwargs)
+        except BaseException:
+            failed.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - start)
+        ok.inc()
+        return result
+    return wrapper  # type: ignore[return-value]
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+上游限流模块
+
+按主机维护令牌桶，在请求发出前预先限流，避免把注定返回429的请求发给有免费额度限制的上游。
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .config import RateLimit
+from .error_handler import RateLimitedError
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = metrics.counter("rate_limited_total", "因额度不足未发出的上游请求数", ("host",))
+
+class TokenBucket:
+    """
+    令牌桶
+    
+    容量决定允许的突发请求数，令牌按固定速率补充。
+    """
+    
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量
+            clock: 时钟函数，便于测试
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_limit(cls, limit: RateLimit, clock: Callable[[], float] = time.monotonic) -> "TokenBucket":
+        """
+        根据上游额度创建令牌桶
+        
+        突发容量与补充速率之和不超过额度，保证任意一个周期内的请求数都不超过上游限制。
+        """
+        capacity = limit.burst if limit.burst is not None else max(1.0, limit.requests * 0.1)
+        capacity = min(capacity, limit.requests)
+        rate = (limit.requests - capacity) / limit.period if limit.requests > capacity else limit.requests / limit.period
+        return cls(rate=rate, capacity=capacity, clock=clock)
+    
+    def _refill(self):
+        """补充令牌（调用方需持有锁）"""
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def try_acquire(self) -> float:
+        """
+        尝试取出一个令牌
+        
+        Returns:
+            0 表示成功取得令牌；否则为令牌可用前需要等待的秒数
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate if self.rate > 0 else float("inf")
+    
+    async def try_acquire_async(self) -> float:
+        """在事件循环中取令牌，返回值同 try_acquire；令牌不在本进程内存中的实现不应阻塞事件循环"""
+        return self.try_acquire()
+    
+    def drain(self):
+        """清空令牌，上游返回429时调用，让后续请求直接切换备用端点"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0)
+    
+    @property
+    def tokens(self) -> float:
+        """当前可用令牌数"""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+class RateLimiter:
+    """按主机管理令牌桶"""
+    
+    def __init__(self, max_wait: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_wait: 令牌不足时最多排队等待的秒数，超过则放弃请求
+            clock: 时钟函数，便于测试
+        """
+        self.max_wait = max_wait
+        self._clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._limits: Dict[str, RateLimit] = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+    
+    def configure(self, host: str, limit: RateLimit) -> TokenBucket:
+        """为主机设置额度，额度变化时重建令牌桶"""
+        with self._lock:
+            if self._limits.get(host) != limit:
+                self._limits[host] = limit
+                self._buckets[host] = self._make_bucket(host, limit)
+            return self._buckets[host]
+    
+    def _make_bucket(self, host: str, limit: RateLimit) -> TokenBucket:
+        """创建主机的令牌桶，子类可替换为其他实现（如多进程共享的令牌桶）"""
+        return TokenBucket.from_limit(limit, self._clock)
+    
+    def get(self, host: str) -> Optional[TokenBucket]:
+        """获取主机的令牌桶，未配置额度时返回None"""
+        return self._buckets.get(host)
+    
+    async def acquire(self, host: str, max_wait: Optional[float] = None, reserve: float = 0.0):
+        """
+        为一次请求取得令牌
+        
+        令牌不足时在 max_wait 内排队等待，等待时间不够则抛出 RateLimitedError。
+        
+        Args:
+            host: 上游主机
+            max_wait: 最长等待秒数，默认使用 self.max_wait
+            reserve: 保留给其他请求的令牌比例（0~1），剩余令牌不超过桶容量的该比例时直接拒绝，
+                     供后台刷新等可推迟的请求使用
+        """
+        bucket = self.get(host)
+        if bucket is None:
+            return
+        if reserve > 0:
+            missing = 1 + reserve * bucket.capacity - bucket.tokens
+            if missing > 0:
+                self.rejected += 1
+                RATE_LIMITED.labels(host).inc()
+                raise RateLimitedError(host, missing / bucket.rate if bucket.rate > 0 else float("inf"))
+        budget = self.max_wait if max_wait is None else max_wait
+        deadline = self._clock() + budget
+        while True:
+            wait = await bucket.try_acquire_async()
+            if wait <= 0:
+                return
+            remaining = deadline - self._clock()
+            if wait > remaining:
+                self.rejected += 1
+                RATE_LIMITED.labels(host).inc()
+                raise RateLimitedError(host, wait)
+            logger.debug("上游限流，排队等待 %.2fs: %s", wait, host)
+            await asyncio.sleep(wait)
+    
+    def drain(self, host: str):
+        """上游返回429时清空该主机的令牌"""
+        bucket = self.get(host)
+        if bucket is not None:
+            bucket.drain()
+    
+    def stats(self) -> Dict[str, Any]:
+        """各主机的可用令牌数和被拒绝的请求数"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {
+            "rejected": self.rejected,
+            "hosts": {host: round(bucket.tokens, 2) for host, bucket in buckets.items()}
+        }
\ No newline at end of file
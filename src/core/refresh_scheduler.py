@@ -0,0 +1,273 @@
+"""
+后台刷新调度模块
+
+汇率表、历史上的今天、新闻头条等数据按已知的节奏变化。服务模块把这些数据集登记到调度器，
+并在每次用户请求时记录请求的键；调度器在缓存过期之前按带随机抖动的间隔主动刷新这些键，
+用户请求因此直接命中缓存，不必等待上游。
+
+刷新在 current_prefetch 上下文中执行：跳过新鲜缓存直接请求上游，额度紧张时放弃本次刷新，
+把令牌留给用户请求；失败后按指数退避重试。超过 idle_after 秒无人请求的键停止刷新，
+再次被请求时恢复。
+"""
+import asyncio
+import datetime
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .async_runner import TaskFuture, submit
+from .config import ConfigManager, ConfigSnapshot, config_manager
+from .http_client import PrefetchState, current_prefetch
+from .metrics import metrics
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+REFRESHES = metrics.counter(
+    "background_refresh_total", "后台刷新结果（success/failure/idle）", ("dataset", "result")
+)
+
+# 刷新间隔下限（秒），避免缓存有效期很短的服务被频繁刷新
+MIN_INTERVAL = 10.0
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    可在后台刷新的数据集
+    
+    Args:
+        name: 数据集名称
+        service: 服务名称，未指定 interval 时按该服务 cache_ttl 的 ttl_ratio 倍刷新
+        refresh: 刷新函数，参数为被请求过的键，通常调用服务的异步查询函数
+        interval: 固定的刷新间隔（秒）
+        ttl_ratio: 按缓存有效期计算间隔时的比例，小于 1 使条目在过期前被替换
+        daily: 数据在本地午夜更新（如历史上的今天），午夜后尽快刷新
+    """
+    name: str
+    service: str
+    refresh: Callable[[Any], Awaitable[Any]]
+    interval: Optional[float] = None
+    ttl_ratio: float = 0.8
+    daily: bool = False
+
+@dataclass
+class RefreshJob:
+    """单个键的刷新状态"""
+    dataset: Dataset
+    key: Hashable
+    last_used: float
+    next_run: float
+    failures: int = 0
+    running: bool = False
+
+class RefreshScheduler:
+    """
+    后台刷新调度器
+    
+    Args:
+        config: 配置管理器，用于读取服务的缓存有效期
+        enabled: 是否刷新
+        idle_after: 键在该秒数内无人请求时停止刷新
+        jitter: 刷新间隔的随机抖动比例，避免大量键同时刷新
+        rate_reserve: 上游主机剩余令牌不超过桶容量的该比例时放弃刷新
+        max_concurrency: 同时进行的刷新数
+        retry_delay: 刷新失败后的首次重试延迟（秒），之后逐次加倍，不超过刷新间隔
+        tick: 调度循环检查到期键的间隔（秒）
+        clock: 时钟函数，便于测试
+    """
+    
+    def __init__(self, config: ConfigManager = config_manager, enabled: bool = True, idle_after: float = 3600.0,
+                 jitter: float = 0.1, rate_reserve: float = 0.5, max_concurrency: int = 2,
+                 retry_delay: float = 30.0, tick: float = 1.0, clock: Callable[[], float] = time.time):
+        self.config = config
+        self.enabled = enabled
+        self.idle_after = idle_after
+        self.jitter = jitter
+        self.rate_reserve = rate_reserve
+        self.max_concurrency = max_concurrency
+        self.retry_delay = retry_delay
+        self.tick = tick
+        self._clock = clock
+        self.datasets: Dict[str, Dataset] = {}
+        self._jobs: Dict[Tuple[str, Hashable], RefreshJob] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[TaskFuture] = None
+        self.refreshed = 0
+        self.failed = 0
+    
+    def register(self, dataset: Dataset) -> Dataset:
+        """登记数据集，同名数据集被替换"""
+        self.datasets[dataset.name] = dataset
+        return dataset
+    
+    def touch(self, name: str, key: Hashable = None):
+        """
+        记录一次用户请求，让该键在之后的间隔内被刷新
+        
+        首次请求由用户请求本身取得数据，从一个刷新间隔之后开始刷新；后台刷新自身的请求不计入。
+        """
+        dataset = self.datasets.get(name)
+        if dataset is None or not self.enabled or current_prefetch.get() is not None:
+            return
+        now = self._clock()
+        with self._lock:
+            job = self._jobs.get((name, key))
+            if job is not None:
+                job.last_used = now
+                return
+        interval = self._interval(dataset, now)
+        if interval is None:
+            return
+        with self._lock:
+            self._jobs.setdefault((name, key), RefreshJob(dataset, key, last_used=now, next_run=now + interval))
+    
+    def _interval(self, dataset: Dataset, now: float) -> Optional[float]:
+        """计算下一次刷新的间隔；服务未启用缓存时刷新没有意义，返回 None"""
+        if dataset.interval is not None:
+            interval = dataset.interval
+        else:
+            service_config = self.config.get_service_config(dataset.service)
+            if service_config is None or service_config.cache_ttl <= 0:
+                return None
+            interval = service_config.cache_ttl * dataset.ttl_ratio
+        interval = max(MIN_INTERVAL, interval) * random.uniform(1 - self.jitter, 1 + self.jitter)
+        if dataset.daily:
+            # 午夜后的一分钟内随机刷新
+            today = datetime.datetime.fromtimestamp(now)
+            midnight = (today + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            interval = min(interval, midnight.timestamp() - now + random.uniform(1, 60))
+        return interval
+    
+    def due(self) -> List[RefreshJob]:
+        """取出到期的刷新任务，并移除长时间无人请求的键"""
+        if not self.enabled:
+            return []
+        now = self._clock()
+        jobs = []
+        with self._lock:
+            for job_key, job in list(self._jobs.items()):
+                if now - job.last_used > self.idle_after:
+                    del self._jobs[job_key]
+                    REFRESHES.labels(job.dataset.name, "idle").inc()
+                    logger.debug("停止刷新无人请求的键: %s %r", job.dataset.name, job.key)
+                elif not job.running and job.next_run <= now:
+                    job.running = True
+                    jobs.append(job)
+        return jobs
+    
+    async def refresh(self, job: RefreshJob) -> bool:
+        """
+        刷新一个键
+        
+        Returns:
+            是否从上游取得了新数据（或加入了正在取得数据的用户调用）
+        """
+        state = PrefetchState(rate_reserve=self.rate_reserve)
+        token = current_prefetch.set(state)
+        try:
+            with tracer.span("refresh", dataset=job.dataset.name):
+                await job.dataset.refresh(job.key)
+        except Exception as e:
+            logger.info("后台刷新失败: %s %r: %s", job.dataset.name, job.key, e)
+        finally:
+            current_prefetch.reset(token)
+        
+        # 加入了进行中的用户调用时，数据由用户调用更新
+        succeeded = state.fetched > 0 or state.joined > 0
+        now = self._clock()
+        interval = self._interval(job.dataset, now)
+        with self._lock:
+            job.running = False
+            if interval is None:
+                self._jobs.pop((job.dataset.name, job.key), None)
+            elif succeeded:
+                job.failures = 0
+                job.next_run = now + interval
+            else:
+                # 上游失败或额度不足时退避重试，最迟在下一个刷新间隔重试
+                job.failures += 1
+                job.next_run = now + min(interval, self.retry_delay * 2 ** (job.failures - 1))
+        if succeeded:
+            self.refreshed += 1
+        else:
+            self.failed += 1
+        REFRESHES.labels(job.dataset.name, "success" if succeeded else "failure").inc()
+        return succeeded
+    
+    async def run_pending(self) -> int:
+        """
+        刷新所有到期的键
+        
+        Returns:
+            成功刷新的键数
+        """
+        jobs = self.due()
+        if not jobs:
+            return 0
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        
+        async def run(job: RefreshJob) -> bool:
+            async with semaphore:
+                return await self.refresh(job)
+        
+        results = await asyncio.gather(*(run(job) for job in jobs))
+        return sum(results)
+    
+    async def run(self):
+        """调度循环，直到任务被取消"""
+        # 刷新不属于任何用户调用，作为独立的调用链记录
+        tracer.detach()
+        while True:
+            try:
+                await self.run_pending()
+            except Exception as e:
+                logger.warning("后台刷新调度出错: %s", e)
+            await asyncio.sleep(self.tick)
+    
+    def start(self) -> bool:
+        """在后台事件循环中启动调度循环；未启用或已启动时返回 False"""
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return False
+        self._task = submit(self.run())
+        return True
+    
+    def stop(self):
+        """停止调度循环"""
+        if self._task is not None:
+            self._task.cancel_task()
+            self._task = None
+    
+    def apply_config(self, old: ConfigSnapshot, new: ConfigSnapshot):
+        """配置重新加载后更新刷新参数，关闭刷新时清空所有键"""
+        settings = new.settings
+        self.idle_after = settings.get("refresh_idle_after", self.idle_after)
+        self.jitter = settings.get("refresh_jitter", self.jitter)
+        self.rate_reserve = settings.get("refresh_rate_reserve", self.rate_reserve)
+        self.max_concurrency = settings.get("refresh_max_concurrency", self.max_concurrency)
+        self.retry_delay = settings.get("refresh_retry_delay", self.retry_delay)
+        self.enabled = settings.get("refresh_enabled", self.enabled)
+        if not self.enabled:
+            with self._lock:
+                self._jobs.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """各数据集正在刷新的键数和刷新结果"""
+        with self._lock:
+            keys: Dict[str, int] = {name: 0 for name in self.datasets}
+            for name, _ in self._jobs:
+                keys[name] = keys.get(name, 0) + 1
+        return {"enabled": self.enabled, "keys": keys, "refreshed": self.refreshed, "failed": self.failed}
+
+# 全局刷新调度器实例
+refresh_scheduler = RefreshScheduler(
+    enabled=config_manager.get("refresh_enabled", True),
+    idle_after=config_manager.get("refresh_idle_after", 3600.0),
+    jitter=config_manager.get("refresh_jitter", 0.1),
+    rate_reserve=config_manager.get("refresh_rate_reserve", 0.5),
+    max_concurrency=config_manager.get("refresh_max_concurrency", 2),
+    retry_delay=config_manager.get("refresh_retry_delay", 30.0)
+)
+config_manager.add_reload_listener(refresh_scheduler.apply_config)
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+重试策略模块
+
+按错误类别区分可重试与不可重试的错误，对可重试错误使用带上限和随机抖动的指数退避，
+遵守上游返回的 Retry-After，并从单次调用的重试预算中扣除。
+"""
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+
+from .config import ServiceConfig, config_manager
+from .deadline import current_deadline
+from .metrics import metrics
+from .error_handler import (
+    ERROR_CONNECT, ERROR_HTTP_STATUS, ERROR_NETWORK, ERROR_TIMEOUT, classify_error
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRIES = metrics.counter("http_retries_total", "上游请求重试次数")
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+def is_retryable(e: BaseException) -> bool:
+    """
+    判断错误是否值得重试
+    
+    连接失败和传输层错误可重试；HTTP错误仅限限流和服务端临时错误；
+    超时、数据解析失败和业务错误（如未找到数据）不重试。超时的端点再等一个完整的超时时间
+    多半仍然超时，会耗尽整次调用的时间预算，交给上层直接切换备用端点。
+    """
+    category = classify_error(e)
+    if category == ERROR_TIMEOUT:
+        return False
+    if category in (ERROR_CONNECT, ERROR_NETWORK):
+        return True
+    if category == ERROR_HTTP_STATUS:
+        return e.response.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+def parse_retry_after(e: BaseException) -> Optional[float]:
+    """
+    从HTTP错误响应中解析 Retry-After（秒）
+    
+    支持秒数和HTTP日期两种格式，无法解析时返回None。
+    """
+    if not isinstance(e, httpx.HTTPStatusError):
+        return None
+    value = e.response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+class RetryBudget:
+    """
+    单次工具调用的重试预算
+    
+    同一次调用内所有端点、所有请求的重试共享该预算，避免故障时重试次数随端点数量成倍放大。
+    """
+    
+    def __init__(self, max_retries: int = 3, max_delay: float = 10.0):
+        self.max_retries = max_retries
+        self.max_delay = max_delay
+        self.retries = 0
+        self.delay = 0.0
+        self._lock = threading.Lock()
+    
+    def try_acquire(self, delay: float) -> bool:
+        """申请一次重试及其等待时间，预算不足时返回False"""
+        with self._lock:
+            if self.retries >= self.max_retries or self.delay + delay > self.max_delay:
+                return False
+            self.retries += 1
+            self.delay += delay
+            return True
+
+# 当前调用的重试预算，由 FallbackManager 设置
+current_retry_budget: ContextVar[Optional[RetryBudget]] = ContextVar("current_retry_budget", default=None)
+
+@dataclass
+class RetryPolicy:
+    """重试策略"""
+    max_retries: int = 2
+    base_delay: float = 0.2
+    max_delay: float = 5.0
+    
+    @classmethod
+    def for_service(cls, service_config: Optional[ServiceConfig]) -> "RetryPolicy":
+        """
+        根据服务配置创建重试策略
+        
+        没有服务上下文（如健康检查）时不重试；服务未指定 retry_count 时使用全局 MAX_RETRIES。
+        """
+        if service_config is None:
+            return cls(max_retries=0)
+        retries = service_config.retry_count
+        if retries is None:
+            retries = config_manager.get("max_retries", 2)
+        return cls(
+            max_retries=max(0, retries),
+            base_delay=config_manager.get("retry_base_delay", 0.2),
+            max_delay=config_manager.get("retry_max_delay", 5.0)
+        )
+    
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试（从0开始）的退避时间：带上限的指数退避加全抖动"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    def next_delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        计算下一次重试前的等待时间
+        
+        Returns:
+            等待秒数；不应重试时返回None
+        """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        retry_after = parse_retry_after(error)
+        if retry_after is not None:
+            # 上游要求等待的时间过长时直接切换备用端点
+            return retry_after if retry_after <= self.max_delay else None
+        return self.backoff(attempt)
+    
+    async def run(self, func: Callable[[], Awaitable[T]], description: str = "") -> T:
+        """
+        按策略执行异步函数，可重试的错误在退避后重试
+        
+        Args:
+            func: 无参数的异步函数
+            description: 日志中使用的描述
+        
+        Returns:
+            函数返回值
+        """
+        attempt = 0
+        while True:
+            try:
+                return await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = self.next_delay(attempt, e)
+                if delay is None:
+                    raise
+                deadline = current_deadline.get()
+                if deadline is not None and deadline.remaining() <= delay:
+                    logger.info("剩余时间不足，不再重试: %s", description)
+                    raise
+                budget = current_retry_budget.get()
+                if budget is not None and not budget.try_acquire(delay):
+                    logger.info("重试预算已用尽，不再重试: %s", description)
+                    raise
+                attempt += 1
+                RETRIES.inc()
+                logger.info("第%s次重试 %s，%.2f秒后执行，原因: %s", attempt, description, delay, e)
+                await asyncio.sleep(delay)
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+服务注册表模块
+
+服务配置在启动时构建一次，之后只读：配置对象不可变，端点元数据预先解析，按服务名 O(1) 查找。
+运维人员可以通过 TOML/JSON 文件新增服务或覆盖内置服务的端点，无需修改代码。
+"""
+import json
+import os
+import tomllib
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """上游额度：period 秒内最多 requests 次请求"""
+    requests: float
+    period: float = 60.0
+    burst: Optional[float] = None  # 突发容量，默认为额度的10%
+
+@dataclass(frozen=True, slots=True)
+class EndpointInfo:
+    """预解析的端点元数据"""
+    url: str
+    scheme: str
+    host: str
+    is_template: bool  # 是否包含 {} 占位符
+    needs_key: bool  # 请求时是否需要附带API密钥
+    is_backup: bool  # 是否为 backup:// 本地备用端点
+    
+    @classmethod
+    def parse(cls, url: str, needs_key: bool = False) -> "EndpointInfo":
+        """解析端点URL"""
+        parts = urlsplit(url)
+        is_backup = parts.scheme == "backup"
+        return cls(
+            url=url,
+            scheme=parts.scheme,
+            host=(parts.hostname or "") if not is_backup else "",
+            is_template="{}" in url,
+            needs_key=needs_key and not is_backup,
+            is_backup=is_backup
+        )
+
+@dataclass(frozen=True, slots=True)
+class ServiceConfig:
+    """API服务配置（不可变）"""
+    name: str
+    primary_endpoint: str
+    fallback_endpoints: Tuple[str, ...] = ()
+    timeout: int = 5
+    retry_count: Optional[int] = None  # 重试次数，None 表示使用全局 MAX_RETRIES
+    api_key: str = ""
+    requires_key: bool = False  # 端点需要API密钥
+    enabled: bool = True
+    cache_ttl: float = 0  # 响应缓存有效期（秒），0 表示不缓存
+    stale_while_revalidate: float = 0  # 过期不超过该秒数的缓存直接返回，同时在后台刷新
+    stale_if_error: float = 0  # 所有端点都失败时，返回过期不超过该秒数的缓存并标注数据已过期
+    negative_cache_ttl: float = 0  # 上游表示查询对象不存在时，相同查询在该秒数内直接返回“不存在”
+    hedge: bool = False  # 主端点响应缓慢时并行请求下一个端点
+    hedge_percentile: float = 0.95  # 对冲延迟取端点耗时的该分位数
+    hedge_min_delay: float = 0.05  # 对冲延迟下限（秒）
+    adaptive_order: bool = True  # 按观测耗时和成功率动态调整端点顺序
+    rate_limits: Mapping[str, RateLimit] = field(default_factory=dict)  # 各上游主机的请求额度
+    endpoints: Tuple[EndpointInfo, ...] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # 统一为不可变容器，并预先解析端点元数据
+        object.__setattr__(self, "fallback_endpoints", tuple(self.fallback_endpoints))
+        object.__setattr__(self, "rate_limits", MappingProxyType(dict(self.rate_limits)))
+        urls = (self.primary_endpoint,) + self.fallback_endpoints if self.primary_endpoint else ()
+        object.__setattr__(self, "endpoints", tuple(
+            EndpointInfo.parse(url, needs_key=self.requires_key) for url in urls
+        ))
+    
+    @property
+    def all_endpoints(self) -> Tuple[str, ...]:
+        """主端点和备用端点（按配置顺序）"""
+        return tuple(info.url for info in self.endpoints)
+
+def _service_from_dict(name: str, data: Mapping[str, Any],
+                       base: Optional[ServiceConfig] = None) -> ServiceConfig:
+    """
+    根据文件中的配置项创建服务配置
+    
+    未给出的字段沿用内置配置 base；rate_limits 的值可以是 {"requests": 45, "period": 60} 或 [45, 60]。
+    """
+    allowed = {f.name for f in fields(ServiceConfig) if f.init}
+    unknown = set(data) - allowed
+    if unknown:
+        raise ValueError(f"服务 {name} 包含未知的配置项: {', '.join(sorted(unknown))}")
+    
+    values: Dict[str, Any] = {}
+    if base is not None:
+        values = {f: getattr(base, f) for f in allowed}
+    values.update(data)
+    values["name"] = name
+    if "primary_endpoint" not in values:
+        raise ValueError(f"服务 {name} 缺少 primary_endpoint")
+    
+    limits = {}
+    for host, limit in dict(values.get("rate_limits") or {}).items():
+        if isinstance(limit, RateLimit):
+            limits[host] = limit
+        elif isinstance(limit, Mapping):
+            limits[host] = RateLimit(**limit)
+        else:
+            limits[host] = RateLimit(*limit)
+    values["rate_limits"] = limits
+    return ServiceConfig(**values)
+
+def load_document(path: str) -> Dict[str, Any]:
+    """读取 TOML/JSON 配置文件"""
+    with open(path, "rb") as f:
+        if os.path.splitext(path)[1].lower() == ".toml":
+            document = tomllib.load(f)
+        else:
+            document = json.load(f)
+    if not isinstance(document, dict):
+        raise ValueError(f"{path}: 配置文件顶层必须是表/对象")
+    return document
+
+class ServiceRegistry:
+    """不可变的服务注册表"""
+    
+    __slots__ = ("_services", "_endpoints")
+    
+    def __init__(self, services: Mapping[str, ServiceConfig]):
+        self._services: Mapping[str, ServiceConfig] = MappingProxyType(dict(services))
+        self._endpoints: Mapping[str, EndpointInfo] = MappingProxyType({
+            info.url: info for config in self._services.values() for info in config.endpoints
+        })
+    
+    @classmethod
+    def load(cls, builtin: Mapping[str, ServiceConfig],
+             overrides: Optional[Mapping[str, Mapping[str, Any]]] = None) -> "ServiceRegistry":
+        """
+        以内置服务为基础构建注册表，并合并外部配置
+        
+        Args:
+            builtin: 内置服务配置
+            overrides: 服务名 -> 配置项，通常来自配置文件的 [services.<name>] 表
+            
+        Returns:
+            服务注册表
+        """
+        services = dict(builtin)
+        overrides = overrides or {}
+        if not isinstance(overrides, Mapping):
+            raise ValueError("services 必须是服务名到配置项的映射")
+        for name, data in overrides.items():
+            services[name] = _service_from_dict(name, data, services.get(name))
+        return cls(services)
+    
+    def get(self, name: str) -> ServiceConfig:
+        """按名称获取服务配置，未注册的服务返回空配置"""
+        config = self._services.get(name)
+        if config is None:
+            return ServiceConfig(name=name, primary_endpoint="")
+        return config
+    
+    def endpoint(self, url: str) -> Optional[EndpointInfo]:
+        """按URL获取已注册端点的元数据"""
+        return self._endpoints.get(url)
+    
+    def names(self) -> Tuple[str, ...]:
+        """所有服务名"""
+        return tuple(self._services)
+    
+    def __contains__(self, name: object) -> bool:
+        return name in self._services
+    
+    def __iter__(self) -> Iterator[ServiceConfig]:
+        return iter(self._services.values())
+    
+    def __len__(self) -> int:
+        return len(self._services)
\ No newline at end of file
@@ -0,0 +1,478 @@
+"""
+共享状态进程（sidecar）
+
+多个服务进程（stdio 模式下每个客户端一个进程，或 HTTP 模式的多个 worker）各自维护缓存、
+令牌桶和熔断器时，同一上游会被重复请求，额度也会被各进程分别消耗。本模块提供一个可选的
+本地守护进程，通过 Unix 套接字让各进程共享：
+
+- 上游响应缓存：作为进程内缓存之后的第二级缓存（TieredCache）
+- 上游限流令牌桶：所有进程从同一个令牌桶取令牌
+- 端点健康状态：某个进程熔断的端点，其他进程在冷却结束前也不再请求
+
+守护进程不可用时各进程自动退回本地状态，之后每隔 retry_interval 秒重试连接。
+客户端是阻塞的；事件循环中的调用经线程池执行（缓存经 TieredCache 的异步接口，
+令牌经 try_acquire_async，不需要结果的报告经 call_in_background），不阻塞事件循环。
+
+启动:
+    python -m src.core.sidecar --socket /tmp/free-api-mcp.sock
+
+协议：每条消息为 长度头(<II：JSON长度, 数据长度) | JSON | 原始数据，一问一答。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .cache import CacheBackend, CacheEntry, LRUCache
+from .config import RateLimit, config_manager
+from .metrics import metrics
+from .rate_limiter import RateLimiter, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_REQUESTS = metrics.counter(
+    "sidecar_requests_total", "发往共享状态进程的请求数", ("op", "result")
+)
+
+_FRAME = struct.Struct("<II")
+# 单条消息的上限，防止读取到错误数据时分配过大的内存
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+class SidecarUnavailable(ConnectionError):
+    """共享状态进程不可用（未启动、超时或连接断开）"""
+
+def encode_frame(header: Dict[str, Any], body: bytes = b"") -> bytes:
+    """编码一条消息"""
+    data = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _FRAME.pack(len(data), len(body)) + data + body
+
+def _check_frame(header_len: int, body_len: int):
+    if header_len + body_len > MAX_FRAME_BYTES:
+        raise ValueError(f"消息过大: {header_len + body_len} 字节")
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[Dict[str, Any], bytes]:
+    """从流中读取一条消息"""
+    header_len, body_len = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    _check_frame(header_len, body_len)
+    header = json.loads(await reader.readexactly(header_len))
+    body = await reader.readexactly(body_len) if body_len else b""
+    return header, body
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionResetError("共享状态进程关闭了连接")
+        buffer += chunk
+    return bytes(buffer)
+
+def call_in_background(func: Callable[..., Any], *args: Any):
+    """
+    调用不需要结果的守护进程接口（如熔断报告），守护进程不可用时忽略
+    
+    在事件循环中调用时交给线程池执行，不等待完成；否则直接调用。
+    """
+    def run():
+        try:
+            func(*args)
+        except (SidecarUnavailable, ValueError):
+            pass
+    
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        run()
+        return
+    loop.run_in_executor(None, run)
+
+def _entry_header(entry: CacheEntry) -> Dict[str, Any]:
+    return {
+        "url": entry.url,
+        "status": entry.status_code,
+        "headers": [list(item) for item in entry.headers],
+        "expires_at": entry.expires_at
+    }
+
+def _entry_from(header: Dict[str, Any], body: bytes) -> CacheEntry:
+    return CacheEntry(
+        url=header["url"],
+        status_code=header["status"],
+        headers=tuple(tuple(item) for item in header["headers"]),
+        content=body,
+        expires_at=header["expires_at"]
+    )
+
+class SidecarServer:
+    """
+    共享状态守护进程
+    
+    所有状态只在事件循环线程中访问，请求按连接顺序处理。
+    
+    Args:
+        path: Unix 套接字路径
+        max_entries: 共享缓存的最大条目数
+        max_bytes: 共享缓存的最大字节数
+    """
+    
+    def __init__(self, path: str, max_entries: int = 4096, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self._buckets: Dict[str, TokenBucket] = {}
+        # 端点 -> 熔断结束的时间戳（time.time()，各进程共用系统时钟）
+        self._open_until: Dict[str, float] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.started = time.time()
+        self.connections = 0
+        self.requests = 0
+    
+    async def start(self):
+        """开始监听；套接字文件已存在时先删除（上次未正常退出）"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        logger.info("共享状态进程已启动: %s", self.path)
+    
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+    
+    async def close(self):
+        """停止监听并删除套接字文件"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    header, body = await read_frame(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                try:
+                    reply, payload = self.dispatch(header, body)
+                except (KeyError, TypeError, ValueError) as e:
+                    reply, payload = {"ok": False, "error": f"{type(e).__name__}: {e}"}, b""
+                writer.write(encode_frame(reply, payload))
+                await writer.drain()
+        except ValueError as e:
+            logger.warning("收到无效消息，关闭连接: %s", e)
+        finally:
+            self.connections -= 1
+            writer.close()
+    
+    def dispatch(self, header: Dict[str, Any], body: bytes) -> Tuple[Dict[str, Any], bytes]:
+        """处理一个请求，返回 (应答, 应答数据)"""
+        self.requests += 1
+        op = header["op"]
+        if op == "get":
+            key = header["key"]
+            entry = self.cache.get_stale(key) if header.get("stale") else self.cache.get(key)
+            if entry is None:
+                return {"ok": True, "hit": False}, b""
+            return {"ok": True, "hit": True, **_entry_header(entry)}, entry.content
+        if op == "set":
+            self.cache.set(header["key"], _entry_from(header, body))
+            return {"ok": True}, b""
+        if op == "delete":
+            self.cache.delete(header["key"])
+            return {"ok": True}, b""
+        if op == "clear":
+            self.cache.clear()
+            return {"ok": True}, b""
+        if op == "acquire":
+            return {"ok": True, "wait": self._bucket(header).try_acquire()}, b""
+        if op == "drain":
+            self._bucket(header).drain()
+            return {"ok": True}, b""
+        if op == "report":
+            endpoint = header["endpoint"]
+            if header["open"]:
+                self._open_until[endpoint] = time.time() + float(header["cooldown"])
+            else:
+                self._open_until.pop(endpoint, None)
+            return {"ok": True}, b""
+        if op == "health":
+            return {"ok": True, "open": self.open_endpoints()}, b""
+        if op == "stats":
+            return {"ok": True, **self.stats()}, b""
+        raise ValueError(f"未知的操作: {op}")
+    
+    def _bucket(self, header: Dict[str, Any]) -> TokenBucket:
+        """主机的共享令牌桶，请求方的额度变化时重建"""
+        host, rate, capacity = header["host"], float(header["rate"]), float(header["capacity"])
+        bucket = self._buckets.get(host)
+        if bucket is None or bucket.rate != rate or bucket.capacity != capacity:
+            bucket = self._buckets[host] = TokenBucket(rate=rate, capacity=capacity)
+        return bucket
+    
+    def open_endpoints(self) -> Dict[str, float]:
+        """熔断中的端点及剩余冷却秒数"""
+        now = time.time()
+        for endpoint in [ep for ep, until in self._open_until.items() if until <= now]:
+            del self._open_until[endpoint]
+        return {ep: until - now for ep, until in self._open_until.items()}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "uptime": round(time.time() - self.started, 1),
+            "connections": self.connections,
+            "requests": self.requests,
+            "cache": self.cache.stats(),
+            "buckets": {host: round(bucket.tokens, 2) for host, bucket in self._buckets.items()},
+            "open_endpoints": self.open_endpoints()
+        }
+
+class SidecarClient:
+    """
+    共享状态进程的同步客户端
+    
+    每个线程使用独立的连接。请求失败后在 retry_interval 秒内直接抛出 SidecarUnavailable，
+    不再尝试连接，避免守护进程停止时每次请求都等待超时。
+    
+    Args:
+        path: Unix 套接字路径
+        timeout: 单次请求的超时时间（秒）
+        retry_interval: 连接失败后重试的间隔（秒）
+    """
+    
+    def __init__(self, path: str, timeout: float = 0.05, retry_interval: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._local = threading.local()
+        self._sockets: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+    
+    @property
+    def available(self) -> bool:
+        """当前是否会尝试访问守护进程"""
+        return time.monotonic() >= self._down_until
+    
+    def _socket(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+            with self._lock:
+                self._sockets.append(sock)
+        return sock
+    
+    def _disconnect(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            self._local.sock = None
+            with self._lock:
+                if sock in self._sockets:
+                    self._sockets.remove(sock)
+            sock.close()
+    
+    def call(self, op: str, body: bytes = b"", **fields: Any) -> Tuple[Dict[str, Any], bytes]:
+        """
+        发送一个请求并等待应答
+        
+        Raises:
+            SidecarUnavailable: 守护进程不可用
+            ValueError: 守护进程拒绝了请求
+        """
+        if not self.available:
+            SIDECAR_REQUESTS.labels(op, "unavailable").inc()
+            raise SidecarUnavailable(f"共享状态进程不可用: {self.path}")
+        try:
+            sock = self._socket()
+            sock.sendall(encode_frame({"op": op, **fields}, body))
+            header_len, body_len = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+            _check_frame(header_len, body_len)
+            header = json.loads(_recv_exactly(sock, header_len))
+            payload = _recv_exactly(sock, body_len) if body_len else b""
+        except (OSError, ValueError) as e:
+            # 超时或断开后连接中可能残留半条消息，必须丢弃
+            self._disconnect()
+            self._down_until = time.monotonic() + self.retry_interval
+            SIDECAR_REQUESTS.labels(op, "error").inc()
+            logger.warning("共享状态进程不可用，%.0f秒内使用本地状态: %s", self.retry_interval, e)
+            raise SidecarUnavailable(f"共享状态进程不可用: {e}") from e
+        if not header.get("ok"):
+            SIDECAR_REQUESTS.labels(op, "rejected").inc()
+            raise ValueError(header.get("error", "共享状态进程拒绝了请求"))
+        SIDECAR_REQUESTS.labels(op, "ok").inc()
+        return header, payload
+    
+    def get_entry(self, key: str, stale: bool = False) -> Optional[CacheEntry]:
+        """读取共享缓存条目"""
+        header, body = self.call("get", key=key, stale=stale)
+        return _entry_from(header, body) if header["hit"] else None
+    
+    def set_entry(self, key: str, entry: CacheEntry):
+        """写入共享缓存条目"""
+        self.call("set", entry.content, key=key, **_entry_header(entry))
+    
+    def acquire(self, host: str, rate: float, capacity: float) -> float:
+        """从共享令牌桶取一个令牌，返回值同 TokenBucket.try_acquire"""
+        header, _ = self.call("acquire", host=host, rate=rate, capacity=capacity)
+        return header["wait"]
+    
+    def drain(self, host: str, rate: float, capacity: float):
+        """清空共享令牌桶"""
+        self.call("drain", host=host, rate=rate, capacity=capacity)
+    
+    def report_health(self, endpoint: str, is_open: bool, cooldown: float = 0.0):
+        """报告端点熔断（is_open=True）或恢复"""
+        self.call("report", endpoint=endpoint, open=is_open, cooldown=cooldown)
+    
+    def open_endpoints(self) -> Dict[str, float]:
+        """各进程报告的熔断中端点及剩余冷却秒数"""
+        header, _ = self.call("health")
+        return header["open"]
+    
+    def stats(self) -> Dict[str, Any]:
+        header, _ = self.call("stats")
+        header.pop("ok", None)
+        return header
+    
+    def close(self):
+        """关闭所有线程的连接"""
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            sock.close()
+        self._local = threading.local()
+
+class SidecarCache(CacheBackend):
+    """
+    共享状态进程中的缓存，作为 TieredCache 的第二级
+    
+    守护进程不可用时读取返回未命中，写入被忽略。
+    """
+    
+    def __init__(self, client: SidecarClient):
+        self.client = client
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            return self.client.get_entry(key)
+        except (SidecarUnavailable, ValueError):
+            return None
+    
+    def get_stale(self, key: str) -> Optional[CacheEntry]:
+        try:
+            return self.client.get_entry(key, stale=True)
+        except (SidecarUnavailable, ValueError):
+            return None
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        try:
+            self.client.set_entry(key, entry)
+        except (SidecarUnavailable, ValueError):
+            pass
+    
+    def delete(self, key: str) -> None:
+        try:
+            self.client.call("delete", key=key)
+        except (SidecarUnavailable, ValueError):
+            pass
+    
+    def clear(self) -> None:
+        try:
+            self.client.call("clear")
+        except (SidecarUnavailable, ValueError):
+            pass
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"available": self.client.available}
+
+class SidecarTokenBucket(TokenBucket):
+    """
+    共享令牌桶：从守护进程取令牌，守护进程不可用时使用本地令牌桶
+    
+    Args:
+        client: 共享状态进程客户端
+        host: 上游主机
+        其余参数同 TokenBucket
+    """
+    
+    def __init__(self, client: SidecarClient, host: str, rate: float, capacity: float,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(rate=rate, capacity=capacity, clock=clock)
+        self.client = client
+        self.host = host
+    
+    def try_acquire(self) -> float:
+        try:
+            return self.client.acquire(self.host, self.rate, self.capacity)
+        except (SidecarUnavailable, ValueError):
+            return super().try_acquire()
+    
+    async def try_acquire_async(self) -> float:
+        if not self.client.available:
+            return super().try_acquire()
+        return await asyncio.to_thread(self.try_acquire)
+    
+    def drain(self):
+        super().drain()
+        call_in_background(self.client.drain, self.host, self.rate, self.capacity)
+
+class SidecarRateLimiter(RateLimiter):
+    """各主机的令牌桶由所有进程共享的限流器"""
+    
+    def __init__(self, client: SidecarClient, max_wait: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        super().__init__(max_wait=max_wait, clock=clock)
+        self.client = client
+    
+    def _make_bucket(self, host: str, limit: RateLimit) -> TokenBucket:
+        local = TokenBucket.from_limit(limit, self._clock)
+        return SidecarTokenBucket(self.client, host, local.rate, local.capacity, self._clock)
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="启动多个服务进程共享的缓存和状态进程")
+    parser.add_argument("--socket", default=config_manager.get("sidecar_socket") or "/tmp/free-api-mcp.sock",
+                        help="Unix 套接字路径，默认读取 SIDECAR_SOCKET")
+    parser.add_argument("--max-entries", type=int, default=config_manager.get("sidecar_max_entries"),
+                        help="共享缓存的最大条目数")
+    parser.add_argument("--max-bytes", type=int, default=config_manager.get("sidecar_max_bytes"),
+                        help="共享缓存的最大字节数")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[Sequence[str]] = None):
+    args = parse_args(argv)
+    server = SidecarServer(args.socket, max_entries=args.max_entries, max_bytes=args.max_bytes)
+    
+    async def run():
+        # 收到 SIGTERM 时正常退出并删除套接字文件
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        try:
+            await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await server.close()
+    
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+请求合并模块
+
+相同键的并发调用只执行一次，所有调用方共享同一个结果或异常。
+"""
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from .deadline import current_deadline
+from .error_handler import DeadlineExceededError
+from .tracing import tracer
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    并发请求合并器
+    
+    进行中的调用按事件循环分别登记，同步路径（后台事件循环）和异步路径各自合并。
+    执行实际调用的任务独立于调用方，某个调用方被取消不会影响其他等待者；
+    所有等待者都取消后，实际调用也会被取消。实际调用不继承发起者的时间预算和调用链，
+    各等待者按自己的截止时间等待，超时的等待者离开后其他等待者继续等待；实际调用作为
+    独立的调用链记录，根 span 的 caller_trace 属性为发起者的调用链。
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], "asyncio.Task[Any]"] = {}
+        self._waiters: Dict[Tuple[int, Hashable], int] = {}
+        self.executed = 0
+        self.shared = 0
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行调用，若相同键的调用正在进行则等待其结果
+        
+        Args:
+            key: 合并键
+            func: 无参数的异步函数
+        
+        Returns:
+            调用结果
+        
+        Raises:
+            DeadlineExceededError: 调用结束前当前的时间预算已用完
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        task = self._calls.get(call_key)
+        if task is None:
+            # 不受发起者的时间预算限制（由等待者各自限时，全部离开时取消），并作为独立的调用链记录
+            caller_trace = getattr(tracer.current(), "trace_id", None)
+            context = contextvars.copy_context()
+            context.run(current_deadline.set, None)
+            context.run(tracer.detach)
+            task = loop.create_task(self._run(func, caller_trace), context=context)
+            self._calls[call_key] = task
+            self._waiters[call_key] = 0
+            task.add_done_callback(lambda t: self._forget(call_key, t))
+            self.executed += 1
+        else:
+            self.shared += 1
+        
+        self._waiters[call_key] = self._waiters.get(call_key, 0) + 1
+        deadline = current_deadline.get()
+        try:
+            async with asyncio.timeout(None if deadline is None else deadline.remaining()) as scope:
+                try:
+                    return await asyncio.shield(task)
+                except asyncio.CancelledError:
+                    # 最后一个等待者取消（包括超时）时，同时取消实际调用
+                    if self._calls.get(call_key) is task:
+                        self._waiters[call_key] -= 1
+                        if self._waiters[call_key] <= 0 and not task.done():
+                            task.cancel()
+                            # 正在取消的调用不再接受新的等待者，之后的调用重新执行
+                            del self._calls[call_key]
+                            del self._waiters[call_key]
+                    raise
+        except TimeoutError:
+            if scope.expired():
+                raise DeadlineExceededError() from None
+            raise
+    
+    @staticmethod
+    async def _run(func: Callable[[], Awaitable[T]], caller_trace: Optional[str]) -> T:
+        """在独立的调用链中执行实际调用"""
+        with tracer.span("singleflight") as span:
+            if caller_trace is not None:
+                span.set_attribute("caller_trace", caller_trace)
+            return await func()
+    
+    def running(self, key: Hashable) -> bool:
+        """当前事件循环中相同键的调用是否正在进行"""
+        return (id(asyncio.get_running_loop()), key) in self._calls
+    
+    def in_flight(self) -> int:
+        """当前进行中的调用数量"""
+        return len(self._calls)
+    
+    def stats(self) -> Dict[str, int]:
+        """合并统计信息"""
+        return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._calls)}
+    
+    def _forget(self, call_key: Tuple[int, Hashable], task: "asyncio.Task[Any]"):
+        """调用结束后移除登记"""
+        if self._calls.get(call_key) is task:
+            del self._calls[call_key]
+            self._waiters.pop(call_key, None)
+        if not task.cancelled():
+            # 标记异常已被读取，避免所有等待者都已取消时产生警告
+            task.exception()
\ No newline at end of file
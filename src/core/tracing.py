@@ -0,0 +1,246 @@
+"""
+调用链追踪模块
+
+一次工具调用构成一条调用链（trace），其中工具、服务、备用端点和每次HTTP尝试
+各自记录为嵌套的 span。当前 span 保存在上下文变量中，异步任务和同步桥接
+会随上下文自动继承父 span。是否采样在根 span 开始时决定，整条调用链结束后
+交给导出器。由 SingleFlight 合并执行的调用（如上游HTTP请求）记录为独立的调用链。
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .config import ConfigSnapshot, config_manager
+
+logger = logging.getLogger(__name__)
+
+class Span:
+    """调用链中的一个计时片段"""
+    
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_time",
+                 "duration", "attributes", "status", "_start", "_trace")
+    
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any], trace: List["Span"]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.status = "ok"
+        self._start = time.perf_counter()
+        self._trace = trace
+    
+    @property
+    def recording(self) -> bool:
+        """是否记录该 span"""
+        return True
+    
+    def set_attribute(self, key: str, value: Any):
+        """设置属性"""
+        self.attributes[key] = value
+    
+    def set_error(self, error: BaseException):
+        """标记为失败并记录异常类型（异常消息可能包含带密钥的URL，不记录）"""
+        self.status = "error"
+        self.attributes["error"] = type(error).__name__
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+class _NonRecordingSpan:
+    """未采样调用链使用的空 span，所有操作都被忽略"""
+    
+    __slots__ = ()
+    
+    recording = False
+    
+    def set_attribute(self, key: str, value: Any):
+        pass
+    
+    def set_error(self, error: BaseException):
+        pass
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+_current_span: ContextVar[Any] = ContextVar("current_span", default=None)
+
+class SpanExporter:
+    """导出器接口：接收一条已结束的调用链"""
+    
+    def export(self, spans: Sequence[Span]) -> None:
+        """导出调用链，spans[0] 为根 span"""
+        raise NotImplementedError
+
+class RingBufferExporter(SpanExporter):
+    """在内存中保留最近的若干条调用链"""
+    
+    def __init__(self, capacity: int = 100):
+        self._traces: Deque[Tuple[Span, ...]] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+    
+    @property
+    def capacity(self) -> int:
+        return self._traces.maxlen or 0
+    
+    def export(self, spans: Sequence[Span]) -> None:
+        with self._lock:
+            self._traces.append(tuple(spans))
+    
+    def resize(self, capacity: int):
+        """调整容量，保留最近的调用链"""
+        with self._lock:
+            self._traces = deque(self._traces, maxlen=capacity)
+    
+    def traces(self) -> List[Tuple[Span, ...]]:
+        """最近的调用链，按结束时间从旧到新"""
+        with self._lock:
+            return list(self._traces)
+    
+    def slowest(self, limit: int = 5) -> List[Tuple[Span, ...]]:
+        """耗时最长的调用链"""
+        return sorted(self.traces(), key=lambda spans: spans[0].duration or 0, reverse=True)[:limit]
+    
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+class JSONLinesExporter(SpanExporter):
+    """把 span 逐行以 JSON 格式追加到本地文件"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+    
+    def export(self, spans: Sequence[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n" for span in spans)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+class Tracer:
+    """
+    调用链追踪器
+    
+    Args:
+        sample_rate: 根 span 的采样概率（0~1）
+        exporters: 调用链结束后依次调用的导出器
+    """
+    
+    def __init__(self, sample_rate: float = 1.0, exporters: Optional[Sequence[SpanExporter]] = None):
+        self.sample_rate = sample_rate
+        self.exporters: List[SpanExporter] = list(exporters or [])
+        self._random = random.Random()
+    
+    @staticmethod
+    def current() -> Any:
+        """当前 span，没有时返回空 span"""
+        span = _current_span.get()
+        return span if span is not None else NON_RECORDING_SPAN
+    
+    @staticmethod
+    def detach():
+        """让当前上下文不再关联任何 span，之后的 span 开始新的调用链（用于后台任务）"""
+        _current_span.set(None)
+    
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """
+        开始一个 span，作为当前 span 的子节点
+        
+        没有父 span 时开始新的调用链并按采样率决定是否记录。
+        代码块抛出的异常会记录到 span 上并继续抛出。
+        """
+        parent = _current_span.get()
+        if parent is NON_RECORDING_SPAN or (
+                parent is None and (self.sample_rate <= 0 or self._random.random() >= self.sample_rate)):
+            token = _current_span.set(NON_RECORDING_SPAN)
+            try:
+                yield NON_RECORDING_SPAN
+            finally:
+                _current_span.reset(token)
+            return
+        
+        if parent is None:
+            span = Span(name, f"{self._random.getrandbits(128):032x}", None, attributes, [])
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attributes, parent._trace)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - span._start
+            if parent is None:
+                span._trace.insert(0, span)
+                self._export(span._trace)
+            else:
+                span._trace.append(span)
+    
+    def _export(self, spans: List[Span]):
+        for exporter in list(self.exporters):
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                logger.warning("调用链导出失败（%s）: %s", type(exporter).__name__, e)
+
+def format_trace(spans: Sequence[Span]) -> str:
+    """把一条调用链格式化为缩进的树形文本"""
+    children: Dict[Optional[str], List[Span]] = {}
+    for span in spans[1:]:
+        children.setdefault(span.parent_id, []).append(span)
+    
+    lines: List[str] = []
+    
+    def walk(span: Span, depth: int):
+        attrs = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        mark = "❌ " if span.status == "error" else ""
+        lines.append(f"{'  ' * depth}{mark}{span.name} {(span.duration or 0) * 1000:.1f}ms {attrs}".rstrip())
+        for child in sorted(children.get(span.span_id, []), key=lambda s: s.start_time):
+            walk(child, depth + 1)
+    
+    walk(spans[0], 0)
+    return "\n".join(lines)
+
+def _exporters_from_settings(settings) -> List[SpanExporter]:
+    exporters: List[SpanExporter] = [trace_buffer]
+    if settings.get("trace_file"):
+        exporters.append(JSONLinesExporter(settings["trace_file"]))
+    return exporters
+
+def _apply_config(old: ConfigSnapshot, new: ConfigSnapshot):
+    """配置重新加载后更新采样率和导出器"""
+    tracer.sample_rate = new.settings["trace_sample_rate"]
+    if new.settings["trace_buffer_size"] != trace_buffer.capacity:
+        trace_buffer.resize(new.settings["trace_buffer_size"])
+    if new.settings.get("trace_file") != old.settings.get("trace_file"):
+        tracer.exporters = _exporters_from_settings(new.settings)
+
+# 全局调用链缓冲区和追踪器
+trace_buffer = RingBufferExporter(config_manager.get("trace_buffer_size", 100))
+tracer = Tracer(
+    sample_rate=config_manager.get("trace_sample_rate", 1.0),
+    exporters=_exporters_from_settings(config_manager.snapshot().settings)
+)
+config_manager.add_reload_listener(_apply_config)
\ No newline at end of file
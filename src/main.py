@@ -2,57 +2,76 @@
 Free API MCP Server - 主入口文件
 """
 from mcp.server.fastmcp import FastMCP
+from mcp.server.transport_security import TransportSecuritySettings
+import argparse
+import os
 import pinyin
 import logging
+import time
+from typing import Optional, Sequence
 
 # 导入核心模块
 try:
     # 尝试相对导入（当作为模块运行时）
+    from .core.async_runner import submit
     from .core.config import config_manager
+    from .core.deadline import with_deadline
+    from .core.metrics import instrument_tool, metrics
+    from .core.tracing import format_trace, trace_buffer
     from .core.http_client import http_manager
     from .core.error_handler import handle_api_error
     from .core.fallback_manager import fallback_manager
+    from .core.health_check import format_report, health_checker
+    from .core.refresh_scheduler import Dataset, refresh_scheduler
     
     # 导入服务模块
     from .services.ip_service import (
-        ip_location, ip_detailed_info, ip_security_check, ip_comprehensive_analysis
+        ip_location_async, ip_detailed_info_async, ip_security_check_async,
+        ip_comprehensive_analysis_async
     )
-    from .services.crypto_service import get_crypto_price
+    from .services.crypto_service import get_crypto_price_async
     from .services.content_service import (
-        get_inspirational_quote, get_random_joke, get_daily_motivation
+        get_inspirational_quote_async, get_random_joke_async, get_daily_motivation_async
     )
-    from .services.exchange_service import get_exchange_rate, get_supported_currencies
+    from .services.exchange_service import get_exchange_rate_async, get_supported_currencies
     from .services.entertainment_service import (
-        get_random_cat_image, get_random_dog_image, get_random_fact, 
-        get_meme_image, get_today_in_history
+        get_random_cat_image_async, get_random_dog_image_async, get_random_fact_async,
+        get_meme_image_async, get_today_in_history_async
     )
     from .services.utility_service import (
-        generate_qr_code, shorten_url, generate_password, 
-        generate_uuid, get_color_info
+        generate_qr_code_async, shorten_url_async, generate_password,
+        generate_uuid, get_color_info_async
     )
 except ImportError:
     # 回退到绝对导入（当直接导入时）
+    from src.core.async_runner import submit
     from src.core.config import config_manager
+    from src.core.deadline import with_deadline
+    from src.core.metrics import instrument_tool, metrics
+    from src.core.tracing import format_trace, trace_buffer
     from src.core.http_client import http_manager
     from src.core.error_handler import handle_api_error
     from src.core.fallback_manager import fallback_manager
+    from src.core.health_check import format_report, health_checker
+    from src.core.refresh_scheduler import Dataset, refresh_scheduler
     
     # 导入服务模块
     from src.services.ip_service import (
-        ip_location, ip_detailed_info, ip_security_check, ip_comprehensive_analysis
+        ip_location_async, ip_detailed_info_async, ip_security_check_async,
+        ip_comprehensive_analysis_async
     )
-    from src.services.crypto_service import get_crypto_price
+    from src.services.crypto_service import get_crypto_price_async
     from src.services.content_service import (
-        get_inspirational_quote, get_random_joke, get_daily_motivation
+        get_inspirational_quote_async, get_random_joke_async, get_daily_motivation_async
     )
-    from src.services.exchange_service import get_exchange_rate, get_supported_currencies
+    from src.services.exchange_service import get_exchange_rate_async, get_supported_currencies
     from src.services.entertainment_service import (
-        get_random_cat_image, get_random_dog_image, get_random_fact, 
-        get_meme_image, get_today_in_history
+        get_random_cat_image_async, get_random_dog_image_async, get_random_fact_async,
+        get_meme_image_async, get_today_in_history_async
     )
     from src.services.utility_service import (
-        generate_qr_code, shorten_url, generate_password, 
-        generate_uuid, get_color_info
+        generate_qr_code_async, shorten_url_async, generate_password,
+        generate_uuid, get_color_info_async
     )
 
 # 初始化MCP服务器
@@ -63,35 +82,45 @@ logger = logging.getLogger(__name__)
 # IP 信息查询服务
 # ----------------------------------------------------------
 @mcp.tool()
-def query_ip_location(ip_or_domain: str) -> str:
+@instrument_tool
+@with_deadline()
+async def query_ip_location(ip_or_domain: str) -> str:
     """查询IP地址或域名的基本归属地信息"""
-    return ip_location(ip_or_domain)
+    return await ip_location_async(ip_or_domain)
 
 @mcp.tool()
-def query_ip_detailed_info(ip_or_domain: str) -> str:
+@instrument_tool
+@with_deadline()
+async def query_ip_detailed_info(ip_or_domain: str) -> str:
     """查询IP地址或域名的详细信息，包括地理位置、ISP、时区等"""
-    return ip_detailed_info(ip_or_domain)
+    return await ip_detailed_info_async(ip_or_domain)
 
 @mcp.tool()
-def check_ip_security(ip_address: str) -> str:
+@instrument_tool
+@with_deadline()
+async def check_ip_security(ip_address: str) -> str:
     """检查IP地址的安全威胁信息"""
-    return ip_security_check(ip_address)
+    return await ip_security_check_async(ip_address)
 
 @mcp.tool()
-def analyze_ip_comprehensive(ip_or_domain: str) -> str:
+@instrument_tool
+@with_deadline()
+async def analyze_ip_comprehensive(ip_or_domain: str) -> str:
     """对IP地址或域名进行综合分析，包括地理位置、网络信息和安全检查"""
-    return ip_comprehensive_analysis(ip_or_domain)
+    return await ip_comprehensive_analysis_async(ip_or_domain)
 
 # ----------------------------------------------------------
 # 新闻和天气服务
 # ----------------------------------------------------------
 @mcp.tool()
-def get_china_news(limit: int = 5) -> str:
+@instrument_tool
+@with_deadline()
+async def get_china_news(limit: int = 5) -> str:
     """获取中国新闻热点"""
     service_config = config_manager.get_service_config("news")
     api_key = service_config.api_key or config_manager.get("news_api_key")
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             params = {
                 'country': 'cn',
@@ -99,7 +128,7 @@ def get_china_news(limit: int = 5) -> str:
                 'pageSize': min(limit, 20)  # 限制最大数量
             }
             
-            response = http_manager.get(endpoint, params=params, timeout=service_config.timeout)
+            response = await http_manager.get_async(endpoint, params=params, timeout=service_config.timeout)
             data = response.json()
             
             if data.get('status') == 'ok':
@@ -112,16 +141,24 @@ def get_china_news(limit: int = 5) -> str:
                 return '\n'.join(news_list) if news_list else "暂无新闻数据"
             else:
                 raise ValueError(f"API返回错误: {data.get('message', '未知错误')}")
-                
+        
         except Exception as e:
             error_msg = handle_api_error(e, "新闻获取", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(
+        service_config, make_request, coalesce_key=("cn", limit)
+    )
 
 @mcp.tool()
-def get_news_by_country(country: str = "us", limit: int = 5) -> str:
+@instrument_tool
+@with_deadline()
+async def get_news_by_country(country: str = "us", limit: int = 5) -> str:
     """获取指定国家的新闻热点"""
+    return await fetch_country_news(country, limit)
+
+async def fetch_country_news(country: str, limit: int) -> str:
+    """查询指定国家的新闻热点（工具实现，也用于后台刷新）"""
     service_config = config_manager.get_service_config("news")
     api_key = service_config.api_key or config_manager.get("news_api_key")
     
@@ -137,7 +174,9 @@ def get_news_by_country(country: str = "us", limit: int = 5) -> str:
     if country not in supported_countries:
         return f"❌ 不支持的国家代码: {country}\n\n支持的国家: {', '.join([f'{k}({v})' for k, v in supported_countries.items()])}"
     
-    def make_request(endpoint: str) -> str:
+    refresh_scheduler.touch("news_headlines", (country, limit))
+    
+    async def make_request(endpoint: str) -> str:
         try:
             params = {
                 'country': country,
@@ -145,7 +184,7 @@ def get_news_by_country(country: str = "us", limit: int = 5) -> str:
                 'pageSize': min(limit, 20)
             }
             
-            response = http_manager.get(endpoint, params=params, timeout=service_config.timeout)
+            response = await http_manager.get_async(endpoint, params=params, timeout=service_config.timeout)
             data = response.json()
             
             if data.get('status') == 'ok':
@@ -161,21 +200,27 @@ def get_news_by_country(country: str = "us", limit: int = 5) -> str:
                     return f"📰 {supported_countries[country]}暂无新闻数据，可能是API限制或地区限制"
             else:
                 raise ValueError(f"API返回错误: {data.get('message', '未知错误')}")
-                
+        
         except Exception as e:
             error_msg = handle_api_error(e, "新闻获取", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(
+        service_config, make_request, coalesce_key=(country, limit)
+    )
+
+refresh_scheduler.register(Dataset("news_headlines", "news", lambda key: fetch_country_news(*key)))
 
 @mcp.tool()
-def get_weather(city: str) -> str:
+@instrument_tool
+@with_deadline()
+async def get_weather(city: str) -> str:
     """查询城市天气"""
     service_config = config_manager.get_service_config("weather")
     api_key = service_config.api_key or config_manager.get("weather_api_key")
     city_pinyin = pinyin.get(city.strip(), format="strip")
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             params = {
                 'q': city_pinyin,
@@ -184,7 +229,7 @@ def get_weather(city: str) -> str:
                 'units': 'metric'  # 使用摄氏度
             }
             
-            response = http_manager.get(endpoint, params=params, timeout=service_config.timeout)
+            response = await http_manager.get_async(endpoint, params=params, timeout=service_config.timeout)
             data = response.json()
             
             if 'weather' in data and 'main' in data:
@@ -199,48 +244,61 @@ def get_weather(city: str) -> str:
                 )
             else:
                 raise ValueError("天气数据格式错误")
-                
+        
         except Exception as e:
             error_msg = handle_api_error(e, "天气查询", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(
+        service_config, make_request, coalesce_key=city
+    )
 
 # ----------------------------------------------------------
 # 加密货币服务
 # ----------------------------------------------------------
 @mcp.tool()
-def query_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
+@instrument_tool
+@with_deadline()
+async def query_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
     """查询加密货币价格信息"""
-    return get_crypto_price(crypto_symbol, vs_currency)
+    return await get_crypto_price_async(crypto_symbol, vs_currency)
 
 # ----------------------------------------------------------
 # 内容服务
 # ----------------------------------------------------------
 @mcp.tool()
-def fetch_inspirational_quote() -> str:
+@instrument_tool
+@with_deadline()
+async def fetch_inspirational_quote() -> str:
     """获取励志名言"""
-    return get_inspirational_quote()
+    return await get_inspirational_quote_async()
 
 @mcp.tool()
-def fetch_random_joke() -> str:
+@instrument_tool
+@with_deadline()
+async def fetch_random_joke() -> str:
     """获取随机笑话"""
-    return get_random_joke()
+    return await get_random_joke_async()
 
 @mcp.tool()
-def fetch_daily_motivation(content_type: str = "quote") -> str:
+@instrument_tool
+@with_deadline()
+async def fetch_daily_motivation(content_type: str = "quote") -> str:
     """获取每日励志内容"""
-    return get_daily_motivation(content_type)
+    return await get_daily_motivation_async(content_type)
 
 # ----------------------------------------------------------
 # 汇率服务
 # ----------------------------------------------------------
 @mcp.tool()
-def query_exchange_rate(from_currency: str, to_currency: str, amount: float = 1.0) -> str:
+@instrument_tool
+@with_deadline()
+async def query_exchange_rate(from_currency: str, to_currency: str, amount: float = 1.0) -> str:
     """查询货币汇率转换"""
-    return get_exchange_rate(from_currency, to_currency, amount)
+    return await get_exchange_rate_async(from_currency, to_currency, amount)
 
 @mcp.tool()
+@instrument_tool
 def list_supported_currencies() -> str:
     """获取支持的货币代码列表"""
     return get_supported_currencies()
@@ -249,52 +307,57 @@ def list_supported_currencies() -> str:
 # 系统工具
 # ----------------------------------------------------------
 @mcp.tool()
-def health_check() -> str:
-    """检查所有API服务的健康状态"""
+@instrument_tool
+@with_deadline()
+async def health_check() -> str:
+    """并发检查所有API服务（含备用端点）的健康状态和响应耗时"""
     if not config_manager.get("enable_health_check", True):
         return "健康检查已禁用"
     
-    services = ["ip_location", "news", "weather", "cryptocurrency", "quotes", "jokes", "exchange_rate", 
-                "cat_images", "dog_images", "random_facts", "meme_images", "history_today", "color_info"]
-    results = []
-    
-    for service_name in services:
-        service_config = config_manager.get_service_config(service_name)
-        try:
-            # 简单的连通性测试
-            endpoint = service_config.primary_endpoint.split('?')[0]  # 移除查询参数
-            
-            # 特殊处理需要参数的端点
-            if "{}" in endpoint:
-                if service_name == "exchange_rate":
-                    endpoint = endpoint.replace("{}", "USD")  # 使用USD作为测试货币
-                elif service_name == "ip_location":
-                    endpoint = endpoint.replace("{}", "8.8.8.8")  # 使用Google DNS作为测试IP
-                else:
-                    endpoint = endpoint.replace("{}", "test")  # 通用测试值
-            
-            # 特殊处理加密货币API
-            if service_name == "cryptocurrency" and "coingecko" in endpoint:
-                # 为CoinGecko API添加必要的参数
-                endpoint = f"{endpoint}?ids=bitcoin&vs_currencies=usd"
-            
-            if endpoint and not endpoint.startswith("backup://"):
-                response = http_manager.get(endpoint, timeout=2)
-                status = "✅ 正常" if response.status_code < 400 else f"⚠️ HTTP {response.status_code}"
-            else:
-                status = "⚠️ 跳过检查"
-        except Exception as e:
-            status = f"❌ 失败: {str(e)[:50]}"
-        
-        results.append(f"{service_name}: {status}")
+    start = time.perf_counter()
+    endpoint_results = await health_checker.check_all()
+    results = [format_report(endpoint_results, time.perf_counter() - start)]
     
     failed_endpoints = fallback_manager.get_failed_endpoints()
     if failed_endpoints:
         results.append(f"\n失败端点数量: {len(failed_endpoints)}")
     
+    # 熔断器状态（仅列出未关闭的端点）
+    circuit_states = fallback_manager.get_circuit_states()
+    state_labels = {"open": "🔴 熔断中", "half_open": "🟡 半开探测"}
+    for endpoint, state in circuit_states.items():
+        if state["state"] in state_labels:
+            line = f"  {state_labels[state['state']]} {endpoint}"
+            if state["cooldown_remaining"] > 0:
+                line += f"（{state['cooldown_remaining']:.0f}秒后探测）"
+            results.append(line)
+    
     return "\n".join(results)
 
 @mcp.tool()
+@instrument_tool
+def get_metrics(format: str = "summary") -> str:
+    """获取运行指标（工具调用、上游请求、缓存、备用端点切换等），format 可选 summary 或 prometheus"""
+    if format == "prometheus":
+        return metrics.render_prometheus()
+    return metrics.render_summary()
+
+@mcp.resource("metrics://prometheus", mime_type="text/plain")
+def prometheus_metrics() -> str:
+    """Prometheus 文本格式的运行指标"""
+    return metrics.render_prometheus()
+
+@mcp.tool()
+@instrument_tool
+def get_slow_traces(limit: int = 5) -> str:
+    """获取最近耗时最长的工具调用链，显示工具、服务、端点和每次HTTP尝试的耗时"""
+    traces = trace_buffer.slowest(max(1, limit))
+    if not traces:
+        return "暂无调用链记录（可通过 TRACE_SAMPLE_RATE 调整采样率）"
+    return "\n\n".join(format_trace(spans) for spans in traces)
+
+@mcp.tool()
+@instrument_tool
 def reset_failed_endpoints(service_name: str = "") -> str:
     """重置失败的API端点"""
     if service_name:
@@ -308,83 +371,209 @@ def reset_failed_endpoints(service_name: str = "") -> str:
 # 娱乐服务
 # ----------------------------------------------------------
 @mcp.tool()
-def fetch_random_cat_image() -> str:
+@instrument_tool
+@with_deadline()
+async def fetch_random_cat_image() -> str:
     """获取随机猫咪图片"""
-    return get_random_cat_image()
+    return await get_random_cat_image_async()
 
 @mcp.tool()
-def fetch_random_dog_image() -> str:
+@instrument_tool
+@with_deadline()
+async def fetch_random_dog_image() -> str:
     """获取随机狗狗图片"""
-    return get_random_dog_image()
+    return await get_random_dog_image_async()
 
 @mcp.tool()
-def fetch_random_fact() -> str:
+@instrument_tool
+@with_deadline()
+async def fetch_random_fact() -> str:
     """获取随机有趣事实"""
-    return get_random_fact()
+    return await get_random_fact_async()
 
 @mcp.tool()
-def fetch_meme_image() -> str:
+@instrument_tool
+@with_deadline()
+async def fetch_meme_image() -> str:
     """获取随机表情包"""
-    return get_meme_image()
+    return await get_meme_image_async()
 
 @mcp.tool()
-def fetch_today_in_history() -> str:
+@instrument_tool
+@with_deadline()
+async def fetch_today_in_history() -> str:
     """获取历史上的今天"""
-    return get_today_in_history()
+    return await get_today_in_history_async()
 
 # ----------------------------------------------------------
 # 实用工具服务
 # ----------------------------------------------------------
 @mcp.tool()
-def create_qr_code(text: str, size: str = "200x200") -> str:
+@instrument_tool
+@with_deadline()
+async def create_qr_code(text: str, size: str = "200x200") -> str:
     """生成二维码"""
-    return generate_qr_code(text, size)
+    return await generate_qr_code_async(text, size)
 
 @mcp.tool()
-def create_short_url(long_url: str) -> str:
+@instrument_tool
+@with_deadline()
+async def create_short_url(long_url: str) -> str:
     """生成短链接"""
-    return shorten_url(long_url)
+    return await shorten_url_async(long_url)
 
 @mcp.tool()
+@instrument_tool
 def create_random_password(length: int = 12, include_symbols: bool = True) -> str:
     """生成随机密码"""
     return generate_password(length, include_symbols)
 
 @mcp.tool()
+@instrument_tool
 def create_uuid(version: int = 4) -> str:
     """生成UUID"""
     return generate_uuid(version)
 
 @mcp.tool()
-def analyze_color(color_input: str) -> str:
+@instrument_tool
+@with_deadline()
+async def analyze_color(color_input: str) -> str:
     """获取颜色信息"""
-    return get_color_info(color_input)
+    return await get_color_info_async(color_input)
 
 def initialize_server():
     """初始化服务器"""
     logger.info("正在启动 Free API MCP Server...")
-    logger.info(f"日志级别: {config_manager.get('log_level')}")
-    logger.info(f"默认超时: {config_manager.get('default_timeout')}秒")
+    logger.info("日志级别: %s", config_manager.get('log_level'))
+    logger.info("默认超时: %s秒", config_manager.get('default_timeout'))
+    
+    # 配置热加载：监视配置文件，并响应 SIGHUP
+    if config_manager.watch():
+        logger.info("正在监视配置文件: %s", config_manager.get('config_file'))
+    config_manager.install_sighup_handler()
+    
+    # 故障注入（测试用），在录制之前启用，使注入的故障也被录制
+    http_manager.configure_faults(config_manager.snapshot().settings)
     
-    # 如果启用健康检查，在启动时检查服务状态
+    # 上游流量录制或回放
+    if http_manager.configure_cassette(config_manager.snapshot().settings):
+        logger.info("上游流量%s: %s", "录制中" if config_manager.get("cassette_mode") == "record" else "回放中",
+                    config_manager.get("cassette_file"))
+    
+    # 如果启用健康检查，在后台检查服务状态，不阻塞客户端握手
     if config_manager.get("enable_health_check", True):
-        logger.info("正在进行启动健康检查...")
-        try:
-            health_status = health_check()
-            logger.info(f"健康检查结果:\n{health_status}")
-        except Exception as e:
-            logger.warning(f"启动健康检查失败: {e}")
+        logger.info("正在后台进行启动健康检查...")
+        submit(health_check()).add_done_callback(_log_startup_health)
+    
+    # 后台刷新最近被请求过的汇率表、历史事件和新闻头条
+    if refresh_scheduler.start():
+        logger.info("后台刷新已启动，无人请求 %s 秒的数据停止刷新", config_manager.get("refresh_idle_after"))
+
+def _log_startup_health(future):
+    """记录启动健康检查的结果"""
+    try:
+        logger.info("健康检查结果:\n%s", future.result())
+    except Exception as e:
+        logger.warning("启动健康检查失败: %s", e)
+
+# 支持的MCP传输方式
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+_LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+def configure_network(host: str, port: int, stateless: bool = False, allowed_hosts: Sequence[str] = (),
+                      json_response: bool = True):
+    """
+    设置网络传输（SSE / Streamable HTTP）的监听地址和会话模式
+    
+    Args:
+        host: 监听地址
+        port: 监听端口
+        stateless: 无状态模式，每个请求独立处理，不依赖进程内的会话（多进程时必须开启）
+        allowed_hosts: 允许的 Host 请求头（如 "api.example.com:*"），用于防止 DNS 重绑定；
+            为空时只监听本机地址才开启检查
+        json_response: Streamable HTTP 直接以 JSON 返回工具结果而不是 SSE 流；
+            工具不发送进度通知，JSON 响应的单次调用开销更低
+    """
+    mcp.settings.host = host
+    mcp.settings.port = port
+    mcp.settings.stateless_http = stateless
+    mcp.settings.json_response = json_response
+    if allowed_hosts:
+        mcp.settings.transport_security = TransportSecuritySettings(
+            enable_dns_rebinding_protection=True,
+            allowed_hosts=list(allowed_hosts),
+            allowed_origins=[f"{scheme}://{h}" for h in allowed_hosts for scheme in ("http", "https")]
+        )
+    elif host in _LOOPBACK_HOSTS:
+        mcp.settings.transport_security = TransportSecuritySettings(
+            enable_dns_rebinding_protection=True,
+            allowed_hosts=["127.0.0.1:*", "localhost:*", "[::1]:*"],
+            allowed_origins=["http://127.0.0.1:*", "http://localhost:*", "http://[::1]:*"]
+        )
+    else:
+        mcp.settings.transport_security = None
+
+def _network_settings():
+    """从配置读取网络传输参数"""
+    allowed_hosts = [h.strip() for h in config_manager.get("mcp_allowed_hosts", "").split(",") if h.strip()]
+    return config_manager.get("mcp_host"), config_manager.get("mcp_port"), allowed_hosts
+
+def create_app():
+    """
+    多进程模式下各工作进程的应用工厂（uvicorn --factory）
+    
+    每个工作进程独立初始化，进程内的所有客户端共享连接池、缓存和熔断状态。
+    """
+    host, port, allowed_hosts = _network_settings()
+    configure_network(host, port, stateless=True, allowed_hosts=allowed_hosts,
+                      json_response=config_manager.get("mcp_json_response"))
+    initialize_server()
+    return mcp.streamable_http_app()
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """命令行参数，未指定的项使用配置（MCP_TRANSPORT 等环境变量）"""
+    parser = argparse.ArgumentParser(description="Free API MCP Server")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=config_manager.get("mcp_transport"),
+                        help="MCP传输方式")
+    parser.add_argument("--host", default=config_manager.get("mcp_host"), help="网络传输的监听地址")
+    parser.add_argument("--port", type=int, default=config_manager.get("mcp_port"), help="网络传输的监听端口")
+    parser.add_argument("--workers", type=int, default=config_manager.get("mcp_workers"),
+                        help="工作进程数（仅 streamable-http，大于1时使用无状态模式）")
+    return parser.parse_args(argv)
+
+def run_workers(host: str, port: int, workers: int):
+    """以多个工作进程运行 Streamable HTTP 服务"""
+    import uvicorn
+    
+    # 工作进程重新导入本模块并从环境变量读取配置
+    os.environ.update(MCP_TRANSPORT="streamable-http", MCP_HOST=host, MCP_PORT=str(port))
+    logger.info("以 %s 个工作进程监听 http://%s:%s%s", workers, host, port, mcp.settings.streamable_http_path)
+    uvicorn.run("src.main:create_app", factory=True, host=host, port=port, workers=workers,
+                log_level=config_manager.get("log_level").lower())
 
-def main():
+def main(argv: Optional[Sequence[str]] = None):
     """主函数"""
+    args = parse_args(argv)
+    if args.workers > 1 and args.transport != "streamable-http":
+        raise SystemExit("多进程模式仅支持 streamable-http 传输（SSE 会话绑定在单个进程内）")
     try:
-        initialize_server()
-        mcp.run(transport="stdio")
+        if args.transport == "stdio":
+            initialize_server()
+            mcp.run(transport="stdio")
+        elif args.workers > 1:
+            run_workers(args.host, args.port, args.workers)
+        else:
+            _, _, allowed_hosts = _network_settings()
+            configure_network(args.host, args.port, stateless=config_manager.get("mcp_stateless_http"),
+                              allowed_hosts=allowed_hosts, json_response=config_manager.get("mcp_json_response"))
+            initialize_server()
+            logger.info("MCP服务监听 http://%s:%s（%s）", args.host, args.port, args.transport)
+            mcp.run(transport=args.transport)
     except KeyboardInterrupt:
         logger.info("服务器正在关闭...")
         http_manager.close()
     except Exception as e:
-        logger.error(f"服务器启动失败: {e}")
+        logger.error("服务器启动失败: %s", e)
         raise
 
 if __name__ == "__main__":
@@ -1,12 +1,13 @@
 """
 内容服务：励志名言和笑话
 """
+from ..core.async_runner import run_sync
 from ..core.config import config_manager
 from ..core.http_client import http_manager
 from ..core.error_handler import handle_api_error
 from ..core.fallback_manager import fallback_manager
 
-def get_inspirational_quote() -> str:
+async def get_inspirational_quote_async() -> str:
     """获取励志名言"""
     service_config = config_manager.get_service_config("quotes")
     
@@ -19,11 +20,11 @@ def get_inspirational_quote() -> str:
         "生活中最重要的事情不是你遭遇了什么，而是你记住了什么，又是如何记住的。 —— 加西亚·马尔克斯"
     ]
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # Quotable API
             if "quotable.io" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 if 'content' in data and 'author' in data:
@@ -35,7 +36,7 @@ def get_inspirational_quote() -> str:
             
             # ZenQuotes API 备用
             elif "zenquotes.io" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 if isinstance(data, list) and len(data) > 0:
@@ -53,7 +54,7 @@ def get_inspirational_quote() -> str:
             error_msg = handle_api_error(e, "励志名言获取", endpoint)
             raise Exception(error_msg)
     
-    result = fallback_manager.execute_with_fallback(service_config, make_request)
+    result = await fallback_manager.execute_with_fallback_async(service_config, make_request)
     
     # 如果所有API都失败，fallback_manager会返回错误信息，此时使用预设内容
     if "不可用" in result or "失败" in result:
@@ -63,7 +64,11 @@ def get_inspirational_quote() -> str:
     
     return result
 
-def get_random_joke() -> str:
+def get_inspirational_quote() -> str:
+    """获取励志名言（get_inspirational_quote_async 的同步包装）"""
+    return run_sync(get_inspirational_quote_async())
+
+async def get_random_joke_async() -> str:
     """获取随机笑话"""
     service_config = config_manager.get_service_config("jokes")
     
@@ -76,11 +81,11 @@ def get_random_joke() -> str:
         "为什么程序员总是混淆万圣节和圣诞节？因为Oct 31 == Dec 25！"
     ]
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # JokeAPI
             if "jokeapi.dev" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 if data.get('error', False):
@@ -100,7 +105,7 @@ def get_random_joke() -> str:
             
             # Official Joke API 备用
             elif "official-joke-api" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 if 'setup' in data and 'punchline' in data:
@@ -116,7 +121,7 @@ def get_random_joke() -> str:
             error_msg = handle_api_error(e, "笑话获取", endpoint)
             raise Exception(error_msg)
     
-    result = fallback_manager.execute_with_fallback(service_config, make_request)
+    result = await fallback_manager.execute_with_fallback_async(service_config, make_request)
     
     # 如果所有API都失败，fallback_manager会返回错误信息，此时使用预设内容
     if "不可用" in result or "失败" in result:
@@ -126,7 +131,11 @@ def get_random_joke() -> str:
     
     return result
 
-def get_daily_motivation(content_type: str = "quote") -> str:
+def get_random_joke() -> str:
+    """获取随机笑话（get_random_joke_async 的同步包装）"""
+    return run_sync(get_random_joke_async())
+
+async def get_daily_motivation_async(content_type: str = "quote") -> str:
     """
     获取每日励志内容
     
@@ -136,6 +145,10 @@ def get_daily_motivation(content_type: str = "quote") -> str:
     content_type = content_type.lower().strip()
     
     if content_type == "joke":
-        return get_random_joke()
+        return await get_random_joke_async()
     else:
-        return get_inspirational_quote()
\ No newline at end of file
+        return await get_inspirational_quote_async()
+
+def get_daily_motivation(content_type: str = "quote") -> str:
+    """获取每日励志内容（get_daily_motivation_async 的同步包装）"""
+    return run_sync(get_daily_motivation_async(content_type))
\ No newline at end of file
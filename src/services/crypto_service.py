@@ -1,12 +1,13 @@
 """
 加密货币价格查询服务
 """
+from ..core.async_runner import run_sync
 from ..core.config import config_manager
 from ..core.http_client import http_manager
-from ..core.error_handler import handle_api_error
+from ..core.error_handler import NotFoundError, handle_api_error
 from ..core.fallback_manager import fallback_manager
 
-def get_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
+async def get_crypto_price_async(crypto_symbol: str, vs_currency: str = "usd") -> str:
     """
     查询加密货币价格信息
     
@@ -18,7 +19,7 @@ def get_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
     crypto_symbol = crypto_symbol.lower().strip()
     vs_currency = vs_currency.lower().strip()
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # CoinGecko API
             if "coingecko" in endpoint:
@@ -28,7 +29,7 @@ def get_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
                     'include_market_cap': 'true',
                     'include_24hr_change': 'true'
                 }
-                response = http_manager.get(endpoint, params=params, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, params=params, timeout=service_config.timeout)
                 data = response.json()
                 
                 if crypto_symbol in data:
@@ -46,13 +47,13 @@ def get_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
                         f"📈 24小时变化: {change_24h:+.2f}%"
                     )
                 else:
-                    raise ValueError(f"未找到加密货币: {crypto_symbol}")
+                    raise NotFoundError(f"未找到加密货币: {crypto_symbol}")
             
             # CoinCap API 备用
             elif "coincap" in endpoint:
                 # 首先搜索资产ID
                 search_url = f"{endpoint}?search={crypto_symbol}&limit=1"
-                response = http_manager.get(search_url, timeout=service_config.timeout)
+                response = await http_manager.get_async(search_url, timeout=service_config.timeout)
                 data = response.json()
                 
                 if data.get('data') and len(data['data']) > 0:
@@ -78,7 +79,7 @@ def get_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
                         f"📈 24小时变化: {change_24h:+.2f}%"
                     )
                 else:
-                    raise ValueError(f"未找到加密货币: {crypto_symbol}")
+                    raise NotFoundError(f"未找到加密货币: {crypto_symbol}")
             
             # CryptoCompare API 备用
             elif "cryptocompare" in endpoint:
@@ -86,7 +87,7 @@ def get_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
                     'fsym': crypto_symbol.upper(),
                     'tsyms': vs_currency.upper()
                 }
-                response = http_manager.get(endpoint, params=params, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, params=params, timeout=service_config.timeout)
                 data = response.json()
                 
                 if vs_currency.upper() in data:
@@ -99,7 +100,7 @@ def get_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
                         f"📊 数据来源: CryptoCompare"
                     )
                 else:
-                    raise ValueError(f"未找到加密货币: {crypto_symbol}")
+                    raise NotFoundError(f"未找到加密货币: {crypto_symbol}")
             
             raise ValueError("未知的API端点")
             
@@ -107,4 +108,10 @@ def get_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
             error_msg = handle_api_error(e, "加密货币价格查询", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
\ No newline at end of file
+    return await fallback_manager.execute_with_fallback_async(
+        service_config, make_request, coalesce_key=(crypto_symbol, vs_currency)
+    )
+
+def get_crypto_price(crypto_symbol: str, vs_currency: str = "usd") -> str:
+    """查询加密货币价格信息（get_crypto_price_async 的同步包装）"""
+    return run_sync(get_crypto_price_async(crypto_symbol, vs_currency))
\ No newline at end of file
@@ -1,20 +1,22 @@
 """
 娱乐服务：随机图片、表情包、有趣事实等
 """
+from ..core.async_runner import run_sync
 from ..core.config import config_manager
 from ..core.http_client import http_manager
 from ..core.error_handler import handle_api_error
 from ..core.fallback_manager import fallback_manager
+from ..core.refresh_scheduler import Dataset, refresh_scheduler
 
-def get_random_cat_image() -> str:
+async def get_random_cat_image_async() -> str:
     """获取随机猫咪图片"""
     service_config = config_manager.get_service_config("cat_images")
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # TheCatAPI
             if "thecatapi.com" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 if isinstance(data, list) and len(data) > 0:
@@ -35,7 +37,7 @@ def get_random_cat_image() -> str:
             
             # Cataas API 备用
             elif "cataas.com" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 if response.status_code == 200:
                     # 这个API直接返回图片，我们返回URL
                     return (
@@ -53,17 +55,21 @@ def get_random_cat_image() -> str:
             error_msg = handle_api_error(e, "猫咪图片获取", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(service_config, make_request)
 
-def get_random_dog_image() -> str:
+def get_random_cat_image() -> str:
+    """获取随机猫咪图片（get_random_cat_image_async 的同步包装）"""
+    return run_sync(get_random_cat_image_async())
+
+async def get_random_dog_image_async() -> str:
     """获取随机狗狗图片"""
     service_config = config_manager.get_service_config("dog_images")
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # Dog CEO API
             if "dog.ceo" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 if data.get('status') == 'success':
@@ -90,7 +96,7 @@ def get_random_dog_image() -> str:
             
             # TheDogAPI 备用
             elif "thedogapi.com" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 if isinstance(data, list) and len(data) > 0:
@@ -116,9 +122,13 @@ def get_random_dog_image() -> str:
             error_msg = handle_api_error(e, "狗狗图片获取", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(service_config, make_request)
 
-def get_random_fact() -> str:
+def get_random_dog_image() -> str:
+    """获取随机狗狗图片（get_random_dog_image_async 的同步包装）"""
+    return run_sync(get_random_dog_image_async())
+
+async def get_random_fact_async() -> str:
     """获取随机有趣事实"""
     service_config = config_manager.get_service_config("random_facts")
     
@@ -136,11 +146,11 @@ def get_random_fact() -> str:
         "猫咪无法品尝甜味，因为它们缺少甜味受体。"
     ]
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # Useless Facts API
             if "uselessfacts.jsph.pl" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 fact = data.get('text', '')
@@ -152,7 +162,7 @@ def get_random_fact() -> str:
             # Fun Facts API 备用
             elif "api.api-ninjas.com" in endpoint:
                 headers = {'X-Api-Key': 'your_api_key'}  # 需要API密钥
-                response = http_manager.get(endpoint, headers=headers, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, headers=headers, timeout=service_config.timeout)
                 data = response.json()
                 
                 if isinstance(data, list) and len(data) > 0:
@@ -168,7 +178,7 @@ def get_random_fact() -> str:
             error_msg = handle_api_error(e, "有趣事实获取", endpoint)
             raise Exception(error_msg)
     
-    result = fallback_manager.execute_with_fallback(service_config, make_request)
+    result = await fallback_manager.execute_with_fallback_async(service_config, make_request)
     
     # 如果所有API都失败，使用本地备用事实
     if "不可用" in result or "失败" in result:
@@ -178,15 +188,19 @@ def get_random_fact() -> str:
     
     return result
 
-def get_meme_image() -> str:
+def get_random_fact() -> str:
+    """获取随机有趣事实（get_random_fact_async 的同步包装）"""
+    return run_sync(get_random_fact_async())
+
+async def get_meme_image_async() -> str:
     """获取随机表情包"""
     service_config = config_manager.get_service_config("meme_images")
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # Meme API
             if "meme-api.com" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 if data.get('count', 0) > 0:
@@ -208,7 +222,7 @@ def get_meme_image() -> str:
             
             # Reddit Meme API 备用
             elif "reddit.com" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 posts = data.get('data', {}).get('children', [])
@@ -234,17 +248,22 @@ def get_meme_image() -> str:
             error_msg = handle_api_error(e, "表情包获取", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(service_config, make_request)
 
-def get_today_in_history() -> str:
+def get_meme_image() -> str:
+    """获取随机表情包（get_meme_image_async 的同步包装）"""
+    return run_sync(get_meme_image_async())
+
+async def get_today_in_history_async() -> str:
     """获取历史上的今天"""
     service_config = config_manager.get_service_config("history_today")
+    refresh_scheduler.touch("history_today")
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # Today in History API
             if "history.muffinlabs.com" in endpoint:
-                response = http_manager.get(endpoint, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, timeout=service_config.timeout)
                 data = response.json()
                 
                 events = data.get('data', {}).get('Events', [])
@@ -268,4 +287,14 @@ def get_today_in_history() -> str:
             error_msg = handle_api_error(e, "历史事件获取", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
\ No newline at end of file
+    return await fallback_manager.execute_with_fallback_async(
+        service_config, make_request, coalesce_key="today"
+    )
+
+# 上游按日期返回事件，午夜后尽快刷新，避免次日仍返回前一天的缓存
+refresh_scheduler.register(Dataset("history_today", "history_today",
+                                   lambda key: get_today_in_history_async(), daily=True))
+
+def get_today_in_history() -> str:
+    """获取历史上的今天（get_today_in_history_async 的同步包装）"""
+    return run_sync(get_today_in_history_async())
\ No newline at end of file
@@ -1,12 +1,14 @@
 """
 汇率查询服务
 """
+from ..core.async_runner import run_sync
 from ..core.config import config_manager
 from ..core.http_client import http_manager
-from ..core.error_handler import handle_api_error
+from ..core.error_handler import NotFoundError, handle_api_error
 from ..core.fallback_manager import fallback_manager
+from ..core.refresh_scheduler import Dataset, refresh_scheduler
 
-def get_exchange_rate(from_currency: str, to_currency: str, amount: float = 1.0) -> str:
+async def get_exchange_rate_async(from_currency: str, to_currency: str, amount: float = 1.0) -> str:
     """
     查询货币汇率转换
     
@@ -34,12 +36,14 @@ def get_exchange_rate(from_currency: str, to_currency: str, amount: float = 1.0)
     if from_currency == to_currency:
         return f"💱 {amount} {from_currency} = {amount} {to_currency}\n\n汇率: 1.0000 (相同货币)"
     
-    def make_request(endpoint: str) -> str:
+    refresh_scheduler.touch("exchange_rates", from_currency)
+    
+    async def make_request(endpoint: str) -> str:
         try:
             # ExchangeRate-API
             if "exchangerate-api.com" in endpoint:
                 url = endpoint.format(from_currency)
-                response = http_manager.get(url, timeout=service_config.timeout)
+                response = await http_manager.get_async(url, timeout=service_config.timeout)
                 data = response.json()
                 
                 # 检查是否有rates字段（新版API格式）或conversion_rates字段（旧版API格式）
@@ -66,13 +70,13 @@ def get_exchange_rate(from_currency: str, to_currency: str, amount: float = 1.0)
                 elif not rates:
                     raise ValueError("API返回数据格式错误：缺少汇率数据")
                 else:
-                    raise ValueError(f"不支持的目标货币: {to_currency}")
+                    raise NotFoundError(f"不支持的目标货币: {to_currency}")
             
             # Fixer.io API 备用
             elif "fixer.io" in endpoint:
                 url = endpoint.format(from_currency)
                 params = {'symbols': to_currency}
-                response = http_manager.get(url, params=params, timeout=service_config.timeout)
+                response = await http_manager.get_async(url, params=params, timeout=service_config.timeout)
                 data = response.json()
                 
                 if data.get('success', False):
@@ -88,7 +92,7 @@ def get_exchange_rate(from_currency: str, to_currency: str, amount: float = 1.0)
                             f"📊 数据来源: Fixer.io"
                         )
                     else:
-                        raise ValueError(f"不支持的目标货币: {to_currency}")
+                        raise NotFoundError(f"不支持的目标货币: {to_currency}")
                 else:
                     error_info = data.get('error', {})
                     raise ValueError(f"API错误: {error_info.get('info', '未知错误')}")
@@ -136,7 +140,19 @@ def get_exchange_rate(from_currency: str, to_currency: str, amount: float = 1.0)
             error_msg = handle_api_error(e, "汇率查询", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(
+        service_config, make_request, coalesce_key=(from_currency, to_currency, amount)
+    )
+
+async def _refresh_rates(base_currency: str) -> str:
+    """刷新基准货币的汇率表（主端点按基准货币返回完整的汇率表，目标货币不影响缓存）"""
+    return await get_exchange_rate_async(base_currency, "EUR" if base_currency == "USD" else "USD")
+
+refresh_scheduler.register(Dataset("exchange_rates", "exchange_rate", _refresh_rates))
+
+def get_exchange_rate(from_currency: str, to_currency: str, amount: float = 1.0) -> str:
+    """查询货币汇率转换（get_exchange_rate_async 的同步包装）"""
+    return run_sync(get_exchange_rate_async(from_currency, to_currency, amount))
 
 def get_supported_currencies() -> str:
     """获取支持的货币代码列表"""
@@ -2,11 +2,28 @@
 IP信息查询服务
 """
 from urllib.parse import quote
+import asyncio
 import socket
+from ..core.async_runner import run_sync
 from ..core.config import config_manager
 from ..core.http_client import http_manager
 from ..core.error_handler import handle_api_error
 from ..core.fallback_manager import fallback_manager
+from ..core.tracing import tracer
+
+# 表示域名确实不存在的解析错误；暂时性的解析失败（如 EAI_AGAIN）不记入负缓存
+_UNRESOLVABLE_ERRORS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+def _check_unresolvable(host: str):
+    """域名在负缓存中时直接抛出上次的解析错误，不再查询DNS"""
+    error = fallback_manager.negative_cache.get(("dns", host.lower()))
+    if error is not None:
+        raise socket.gaierror(*error)
+
+def _remember_unresolvable(host: str, e: socket.gaierror):
+    """记住不存在的域名"""
+    if e.errno in _UNRESOLVABLE_ERRORS:
+        fallback_manager.negative_cache.set(("dns", host.lower()), e.args, config_manager.get("negative_dns_ttl", 60))
 
 def resolve(host: str) -> str:
     """解析主机名或IP地址"""
@@ -14,17 +31,39 @@ def resolve(host: str) -> str:
         socket.inet_aton(host)
         return host
     except OSError:
-        return socket.gethostbyname(host)
+        _check_unresolvable(host)
+        with tracer.span("dns.resolve", host=host):
+            try:
+                return socket.gethostbyname(host)
+            except socket.gaierror as e:
+                _remember_unresolvable(host, e)
+                raise
 
-def ip_location(ip_or_domain: str) -> str:
+async def resolve_async(host: str) -> str:
+    """异步解析主机名或IP地址，DNS查询不阻塞事件循环"""
+    try:
+        socket.inet_aton(host)
+        return host
+    except OSError:
+        _check_unresolvable(host)
+        loop = asyncio.get_running_loop()
+        with tracer.span("dns.resolve", host=host):
+            try:
+                infos = await loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+            except socket.gaierror as e:
+                _remember_unresolvable(host, e)
+                raise
+        return infos[0][4][0]
+
+async def ip_location_async(ip_or_domain: str) -> str:
     """查询IP地址或域名的基本归属地信息"""
     service_config = config_manager.get_service_config("ip_location")
-    target = resolve(ip_or_domain.strip())
+    target = await resolve_async(ip_or_domain.strip())
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             url = endpoint.format(quote(target))
-            response = http_manager.get(url, timeout=service_config.timeout)
+            response = await http_manager.get_async(url, timeout=service_config.timeout)
             data = response.json()
             
             # ip-api.com 响应格式
@@ -55,19 +94,25 @@ def ip_location(ip_or_domain: str) -> str:
             error_msg = handle_api_error(e, "IP归属地查询", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(
+        service_config, make_request, coalesce_key=("location", ip_or_domain)
+    )
 
-def ip_detailed_info(ip_or_domain: str) -> str:
+def ip_location(ip_or_domain: str) -> str:
+    """查询IP地址或域名的基本归属地信息（ip_location_async 的同步包装）"""
+    return run_sync(ip_location_async(ip_or_domain))
+
+async def ip_detailed_info_async(ip_or_domain: str) -> str:
     """查询IP地址或域名的详细信息，包括地理位置、ISP、时区等"""
     service_config = config_manager.get_service_config("ip_location")
-    target = resolve(ip_or_domain.strip())
+    target = await resolve_async(ip_or_domain.strip())
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # 使用更详细的字段查询
             if "ip-api.com" in endpoint:
                 detailed_url = f"http://ip-api.com/json/{quote(target)}?fields=status,message,country,countryCode,region,regionName,city,zip,lat,lon,timezone,isp,org,as,query"
-                response = http_manager.get(detailed_url, timeout=service_config.timeout)
+                response = await http_manager.get_async(detailed_url, timeout=service_config.timeout)
                 data = response.json()
                 
                 if data.get("status") == "success":
@@ -91,7 +136,7 @@ def ip_detailed_info(ip_or_domain: str) -> str:
             # 备用端点的简化处理
             else:
                 url = endpoint.format(quote(target))
-                response = http_manager.get(url, timeout=service_config.timeout)
+                response = await http_manager.get_async(url, timeout=service_config.timeout)
                 data = response.json()
                 
                 # 通用格式处理
@@ -105,9 +150,15 @@ def ip_detailed_info(ip_or_domain: str) -> str:
             error_msg = handle_api_error(e, "IP详细信息查询", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(
+        service_config, make_request, coalesce_key=("detailed", ip_or_domain)
+    )
 
-def ip_security_check(ip_address: str) -> str:
+def ip_detailed_info(ip_or_domain: str) -> str:
+    """查询IP地址或域名的详细信息（ip_detailed_info_async 的同步包装）"""
+    return run_sync(ip_detailed_info_async(ip_or_domain))
+
+async def ip_security_check_async(ip_address: str) -> str:
     """检查IP地址的安全威胁信息"""
     # 验证输入是否为有效IP地址
     try:
@@ -116,7 +167,7 @@ def ip_security_check(ip_address: str) -> str:
     except OSError:
         # 如果不是IP地址，尝试解析域名
         try:
-            target_ip = resolve(ip_address.strip())
+            target_ip = await resolve_async(ip_address.strip())
         except:
             return f"❌ 无效的IP地址或域名: {ip_address}"
     
@@ -174,24 +225,28 @@ def ip_security_check(ip_address: str) -> str:
     
     return result
 
-def ip_comprehensive_analysis(ip_or_domain: str) -> str:
+def ip_security_check(ip_address: str) -> str:
+    """检查IP地址的安全威胁信息（ip_security_check_async 的同步包装）"""
+    return run_sync(ip_security_check_async(ip_address))
+
+async def ip_comprehensive_analysis_async(ip_or_domain: str) -> str:
     """对IP地址或域名进行综合分析，包括地理位置、网络信息和安全检查"""
     try:
-        target = resolve(ip_or_domain.strip())
+        target = await resolve_async(ip_or_domain.strip())
         
         result = f"🔍 {ip_or_domain} 综合分析报告\n"
         result += "=" * 50 + "\n\n"
         
         # 获取详细信息
         try:
-            detailed_info = ip_detailed_info(ip_or_domain)
+            detailed_info = await ip_detailed_info_async(ip_or_domain)
             result += detailed_info + "\n\n"
         except Exception as e:
             result += f"⚠️ 详细信息获取失败: {str(e)[:100]}...\n\n"
         
         # 获取安全检查信息
         try:
-            security_info = ip_security_check(target)
+            security_info = await ip_security_check_async(target)
             result += security_info + "\n\n"
         except Exception as e:
             result += f"⚠️ 安全检查失败: {str(e)[:100]}...\n\n"
@@ -202,4 +257,8 @@ def ip_comprehensive_analysis(ip_or_domain: str) -> str:
         return result
         
     except Exception as e:
-        return f"❌ 综合分析失败: {str(e)}"
\ No newline at end of file
+        return f"❌ 综合分析失败: {str(e)}"
+
+def ip_comprehensive_analysis(ip_or_domain: str) -> str:
+    """对IP地址或域名进行综合分析（ip_comprehensive_analysis_async 的同步包装）"""
+    return run_sync(ip_comprehensive_analysis_async(ip_or_domain))
\ No newline at end of file
@@ -4,12 +4,13 @@
 import uuid
 import random
 import string
+from ..core.async_runner import run_sync
 from ..core.config import config_manager
 from ..core.http_client import http_manager
 from ..core.error_handler import handle_api_error
 from ..core.fallback_manager import fallback_manager
 
-def generate_qr_code(text: str, size: str = "200x200") -> str:
+async def generate_qr_code_async(text: str, size: str = "200x200") -> str:
     """生成二维码"""
     service_config = config_manager.get_service_config("qr_code")
     
@@ -20,7 +21,7 @@ def generate_qr_code(text: str, size: str = "200x200") -> str:
     if len(text) > 1000:
         return "❌ 错误: 文本内容过长，请限制在1000字符以内"
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # QR Server API
             if "qrserver.com" in endpoint:
@@ -33,7 +34,7 @@ def generate_qr_code(text: str, size: str = "200x200") -> str:
                 qr_url = f"{endpoint}?size={size}&data={text}"
                 
                 # 测试URL是否可访问
-                response = http_manager.get(qr_url, timeout=service_config.timeout)
+                response = await http_manager.get_async(qr_url, timeout=service_config.timeout)
                 if response.status_code == 200:
                     return (
                         f"📱 二维码生成成功:\n\n"
@@ -53,7 +54,7 @@ def generate_qr_code(text: str, size: str = "200x200") -> str:
                 }
                 
                 qr_url = f"{endpoint}?size={size}&data={text}"
-                response = http_manager.get(qr_url, timeout=service_config.timeout)
+                response = await http_manager.get_async(qr_url, timeout=service_config.timeout)
                 
                 if response.status_code == 200:
                     return (
@@ -73,9 +74,13 @@ def generate_qr_code(text: str, size: str = "200x200") -> str:
             error_msg = handle_api_error(e, "二维码生成", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(service_config, make_request)
 
-def shorten_url(long_url: str) -> str:
+def generate_qr_code(text: str, size: str = "200x200") -> str:
+    """生成二维码（generate_qr_code_async 的同步包装）"""
+    return run_sync(generate_qr_code_async(text, size))
+
+async def shorten_url_async(long_url: str) -> str:
     """生成短链接"""
     service_config = config_manager.get_service_config("url_shortener")
     
@@ -86,12 +91,12 @@ def shorten_url(long_url: str) -> str:
     if not (long_url.startswith('http://') or long_url.startswith('https://')):
         long_url = 'https://' + long_url
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # TinyURL API
             if "tinyurl.com" in endpoint:
                 params = {'url': long_url}
-                response = http_manager.get(endpoint, params=params, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, params=params, timeout=service_config.timeout)
                 
                 if response.status_code == 200:
                     short_url = response.text.strip()
@@ -111,7 +116,7 @@ def shorten_url(long_url: str) -> str:
                     'format': 'simple',
                     'url': long_url
                 }
-                response = http_manager.get(endpoint, params=params, timeout=service_config.timeout)
+                response = await http_manager.get_async(endpoint, params=params, timeout=service_config.timeout)
                 
                 if response.status_code == 200:
                     short_url = response.text.strip()
@@ -131,7 +136,11 @@ def shorten_url(long_url: str) -> str:
             error_msg = handle_api_error(e, "短链接生成", endpoint)
             raise Exception(error_msg)
     
-    return fallback_manager.execute_with_fallback(service_config, make_request)
+    return await fallback_manager.execute_with_fallback_async(service_config, make_request)
+
+def shorten_url(long_url: str) -> str:
+    """生成短链接（shorten_url_async 的同步包装）"""
+    return run_sync(shorten_url_async(long_url))
 
 def generate_password(length: int = 12, include_symbols: bool = True) -> str:
     """生成随机密码"""
@@ -234,7 +243,7 @@ def generate_uuid(version: int = 4) -> str:
     except Exception as e:
         return f"❌ UUID生成失败: {str(e)}"
 
-def get_color_info(color_input: str) -> str:
+async def get_color_info_async(color_input: str) -> str:
     """获取颜色信息"""
     service_config = config_manager.get_service_config("color_info")
     
@@ -258,12 +267,12 @@ def get_color_info(color_input: str) -> str:
     if len(color_input) == 3:
         color_input = ''.join([c*2 for c in color_input])
     
-    def make_request(endpoint: str) -> str:
+    async def make_request(endpoint: str) -> str:
         try:
             # TheColorAPI
             if "thecolorapi.com" in endpoint:
                 url = f"{endpoint}?hex={color_input}"
-                response = http_manager.get(url, timeout=service_config.timeout)
+                response = await http_manager.get_async(url, timeout=service_config.timeout)
                 data = response.json()
                 
                 hex_value = data.get('hex', {}).get('value', '')
@@ -291,7 +300,9 @@ def get_color_info(color_input: str) -> str:
     
     # 如果API失败，提供基本的颜色信息
     try:
-        result = fallback_manager.execute_with_fallback(service_config, make_request)
+        result = await fallback_manager.execute_with_fallback_async(
+            service_config, make_request, coalesce_key=color_input
+        )
         return result
     except:
         # 本地计算RGB值
@@ -305,4 +316,8 @@ def get_color_info(color_input: str) -> str:
             f"🔴 RGB: rgb({r}, {g}, {b})\n"
             f"💡 提示: 这是基本的颜色信息，详细信息需要API支持\n"
             f"📊 数据来源: 本地计算"
-        )
\ No newline at end of file
+        )
+
+def get_color_info(color_input: str) -> str:
+    """获取颜色信息（get_color_info_async 的同步包装）"""
+    return run_sync(get_color_info_async(color_input))
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+测试共用的辅助工具
+
+pytest 自动加载本模块；测试文件通过 from tests.conftest import ... 使用，直接运行单个测试文件时同样可用。
+"""
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import CacheEntry
+
+class FakeClock:
+    """可手动推进的时钟"""
+    
+    def __init__(self, now: float = 0.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+def make_entry(content: bytes = b"{}", ttl: float = 60) -> CacheEntry:
+    """创建测试用缓存条目"""
+    return CacheEntry(
+        url="https://upstream.test/",
+        status_code=200,
+        headers=(("content-type", "application/json"),),
+        content=content,
+        expires_at=time.time() + ttl
+    )
\ No newline at end of file
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+异步执行路径单元测试
+"""
+import sys
+import os
+import time
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import ServiceConfig
+from src.core.http_client import HTTPClientManager
+from src.core.fallback_manager import FallbackManager
+
+async def slow_handler(request: httpx.Request) -> httpx.Response:
+    """模拟耗时0.2秒的上游服务"""
+    await asyncio.sleep(0.2)
+    return httpx.Response(200, json={"path": request.url.path})
+
+class TestAsyncPath(unittest.TestCase):
+    """异步执行路径测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.http = HTTPClientManager(transport=httpx.MockTransport(slow_handler))
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+        self.config = ServiceConfig(
+            name="mock",
+            primary_endpoint="https://primary.test/a",
+            fallback_endpoints=["https://fallback.test/b"]
+        )
+    
+    def test_concurrent_requests_overlap(self):
+        """并发请求的网络等待应当重叠"""
+        async def run():
+            start = time.perf_counter()
+            responses = await asyncio.gather(*[
+                self.http.get_async(f"https://upstream.test/{i}") for i in range(5)
+            ])
+            return time.perf_counter() - start, responses
+        
+        elapsed, responses = asyncio.run(run())
+        self.assertEqual(len(responses), 5)
+        self.assertLess(elapsed, 0.6)
+    
+    def test_sync_get_wrapper(self):
+        """同步get是异步实现的包装"""
+        response = self.http.get("https://upstream.test/sync")
+        self.assertEqual(response.json(), {"path": "/sync"})
+    
+    def test_async_fallback(self):
+        """主端点失败时异步切换到备用端点"""
+        async def make_request(endpoint: str) -> str:
+            if "primary" in endpoint:
+                raise ValueError("主端点失败")
+            response = await self.http.get_async(endpoint)
+            return response.json()["path"]
+        
+        result = asyncio.run(self.fallback.execute_with_fallback_async(self.config, make_request))
+        self.assertEqual(result, "/b")
+        self.assertEqual(self.fallback.get_circuit_states()["https://primary.test/a"]["failure_rate"], 1.0)
+    
+    def test_sync_fallback_wrapper(self):
+        """同步execute_with_fallback接受同步请求函数"""
+        def make_request(endpoint: str) -> str:
+            return self.http.get(endpoint).json()["path"]
+        
+        result = self.fallback.execute_with_fallback(self.config, make_request)
+        self.assertEqual(result, "/a")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+基准测试工具单元测试
+"""
+import sys
+import os
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_gen import LoadGenerator, parse_args, read_rss_mib
+from benchmarks.tool_bench import compare, run_suite
+from benchmarks.workload import percentile
+from benchmarks.upstreams import StandInUpstreams, UpstreamProfile, installed, upstream_argv
+from src.core.http_client import http_manager
+
+class TestStandInUpstreams(unittest.TestCase):
+    """替身上游测试"""
+    
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_every_builtin_host_has_fixture(self):
+        """内置服务的所有端点主机都有替身响应"""
+        self.assertEqual(StandInUpstreams().missing_fixtures, [])
+    
+    def test_error_rate_and_payload(self):
+        """按配置注入错误和填充响应体"""
+        upstreams = StandInUpstreams(
+            profiles={"jokes": UpstreamProfile(latency=0, jitter=0, error_rate=1.0)},
+            default=UpstreamProfile(latency=0, jitter=0, payload_bytes=100)
+        )
+        _, failed = upstreams.respond(httpx.Request("GET", "https://v2.jokeapi.dev/joke/Any"))
+        self.assertEqual(failed.status_code, 503)
+        _, padded = upstreams.respond(httpx.Request("GET", "https://api.quotable.io/random"))
+        self.assertEqual(len(padded.json()["padding"]), 100)
+        _, unknown = upstreams.respond(httpx.Request("GET", "https://unknown.test/"))
+        self.assertEqual(unknown.status_code, 404)
+    
+    def test_installed_restores_state(self):
+        """退出后恢复原来的缓存和限流器"""
+        cache, limiter = http_manager.cache, http_manager.rate_limiter
+        with installed(StandInUpstreams()):
+            self.assertIsNone(http_manager.cache)
+            self.assertIsNone(http_manager.rate_limiter)
+        self.assertIs(http_manager.cache, cache)
+        self.assertIs(http_manager.rate_limiter, limiter)
+
+class TestToolBench(unittest.TestCase):
+    """工具基准测试"""
+    
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_percentile(self):
+        """最近秩分位数"""
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+    
+    def test_run_suite(self):
+        """替身上游下工具调用全部成功并输出各项指标"""
+        upstreams = StandInUpstreams(default=UpstreamProfile(latency=0, jitter=0), seed=1)
+        tools = ["query_ip_location", "query_exchange_rate", "create_uuid"]
+        with installed(upstreams):
+            report = asyncio.run(run_suite(tools, iterations=4, concurrency=2, alloc_iterations=1))
+        
+        self.assertEqual(sorted(report["tools"]), sorted(tools))
+        for result in report["tools"].values():
+            self.assertEqual(result["calls"], 4)
+            self.assertEqual(result["errors"], 0)
+            self.assertIn("alloc_peak_kib", result)
+        self.assertEqual(report["mixed"]["calls"], 12)
+        self.assertGreater(upstreams.requests["ip-api.com"], 0)
+    
+    def test_compare(self):
+        """p95 变慢或吞吐量下降超过容忍度时报告回归"""
+        baseline = {"tools": {"a": {"p95_ms": 10.0, "throughput_rps": 100.0}}, "mixed": {}}
+        faster = {"tools": {"a": {"p95_ms": 10.5, "throughput_rps": 95.0}}, "mixed": {}}
+        slower = {"tools": {"a": {"p95_ms": 20.0, "throughput_rps": 50.0}}, "mixed": {}}
+        self.assertEqual(compare(faster, baseline, tolerance=0.2), [])
+        self.assertEqual(len(compare(slower, baseline, tolerance=0.2)), 2)
+
+class TestLoadGenerator(unittest.TestCase):
+    """stdio 压测测试"""
+    
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_upstream_argv_round_trip(self):
+        """替身上游参数原样传给服务器子进程"""
+        args = parse_args(["--latency", "0.1", "--error-rate", "0.2", "--seed", "7"])
+        again = parse_args(upstream_argv(args))
+        self.assertEqual((again.latency, again.error_rate, again.seed), (0.1, 0.2, 7))
+    
+    def test_read_rss(self):
+        """读取进程常驻内存，进程不存在时返回 None"""
+        if not os.path.exists("/proc/self/status"):
+            self.skipTest("没有 /proc")
+        self.assertGreater(read_rss_mib(os.getpid()), 0)
+        self.assertIsNone(read_rss_mib(2 ** 22 + 1))
+    
+    def test_stdio_run(self):
+        """通过 stdio 启动服务器，按权重回放调用并报告启动耗时和 RSS"""
+        generator = LoadGenerator(
+            upstream_argv(parse_args(["--latency", "0", "--jitter", "0"])),
+            {"create_uuid": 1, "query_ip_location": 1},
+            concurrency=2, duration=30, max_requests=10, rss_interval=0.1
+        )
+        report = asyncio.run(generator.run(instances=1))
+        
+        self.assertEqual(report["overall"]["calls"], 10)
+        self.assertEqual(report["overall"]["errors"], 0)
+        instance = report["instances"][0]
+        self.assertGreater(instance["startup_ms"], 0)
+        self.assertGreaterEqual(instance["time_to_first_tool_call_ms"], instance["startup_ms"])
+        
+        bad = LoadGenerator([], {"no_such_tool": 1}, max_requests=1)
+        with self.assertRaises(ValueError):
+            asyncio.run(bad.run())
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+上游流量录制与回放单元测试
+"""
+import sys
+import os
+import asyncio
+import gzip
+import shutil
+import tempfile
+import time
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cassette import (
+    TIMING_FAST, TIMING_ORIGINAL, CassetteMiss, CassetteReader, CassetteWriter,
+    RecordingTransport, ReplayTransport
+)
+from src.core.http_client import HTTPClientManager
+
+class TestCassette(unittest.TestCase):
+    """录制与回放测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "traffic.cassette")
+        self.counter = 0
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    async def upstream(self, request: httpx.Request) -> httpx.Response:
+        self.counter += 1
+        if request.url.host == "down.test":
+            raise httpx.ConnectError("connection refused", request=request)
+        await asyncio.sleep(0.05)
+        body = gzip.compress(f'{{"n": {self.counter}}}'.encode())
+        return httpx.Response(200, headers={"content-encoding": "gzip"}, content=body)
+    
+    def record(self, urls):
+        """通过录制传输层依次请求，返回收到的响应体"""
+        writer = CassetteWriter(self.path)
+        transport = RecordingTransport(writer, httpx.MockTransport(self.upstream))
+        
+        async def run():
+            results = []
+            async with httpx.AsyncClient(transport=transport) as client:
+                for url in urls:
+                    try:
+                        results.append((await client.get(url)).json())
+                    except httpx.ConnectError:
+                        results.append("connect error")
+            return results
+        
+        try:
+            return asyncio.run(run())
+        finally:
+            writer.close()
+    
+    def replay(self, urls, timing=TIMING_FAST):
+        reader = CassetteReader(self.path)
+        transport = ReplayTransport(reader, timing)
+        
+        async def run():
+            results = []
+            async with httpx.AsyncClient(transport=transport) as client:
+                for url in urls:
+                    try:
+                        results.append((await client.get(url)).json())
+                    except httpx.ConnectError:
+                        results.append("connect error")
+            return results
+        
+        try:
+            return asyncio.run(run())
+        finally:
+            reader.close()
+    
+    def test_record_and_replay(self):
+        """回放返回录制的响应（含压缩响应体和传输层错误），重复请求按顺序循环"""
+        urls = ["https://a.test/x?b=2&a=1", "https://a.test/x?a=1&b=2", "https://down.test/"]
+        recorded = self.record(urls)
+        self.assertEqual(recorded, [{"n": 1}, {"n": 2}, "connect error"])
+        
+        self.counter = 0
+        replayed = self.replay(urls + ["https://a.test/x?a=1&b=2"])
+        self.assertEqual(replayed, recorded + [{"n": 1}])
+        self.assertEqual(self.counter, 0)
+    
+    def test_replay_miss(self):
+        """录像中没有的请求抛出 CassetteMiss"""
+        self.record(["https://a.test/x"])
+        with self.assertRaises(CassetteMiss):
+            self.replay(["https://a.test/other"])
+    
+    def test_index_rebuilt_and_secrets_not_stored(self):
+        """索引缺失时扫描重建；查询参数中的密钥不写入录像"""
+        self.record(["https://a.test/x?apiKey=secret-key", "https://a.test/y"])
+        with open(self.path, "rb") as f:
+            self.assertNotIn(b"secret-key", f.read())
+        os.remove(self.path + ".idx")
+        # 模拟录制中断：末尾残留不完整的记录
+        with open(self.path, "ab") as f:
+            f.write(b"\x00" * 10)
+        
+        reader = CassetteReader(self.path)
+        try:
+            self.assertEqual(len(reader), 2)
+            self.assertEqual([r.path for r in reader.records()], ["/x", "/y"])
+        finally:
+            reader.close()
+    
+    def test_original_timing(self):
+        """按原始耗时回放时保留上游延迟，快速回放不等待"""
+        self.record(["https://a.test/x"])
+        start = time.perf_counter()
+        self.replay(["https://a.test/x"], TIMING_ORIGINAL)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04)
+        start = time.perf_counter()
+        self.replay(["https://a.test/x"], TIMING_FAST)
+        self.assertLess(time.perf_counter() - start, 0.04)
+    
+    def test_http_manager_modes(self):
+        """HTTP客户端管理器切换录制、回放，停止后恢复原来的传输层"""
+        original = httpx.MockTransport(self.upstream)
+        http = HTTPClientManager(transport=original)
+        http.start_recording(self.path)
+        first = http.get("https://a.test/rates").json()
+        http.stop_cassette()
+        self.assertIs(http._transport, original)
+        
+        http.start_replay(self.path, TIMING_FAST)
+        self.assertEqual(http.get("https://a.test/rates").json(), first)
+        self.assertEqual(self.counter, 1)
+        http.stop_cassette()
+        self.assertIsNone(http.cassette)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
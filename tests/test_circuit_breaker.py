@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+熔断器单元测试
+"""
+import sys
+import os
+import asyncio
+import unittest
+import logging
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.circuit_breaker import CircuitBreaker, CircuitState
+from src.core.config import ServiceConfig
+from src.core.fallback_manager import FallbackManager
+from tests.conftest import FakeClock
+
+class TestCircuitBreaker(unittest.TestCase):
+    """熔断器测试类"""
+    
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+        self.breaker = CircuitBreaker(
+            failure_rate_threshold=0.5, min_requests=3, window_seconds=60,
+            cooldown_seconds=30, max_cooldown_seconds=120, clock=self.clock
+        )
+    
+    def trip(self):
+        for _ in range(3):
+            self.breaker.record_failure("boom")
+    
+    def test_opens_after_failure_rate(self):
+        """失败率达到阈值后熔断"""
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertIs(self.breaker.state, CircuitState.CLOSED)
+        self.breaker.record_failure()
+        self.assertIs(self.breaker.state, CircuitState.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+    
+    def test_old_results_leave_window(self):
+        """窗口外的旧结果不参与统计"""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 61
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertIs(self.breaker.state, CircuitState.CLOSED)
+    
+    def test_half_open_single_probe(self):
+        """冷却结束后只放行一个探测请求，探测成功后恢复"""
+        self.trip()
+        self.clock.now += 30
+        self.assertIs(self.breaker.state, CircuitState.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertIs(self.breaker.state, CircuitState.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+    
+    def test_half_open_before_cooldown(self):
+        """外部探测通过时提前进入半开状态，但不直接恢复"""
+        self.trip()
+        self.breaker.half_open()
+        self.assertIs(self.breaker.state, CircuitState.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertIs(self.breaker.state, CircuitState.OPEN)
+    
+    def test_failed_probe_extends_cooldown(self):
+        """探测失败后重新熔断并延长冷却时间"""
+        self.trip()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.clock.now += 30
+        self.assertFalse(self.breaker.allow_request())
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow_request())
+    
+    def test_released_probe(self):
+        """被取消的探测请求释放名额"""
+        self.trip()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow_request())
+
+class TestFallbackCircuit(unittest.TestCase):
+    """备用端点管理器熔断集成测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+        self.config = ServiceConfig(
+            name="mock",
+            primary_endpoint="https://primary.test/",
+            fallback_endpoints=["https://fallback.test/"]
+        )
+        self.calls = []
+    
+    async def make_request(self, endpoint: str) -> str:
+        self.calls.append(endpoint)
+        if "primary" in endpoint:
+            raise ValueError("主端点失败")
+        return "fallback"
+    
+    def test_open_endpoint_is_skipped(self):
+        """熔断后的端点不再被请求"""
+        async def run():
+            for _ in range(5):
+                await self.fallback.execute_with_fallback_async(self.config, self.make_request)
+        
+        asyncio.run(run())
+        self.assertEqual(self.calls.count("https://primary.test/"), 3)
+        self.assertIn("https://primary.test/", self.fallback.get_failed_endpoints())
+        self.assertEqual(self.fallback.get_circuit_states()["https://primary.test/"]["state"], "open")
+    
+    def test_failed_endpoints_compat(self):
+        """旧的failed_endpoints集合接口仍然可用"""
+        self.fallback.failed_endpoints.add("https://primary.test/")
+        result = asyncio.run(self.fallback.execute_with_fallback_async(self.config, self.make_request))
+        self.assertEqual(result, "fallback")
+        self.assertEqual(self.calls, ["https://fallback.test/"])
+        
+        self.fallback.reset_failed_endpoints()
+        self.assertEqual(self.fallback.get_failed_endpoints(), [])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
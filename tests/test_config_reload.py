@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+配置热加载单元测试
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import tempfile
+import unittest
+import logging
+from unittest import mock
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache
+from src.core.config import ConfigManager
+from src.core.http_client import HTTPClientManager
+
+class TestConfigReload(unittest.TestCase):
+    """配置热加载测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.write({"settings": {"default_timeout": 5}})
+        with mock.patch.dict(os.environ, {"ENABLE_LOGGING": "false"}):
+            self.manager = ConfigManager(config_file=self.path)
+        self.addCleanup(os.unlink, self.path)
+        self.addCleanup(self.manager.stop_watching)
+    
+    def write(self, document):
+        with open(self.path, "w") as f:
+            json.dump(document, f)
+    
+    def test_reload_swaps_settings_and_services(self):
+        """重新加载后整体替换配置，旧配置对象保持不变"""
+        old_quotes = self.manager.get_service_config("quotes")
+        self.write({
+            "settings": {"default_timeout": 9, "enable_cache": "false"},
+            "services": {"quotes": {"timeout": 2}}
+        })
+        self.assertTrue(self.manager.reload())
+        
+        self.assertEqual(self.manager.version, 2)
+        self.assertEqual(self.manager.get("default_timeout"), 9)
+        self.assertIs(self.manager.get("enable_cache"), False)
+        self.assertEqual(self.manager.get_service_config("quotes").timeout, 2)
+        self.assertEqual(old_quotes.timeout, 5)
+    
+    def test_invalid_file_keeps_config(self):
+        """配置文件有误时保留当前配置"""
+        self.write({"settings": {"no_such_setting": 1}})
+        self.assertFalse(self.manager.reload())
+        self.assertEqual(self.manager.version, 1)
+        self.assertEqual(self.manager.get("default_timeout"), 5)
+    
+    def test_listener(self):
+        """监听器收到新旧配置"""
+        calls = []
+        self.manager.add_reload_listener(lambda old, new: calls.append((old.version, new.version)))
+        self.manager.reload()
+        self.assertEqual(calls, [(1, 2)])
+    
+    def test_watch_file(self):
+        """配置文件修改后自动重新加载"""
+        self.assertTrue(self.manager.watch(interval=0.02))
+        time.sleep(0.05)
+        self.write({"settings": {"default_timeout": 7}})
+        os.utime(self.path, (time.time() + 5, time.time() + 5))
+        for _ in range(100):
+            if self.manager.get("default_timeout") == 7:
+                break
+            time.sleep(0.02)
+        self.assertEqual(self.manager.get("default_timeout"), 7)
+    
+    def test_http_manager_applies_config(self):
+        """HTTP层按新配置调整缓存容量和连接池"""
+        http = HTTPClientManager(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200)),
+            cache=LRUCache(max_entries=100)
+        )
+        
+        async def run():
+            first = http.async_client
+            old = self.manager.snapshot()
+            self.write({"settings": {"cache_max_entries": 3, "http_max_connections": 5}})
+            self.manager.reload()
+            http.apply_config(old, self.manager.snapshot())
+            second = http.async_client
+            return first, second
+        
+        first, second = asyncio.run(run())
+        self.assertIsNot(first, second)
+        self.assertEqual(http.cache.max_entries, 3)
+        self.assertEqual(http.limits.max_connections, 5)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+请求时间预算单元测试
+"""
+import sys
+import os
+import time
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import ServiceConfig
+from src.core.deadline import Deadline, current_deadline, deadline_scope, remaining_timeout, with_deadline
+from src.core.error_handler import DeadlineExceededError
+from src.core.http_client import HTTPClientManager
+from src.core.fallback_manager import FallbackManager
+
+class TestDeadline(unittest.TestCase):
+    """截止时间测试类"""
+    
+    def test_clamp(self):
+        """超时时间被限制在剩余预算内"""
+        now = [0.0]
+        deadline = Deadline(2.0, clock=lambda: now[0])
+        self.assertEqual(deadline.clamp(5.0), 2.0)
+        self.assertEqual(deadline.clamp(1.0), 1.0)
+        now[0] = 3.0
+        self.assertTrue(deadline.expired)
+        with self.assertRaises(DeadlineExceededError):
+            deadline.clamp(1.0)
+    
+    def test_nested_scope_does_not_extend(self):
+        """嵌套作用域沿用更早的外层截止时间"""
+        with deadline_scope(1.0) as outer:
+            with deadline_scope(10.0) as inner:
+                self.assertIs(inner, outer)
+                self.assertLessEqual(remaining_timeout(5.0), 1.0)
+            with deadline_scope(0.5) as tighter:
+                self.assertIsNot(tighter, outer)
+            self.assertIs(current_deadline.get(), outer)
+        self.assertIsNone(current_deadline.get())
+        self.assertEqual(remaining_timeout(5.0), 5.0)
+    
+    def test_decorator(self):
+        """装饰器为每次调用设置截止时间"""
+        @with_deadline(3.0)
+        async def tool() -> float:
+            return current_deadline.get().remaining()
+        
+        self.assertLessEqual(asyncio.run(tool()), 3.0)
+
+class TestFallbackDeadline(unittest.TestCase):
+    """备用端点链的时间预算测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.calls = []
+        
+        async def handler(request: httpx.Request) -> httpx.Response:
+            self.calls.append(request.url.host)
+            await asyncio.sleep(1.0)
+            return httpx.Response(200, json={"host": request.url.host})
+        
+        self.http = HTTPClientManager(transport=httpx.MockTransport(handler))
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+        self.config = ServiceConfig(
+            name="mock",
+            primary_endpoint="https://a.test/",
+            fallback_endpoints=["https://b.test/", "https://c.test/"]
+        )
+    
+    async def make_request(self, endpoint: str) -> str:
+        if endpoint.startswith("backup://"):
+            return "backup"
+        response = await self.http.get_async(endpoint, timeout=5.0)
+        return response.json()["host"]
+    
+    def test_bounded_by_deadline(self):
+        """整条备用链的耗时不超过时间预算"""
+        async def run():
+            with deadline_scope(0.3):
+                return await self.fallback.execute_with_fallback_async(self.config, self.make_request)
+        
+        start = time.perf_counter()
+        result = asyncio.run(run())
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertIn("超时", result)
+        self.assertIn("不可用", result)
+        self.assertEqual(self.calls, ["a.test"])
+    
+    def test_backup_after_deadline(self):
+        """时间预算用完后仍使用本地备用端点"""
+        config = ServiceConfig(
+            name="mock",
+            primary_endpoint="https://a.test/",
+            fallback_endpoints=["https://b.test/", "backup://local"]
+        )
+        
+        async def run():
+            with deadline_scope(0.3):
+                first = await self.fallback.execute_with_fallback_async(config, self.make_request)
+                # 预算已用完，直接使用本地备用端点
+                second = await self.fallback.execute_with_fallback_async(config, self.make_request)
+                return first, second
+        
+        self.assertEqual(asyncio.run(run()), ("backup", "backup"))
+        self.assertEqual(self.calls, ["a.test"])
+    
+    def test_chained_calls_share_budget(self):
+        """同一次工具调用中的多次服务调用共享预算"""
+        @with_deadline(0.5)
+        async def tool():
+            first = await self.fallback.execute_with_fallback_async(self.config, self.make_request)
+            second = await self.fallback.execute_with_fallback_async(self.config, self.make_request)
+            return first, second
+        
+        start = time.perf_counter()
+        first, second = asyncio.run(tool())
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn("超时", first)
+        self.assertIn("超时", second)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+磁盘缓存单元测试
+"""
+import sys
+import os
+import asyncio
+import gzip
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache, TieredCache
+from src.core.disk_cache import SQLiteCache
+from src.core.http_client import HTTPClientManager
+from tests.conftest import make_entry
+
+class TestSQLiteCache(unittest.TestCase):
+    """磁盘缓存测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.db")
+        self.caches = []
+    
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        self.tmpdir.cleanup()
+    
+    def open(self, **kwargs) -> SQLiteCache:
+        cache = SQLiteCache(self.path, **kwargs)
+        self.caches.append(cache)
+        return cache
+    
+    def test_survives_restart(self):
+        """关闭后重新打开仍可读取条目"""
+        cache = self.open()
+        entry = make_entry(b'{"rates": {"CNY": 7.2}}')
+        cache.set("rates", entry)
+        # -wal/-shm 文件同样保存完整的URL，与数据库文件权限一致
+        for suffix in ("-wal", "-shm"):
+            self.assertEqual(os.stat(self.path + suffix).st_mode & 0o777, 0o600)
+        cache.close()
+        self.assertEqual(self.open().get("rates"), entry)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+    
+    def test_ttl_and_stale_retention(self):
+        """过期条目视为未命中但可降级读取，超过保留期后在整理时删除"""
+        cache = self.open(max_stale=60)
+        cache.set("recent", make_entry(ttl=-1))
+        cache.set("old", make_entry(ttl=-120))
+        self.assertIsNone(cache.get("recent"))
+        self.assertIsNotNone(cache.get_stale("recent"))
+        self.assertEqual(cache.compact(), 1)
+        self.assertIsNone(cache.get_stale("old"))
+        self.assertEqual(cache.stats()["entries"], 1)
+    
+    def test_stats_tracked_incrementally(self):
+        """条目数和总字节数随写入和删除增量更新，读取统计信息不查询数据库"""
+        cache = self.open()
+        cache.set("a", make_entry(b"a" * 100))
+        cache.set("b", make_entry(b"b" * 100))
+        cache.set("a", make_entry(b"a" * 300))
+        cache.delete("b")
+        cache.delete("missing")
+        
+        def fail(*args):
+            raise AssertionError("stats() 不应查询数据库")
+        
+        total = cache.total_bytes()
+        cache._execute = fail
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["bytes"], total)
+    
+    def test_compaction_bounded_by_bytes(self):
+        """超过字节上限时淘汰最久未访问的条目"""
+        cache = self.open(max_bytes=10000, compact_every=5)
+        cache.set("keep", make_entry(b"k" * 1000))
+        for i in range(20):
+            cache.get("keep")
+            cache.set(str(i), make_entry(b"x" * 1000))
+        cache.compact()
+        self.assertLessEqual(cache.total_bytes(), 10000)
+        self.assertEqual(cache.stats()["bytes"], cache.total_bytes())
+        self.assertIsNotNone(cache.get("keep"))
+        self.assertIsNotNone(cache.get("19"))
+        self.assertIsNone(cache.get("0"))
+        self.assertGreater(cache.stats()["evictions"], 0)
+    
+    def test_warm_loads_hot_keys(self):
+        """启动时按读取次数把最常用的条目载入内存"""
+        disk = self.open()
+        for name, reads in (("rates", 5), ("history", 3), ("rare", 0)):
+            disk.set(name, make_entry(name.encode()))
+            for _ in range(reads):
+                disk.get(name)
+        
+        memory = TieredCache(disk, max_entries=8)
+        self.assertEqual(memory.warm(2), 2)
+        self.assertEqual(len(memory), 2)
+        hits = disk.hits
+        self.assertEqual(memory.get("rates").content, b"rates")
+        self.assertEqual(memory.get("history").content, b"history")
+        self.assertEqual(disk.hits, hits)
+        # 未预热的条目在内存未命中时从磁盘读取并回填
+        self.assertEqual(memory.get("rare").content, b"rare")
+        self.assertEqual(memory.backing_hits, 1)
+    
+    def test_hit_counts_batched(self):
+        """读取次数累计后按批写回，读取本身不写数据库"""
+        cache = self.open(flush_hits_every=3)
+        cache.set("rates", make_entry())
+        
+        def stored_hits() -> int:
+            with sqlite3.connect(self.path) as conn:
+                return conn.execute("SELECT hits FROM entries WHERE key = 'rates'").fetchone()[0]
+        
+        cache.get("rates")
+        cache.get_stale("rates")
+        self.assertEqual(stored_hits(), 0)
+        cache.get("rates")
+        self.assertEqual(stored_hits(), 3)
+        cache.get("rates")
+        cache.close()
+        self.assertEqual(stored_hits(), 4)
+    
+    def test_async_access_off_event_loop(self):
+        """事件循环中经多级缓存的异步接口在线程池中读写数据库"""
+        disk = self.open()
+        threads = []
+        
+        def record(method):
+            def wrapper(*args):
+                threads.append(threading.get_ident())
+                return method(*args)
+            return wrapper
+        
+        disk.get, disk.get_stale, disk.set = record(disk.get), record(disk.get_stale), record(disk.set)
+        
+        async def run():
+            await TieredCache(disk).set_async("rates", make_entry(b"1"))
+            self.assertIsNone(await TieredCache(disk).get_stale_async("missing"))
+            return await TieredCache(disk).get_async("rates")
+        
+        self.assertEqual(asyncio.run(run()).content, b"1")
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.get_ident(), threads)
+    
+    def test_http_manager_restart(self):
+        """重启后的HTTP客户端管理器直接返回磁盘中的响应（含 gzip 压缩的响应）"""
+        calls = []
+        body = json.dumps({"rates": {"CNY": 7.2}}).encode()
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(str(request.url))
+            return httpx.Response(200, content=gzip.compress(body),
+                                  headers={"content-encoding": "gzip", "content-type": "application/json"})
+        
+        settings = {
+            "disk_cache_file": self.path, "disk_cache_max_bytes": 1024 * 1024, "disk_cache_max_stale": 3600,
+            "disk_cache_warm_entries": 16, "cache_max_entries": 16, "cache_max_bytes": 1024 * 1024
+        }
+        url = "https://rates.test/latest/USD"
+        for _ in range(2):
+            http = HTTPClientManager(transport=httpx.MockTransport(handler), cache=LRUCache())
+            self.assertTrue(http.configure_disk_cache(settings))
+            self.caches.append(http.disk_cache)
+            self.assertEqual(http.get(url, cache_ttl=60).json(), {"rates": {"CNY": 7.2}})
+            http.disk_cache.close()
+        self.assertEqual(len(calls), 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
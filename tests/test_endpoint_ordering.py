@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+端点动态排序单元测试
+"""
+import sys
+import os
+import random
+import asyncio
+import dataclasses
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache
+from src.core.config import ServiceConfig
+from src.core.endpoint_stats import EndpointStats
+from src.core.fallback_manager import FallbackManager
+from src.core.http_client import HTTPClientManager
+
+PRIMARY = "https://primary.test/"
+FALLBACK = "https://fallback.test/"
+BACKUP = "backup://local"
+
+class TestEndpointStats(unittest.TestCase):
+    """端点统计测试类"""
+    
+    def test_ewma(self):
+        """EWMA向新样本靠拢"""
+        stats = EndpointStats(alpha=0.5)
+        stats.record_latency(1.0)
+        stats.record_latency(0.0)
+        self.assertAlmostEqual(stats.ewma_latency, 0.5)
+    
+    def test_score_penalizes_failures(self):
+        """失败会提高端点的期望代价"""
+        reliable, flaky = EndpointStats(), EndpointStats()
+        for st in (reliable, flaky):
+            st.record_latency(0.1)
+        reliable.record_result(True)
+        flaky.record_result(False)
+        self.assertLess(reliable.score(), flaky.score())
+
+class TestEndpointOrdering(unittest.TestCase):
+    """端点排序测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+        self.config = ServiceConfig(
+            name="mock",
+            primary_endpoint=PRIMARY,
+            fallback_endpoints=[FALLBACK, BACKUP]
+        )
+    
+    def observe(self, endpoint: str, latency: float, count: int = 5):
+        stats = self.fallback.endpoint_stats.get(endpoint)
+        for _ in range(count):
+            stats.record_latency(latency)
+            stats.record_result(True)
+    
+    def test_configured_order_without_samples(self):
+        """样本不足时保持配置顺序"""
+        self.assertEqual(self.fallback.order_endpoints(self.config), [PRIMARY, FALLBACK, BACKUP])
+        self.observe(FALLBACK, 0.01, count=self.fallback.min_order_samples - 1)
+        self.assertEqual(self.fallback.order_endpoints(self.config), [PRIMARY, FALLBACK, BACKUP])
+    
+    def test_cold_endpoint_after_scored(self):
+        """样本不足的端点不妨碍其他端点排序，按配置顺序排在有样本的端点之后"""
+        third = "https://third.test/"
+        config = dataclasses.replace(self.config, fallback_endpoints=(FALLBACK, third, BACKUP))
+        self.observe(PRIMARY, 0.5)
+        self.observe(third, 0.05)
+        self.assertEqual(self.fallback.order_endpoints(config), [third, PRIMARY, FALLBACK, BACKUP])
+    
+    def test_faster_fallback_promoted(self):
+        """更快的备用端点被提前，本地备用端点始终最后"""
+        self.observe(PRIMARY, 0.5)
+        self.observe(FALLBACK, 0.05)
+        self.observe(BACKUP, 0.0)
+        self.assertEqual(self.fallback.order_endpoints(self.config), [FALLBACK, PRIMARY, BACKUP])
+    
+    def test_adaptive_order_disabled(self):
+        """关闭动态排序时使用配置顺序"""
+        self.observe(PRIMARY, 0.5)
+        self.observe(FALLBACK, 0.05)
+        self.config = dataclasses.replace(self.config, adaptive_order=False)
+        self.assertEqual(self.fallback.order_endpoints(self.config), [PRIMARY, FALLBACK, BACKUP])
+    
+    def test_exploration(self):
+        """探索时把其他端点提到最前"""
+        self.fallback.exploration_rate = 1.0
+        self.fallback._random = random.Random(0)
+        self.assertEqual(self.fallback.order_endpoints(self.config)[0], FALLBACK)
+    
+    def test_requests_feed_stats(self):
+        """请求结果写入端点统计"""
+        async def make_request(endpoint: str) -> str:
+            if endpoint == PRIMARY:
+                raise ValueError("主端点失败")
+            return endpoint
+        
+        asyncio.run(self.fallback.execute_with_fallback_async(self.config, make_request))
+        self.assertEqual(self.fallback.endpoint_stats.get(PRIMARY).ewma_success, 0.0)
+        self.assertEqual(self.fallback.endpoint_stats.get(FALLBACK).ewma_success, 1.0)
+    
+    def test_cache_hits_not_in_ewma(self):
+        """缓存命中的耗时不计入 EWMA 耗时"""
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={})
+        
+        http = HTTPClientManager(transport=httpx.MockTransport(handler), cache=LRUCache())
+        config = dataclasses.replace(self.config, fallback_endpoints=[], cache_ttl=60)
+        
+        async def make_request(endpoint: str) -> str:
+            await http.get_async(endpoint)
+            return "ok"
+        
+        async def run():
+            for _ in range(30):
+                await self.fallback.execute_with_fallback_async(config, make_request)
+        
+        asyncio.run(run())
+        self.assertGreaterEqual(self.fallback.endpoint_stats.get(PRIMARY).ewma_latency, 0.05)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
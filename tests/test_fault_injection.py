@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+故障注入单元测试
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import ServiceConfig
+from src.core.fallback_manager import FallbackManager
+from src.core.http_client import (
+    FAULT_INJECTIONS, FaultInjectionTransport, FaultRule, HTTPClientManager, load_fault_rules
+)
+
+async def upstream(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"host": request.url.host, "items": list(range(20))})
+
+class TestFaultInjection(unittest.TestCase):
+    """故障注入测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def get(self, rules, url="https://primary.test/data", timeout=5.0):
+        transport = FaultInjectionTransport(rules, httpx.MockTransport(upstream), seed=1)
+        
+        async def run():
+            async with httpx.AsyncClient(transport=transport) as client:
+                return await client.get(url, timeout=timeout)
+        
+        return asyncio.run(run())
+    
+    def test_load_rules(self):
+        """解析 JSON 规则并校验参数"""
+        rules = load_fault_rules('{"primary.test": {"error_rate": 0.5, "error_status": 429}, "*.test": {"latency": 0.1}}')
+        self.assertEqual(rules["primary.test"].error_status, 429)
+        transport = FaultInjectionTransport(rules, httpx.MockTransport(upstream))
+        self.assertIs(transport.rule_for("primary.test"), rules["primary.test"])
+        self.assertIs(transport.rule_for("other.test"), rules["*.test"])
+        self.assertIsNone(transport.rule_for("example.com"))
+        
+        self.assertEqual(load_fault_rules(""), {})
+        with self.assertRaises(ValueError):
+            load_fault_rules({"a": {"error_rate": 0.8, "reset_rate": 0.5}})
+        with self.assertRaises(ValueError):
+            load_fault_rules({"a": {"unknown": 1}})
+    
+    def test_http_error_and_reset(self):
+        """按规则返回HTTP错误（带 Retry-After）或重置连接"""
+        response = self.get({"primary.test": FaultRule(error_rate=1.0, error_status=429, retry_after=2)})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "2")
+        with self.assertRaises(httpx.ReadError):
+            self.get({"primary.test": FaultRule(reset_rate=1.0)})
+        # 未匹配的主机正常转发
+        self.assertEqual(self.get({"other.test": FaultRule(reset_rate=1.0)}).status_code, 200)
+    
+    def test_malformed_body(self):
+        """损坏的响应体无法解析为 JSON"""
+        response = self.get({"primary.test": FaultRule(malformed_rate=1.0)})
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(json.JSONDecodeError):
+            response.json()
+    
+    def test_timeout_and_latency(self):
+        """挂起直到读超时；超过读超时的延迟同样超时"""
+        start = time.perf_counter()
+        with self.assertRaises(httpx.ReadTimeout):
+            self.get({"primary.test": FaultRule(timeout_rate=1.0)}, timeout=0.1)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        with self.assertRaises(httpx.ReadTimeout):
+            self.get({"primary.test": FaultRule(latency=1.0, latency_distribution="exponential")}, timeout=0.05)
+        
+        start = time.perf_counter()
+        self.get({"primary.test": FaultRule(latency=0.05, jitter=0.01)})
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+    
+    def test_fallback_under_faults(self):
+        """主端点连接被重置时切换到备用端点"""
+        http = HTTPClientManager(transport=httpx.MockTransport(upstream))
+        http.enable_fault_injection({"primary.test": FaultRule(reset_rate=1.0)}, seed=1)
+        fallback = FallbackManager()
+        fallback.exploration_rate = 0
+        config = ServiceConfig(name="mock", primary_endpoint="https://primary.test/",
+                               fallback_endpoints=["https://fallback.test/"], timeout=2)
+        
+        async def make_request(endpoint: str) -> str:
+            response = await http.get_async(endpoint)
+            return response.json()["host"]
+        
+        resets = FAULT_INJECTIONS.labels("primary.test", "reset")
+        before = resets.value
+        result = asyncio.run(fallback.execute_with_fallback_async(config, make_request))
+        self.assertEqual(result, "fallback.test")
+        # 连接重置可重试，主端点重试后才切换
+        self.assertGreaterEqual(resets.value - before, 2)
+    
+    def test_configure_from_settings(self):
+        """按配置启用和关闭故障注入，关闭后恢复原来的传输层"""
+        original = httpx.MockTransport(upstream)
+        http = HTTPClientManager(transport=original)
+        settings = {"enable_fault_injection": True, "fault_rules": '{"*": {"error_rate": 1.0}}'}
+        self.assertTrue(http.configure_faults(settings))
+        with self.assertRaises(httpx.HTTPStatusError):
+            http.get("https://primary.test/")
+        self.assertFalse(http.configure_faults(dict(settings, enable_fault_injection=False)))
+        self.assertIs(http._transport, original)
+        self.assertEqual(http.get("https://primary.test/").status_code, 200)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+健康检查单元测试
+"""
+import sys
+import os
+import time
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.circuit_breaker import CircuitState
+from src.core.config import RateLimit, ServiceConfig
+from src.core.deadline import deadline_scope
+from src.core.http_client import HTTPClientManager
+from src.core.fallback_manager import FallbackManager
+from src.core.health_check import HealthChecker, format_report, probe_url
+from src.core.rate_limiter import RateLimiter
+
+class FakeConfig:
+    """只提供 get_service_config 的测试配置"""
+    
+    def __init__(self, configs):
+        self.configs = {config.name: config for config in configs}
+    
+    def get_service_config(self, service_name: str) -> ServiceConfig:
+        return self.configs[service_name]
+
+class TestHealthCheck(unittest.TestCase):
+    """健康检查测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.2)
+            if request.url.host == "down.test":
+                return httpx.Response(503)
+            if request.url.host == "auth.test":
+                return httpx.Response(401)
+            return httpx.Response(200, json={})
+        
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+        self.config = FakeConfig([
+            ServiceConfig(name="alpha", primary_endpoint="https://a.test/{}",
+                          fallback_endpoints=["https://down.test/", "backup://local"]),
+            ServiceConfig(name="beta", primary_endpoint="https://b.test/",
+                          fallback_endpoints=["https://c.test/"])
+        ])
+        self.checker = HealthChecker(
+            http=HTTPClientManager(transport=httpx.MockTransport(handler)),
+            fallback=self.fallback,
+            config=self.config
+        )
+    
+    def test_probe_url(self):
+        """探测URL替换模板参数，本地备用端点跳过"""
+        self.assertEqual(probe_url("ip_location", "http://ip-api.com/json/{}?fields=country"),
+                         "http://ip-api.com/json/8.8.8.8")
+        self.assertIsNone(probe_url("exchange_rate", "backup://local-rates"))
+    
+    def test_concurrent_with_latency(self):
+        """所有端点并发探测并报告耗时"""
+        start = time.perf_counter()
+        results = asyncio.run(self.checker.check_all(["alpha", "beta"]))
+        self.assertLess(time.perf_counter() - start, 0.6)
+        
+        self.assertEqual([r.endpoint for r in results], [
+            "https://a.test/{}", "https://down.test/", "backup://local", "https://b.test/", "https://c.test/"
+        ])
+        self.assertTrue(results[0].reachable)
+        self.assertGreaterEqual(results[0].latency, 0.2)
+        self.assertFalse(results[1].reachable)
+        self.assertTrue(results[2].skipped)
+        
+        report = format_report(results)
+        self.assertIn("alpha: ✅ 正常", report)
+        self.assertIn("↳ 备用 https://down.test/: ⚠️ HTTP 503", report)
+        self.assertIn("共检查 4 个端点，可达 3 个", report)
+    
+    def test_feeds_fallback_state(self):
+        """探测失败计入熔断器；探测通过只让熔断中的端点进入半开状态，不计入端点统计"""
+        self.fallback.failed_endpoints.add("https://b.test/")
+        asyncio.run(self.checker.check_all(["alpha", "beta"]))
+        
+        self.assertIs(self.fallback.breakers.get("https://b.test/").state, CircuitState.HALF_OPEN)
+        self.assertEqual(self.fallback.endpoint_stats.get("https://c.test/").sample_count, 0)
+        self.assertEqual(self.fallback.endpoint_stats.get("https://c.test/").requests, 0)
+        self.assertEqual(self.fallback.get_circuit_states()["https://down.test/"]["failure_rate"], 1.0)
+    
+    def test_client_errors_unknown(self):
+        """不带密钥的探测返回 401 等 4xx 时无法判断端点状态，不影响熔断器"""
+        config = ServiceConfig(name="gamma", primary_endpoint="https://auth.test/")
+        self.config.configs["gamma"] = config
+        self.fallback.failed_endpoints.add("https://auth.test/")
+        results = asyncio.run(self.checker.check_all(["gamma"]))
+        
+        self.assertIsNone(results[0].healthy)
+        self.assertIs(self.fallback.breakers.get("https://auth.test/").state, CircuitState.OPEN)
+    
+    def test_local_rejection_unknown(self):
+        """本地限流或时间预算用完时请求没有发出，结果未知，不计入熔断器"""
+        limiter = RateLimiter(max_wait=0)
+        limiter.configure("b.test", RateLimit(1, 60)).drain()
+        self.checker.http.rate_limiter = limiter
+        
+        async def run():
+            limited = await self.checker.check_endpoint("beta", "https://b.test/", True)
+            with deadline_scope(0):
+                expired = await self.checker.check_endpoint("beta", "https://c.test/", False)
+            return limited, expired
+        
+        for result in asyncio.run(run()):
+            self.assertTrue(result.skipped)
+            self.assertIsNone(result.healthy)
+            self.assertIn("跳过检查", result.status)
+            self.assertEqual(self.fallback.breakers.get(result.endpoint).snapshot()["failure_rate"], 0.0)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
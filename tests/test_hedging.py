@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+对冲请求单元测试
+"""
+import sys
+import os
+import time
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache
+from src.core.config import ServiceConfig
+from src.core.fallback_manager import FallbackManager
+from src.core.http_client import HTTPClientManager
+
+class TestHedgedRequests(unittest.TestCase):
+    """对冲请求测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+        self.config = ServiceConfig(
+            name="mock",
+            primary_endpoint="https://primary.test/",
+            fallback_endpoints=["https://fallback.test/"],
+            timeout=2,
+            hedge=True
+        )
+        # 主端点历史耗时约50ms
+        for _ in range(10):
+            self.fallback.endpoint_stats.get("https://primary.test/").record_latency(0.05)
+    
+    def test_hedge_delay_uses_percentile(self):
+        """对冲延迟取观测耗时的分位数"""
+        self.assertAlmostEqual(self.fallback.hedge_delay(self.config, "https://primary.test/"), 0.05)
+        # 没有样本时取超时时间的一半
+        self.assertEqual(self.fallback.hedge_delay(self.config, "https://fallback.test/"), 1.0)
+    
+    def test_slow_primary_is_hedged(self):
+        """主端点缓慢时备用端点胜出，主端点请求被取消"""
+        cancelled = []
+        
+        async def make_request(endpoint: str) -> str:
+            if "primary" in endpoint:
+                try:
+                    await asyncio.sleep(1.5)
+                except asyncio.CancelledError:
+                    cancelled.append(endpoint)
+                    raise
+                return "primary"
+            await asyncio.sleep(0.02)
+            return "fallback"
+        
+        async def run():
+            start = time.perf_counter()
+            result = await self.fallback.execute_with_fallback_async(self.config, make_request)
+            await asyncio.sleep(0)
+            return result, time.perf_counter() - start
+        
+        result, elapsed = asyncio.run(run())
+        self.assertEqual(result, "fallback")
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(cancelled, ["https://primary.test/"])
+        # 被取消的端点不计为失败
+        self.assertEqual(self.fallback.get_failed_endpoints(), [])
+    
+    def test_fast_primary_not_hedged(self):
+        """主端点及时响应时不启动对冲请求"""
+        calls = []
+        
+        async def make_request(endpoint: str) -> str:
+            calls.append(endpoint)
+            await asyncio.sleep(0.01)
+            return endpoint
+        
+        result = asyncio.run(self.fallback.execute_with_fallback_async(self.config, make_request))
+        self.assertEqual(result, "https://primary.test/")
+        self.assertEqual(calls, ["https://primary.test/"])
+    
+    def test_cache_hits_not_in_hedge_window(self):
+        """缓存命中的耗时不计入对冲延迟的分位数窗口"""
+        http = HTTPClientManager(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})),
+                                 cache=LRUCache())
+        config = ServiceConfig(name="mock", primary_endpoint="https://cached.test/", cache_ttl=60, hedge=True)
+        
+        async def make_request(endpoint: str) -> str:
+            await http.get_async(endpoint)
+            return "ok"
+        
+        async def run():
+            for _ in range(30):
+                await self.fallback.execute_with_fallback_async(config, make_request)
+        
+        asyncio.run(run())
+        self.assertEqual(self.fallback.endpoint_stats.get("https://cached.test/").sample_count, 1)
+    
+    def test_failed_primary_moves_on(self):
+        """主端点失败时立即尝试下一个端点"""
+        async def make_request(endpoint: str) -> str:
+            if "primary" in endpoint:
+                raise ValueError("主端点失败")
+            return "fallback"
+        
+        result = asyncio.run(self.fallback.execute_with_fallback_async(self.config, make_request))
+        self.assertEqual(result, "fallback")
+        self.assertEqual(self.fallback.get_circuit_states()["https://primary.test/"]["failure_rate"], 1.0)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+日志配置单元测试
+"""
+import sys
+import os
+import glob
+import tempfile
+import unittest
+import logging
+from logging.handlers import QueueHandler
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.log_config import RepeatFilter, setup_logging, shutdown_logging
+
+def make_record(msg: str, *args, level: int = logging.ERROR) -> logging.LogRecord:
+    """创建固定位置的日志记录"""
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+class TestRepeatFilter(unittest.TestCase):
+    """重复日志限流测试类"""
+    
+    def setUp(self):
+        self.now = 0.0
+        self.filter = RepeatFilter(interval=10, burst=2, clock=lambda: self.now)
+    
+    def test_suppresses_repeats_within_window(self):
+        """同一模板在窗口内超过上限的日志被抑制，参数不同也算重复"""
+        results = [self.filter.filter(make_record("端点失败: %s", f"ep{i}")) for i in range(5)]
+        self.assertEqual(results, [True, True, False, False, False])
+    
+    def test_reports_suppressed_count(self):
+        """下一个窗口的第一条日志附带被抑制的条数"""
+        for _ in range(5):
+            self.filter.filter(make_record("端点失败: %s", "ep"))
+        self.now = 11
+        record = make_record("端点失败: %s", "ep")
+        self.assertTrue(self.filter.filter(record))
+        self.assertIn("另有 3 条相同日志被抑制", record.getMessage())
+        self.assertTrue(record.getMessage().startswith("端点失败: ep"))
+    
+    def test_info_not_limited(self):
+        """低于警告级别的日志不受限制"""
+        results = [self.filter.filter(make_record("尝试端点", level=logging.INFO)) for _ in range(5)]
+        self.assertTrue(all(results))
+
+class TestSetupLogging(unittest.TestCase):
+    """日志管道测试类"""
+    
+    def setUp(self):
+        root = logging.getLogger()
+        self.saved = (root.level, root.handlers[:])
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmpdir.name, "test.log")
+    
+    def tearDown(self):
+        shutdown_logging()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        level, handlers = self.saved
+        root.setLevel(level)
+        for handler in handlers:
+            root.addHandler(handler)
+        self.tmpdir.cleanup()
+    
+    def test_queue_handler_and_rotation(self):
+        """根日志记录器只挂载队列处理器，文件按大小轮转"""
+        setup_logging(level=logging.INFO, log_file=self.log_file, max_bytes=500,
+                      backup_count=2, repeat_interval=0, console=False)
+        root = logging.getLogger()
+        self.assertEqual(len(root.handlers), 1)
+        self.assertIsInstance(root.handlers[0], QueueHandler)
+        
+        log = logging.getLogger("test.rotation")
+        for i in range(50):
+            log.info("message %d %s", i, "x" * 20)
+        shutdown_logging()
+        
+        files = glob.glob(self.log_file + "*")
+        self.assertGreater(len(files), 1)
+        self.assertLessEqual(len(files), 3)
+        for path in files:
+            self.assertLessEqual(os.path.getsize(path), 600)
+        with open(self.log_file, encoding="utf-8") as f:
+            self.assertIn("message 49", f.read())
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+运行指标单元测试
+"""
+import sys
+import os
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache
+from src.core.http_client import HTTP_REQUESTS, CACHE_LOOKUPS, HTTPClientManager
+from src.core.metrics import TOOL_CALLS, TOOL_LATENCY, MetricsRegistry, instrument_tool
+
+class TestMetricsRegistry(unittest.TestCase):
+    """指标注册表测试"""
+    
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_counter_labels(self):
+        """计数器按标签分别累加"""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "请求数", ("status",))
+        counter.labels("200").inc()
+        counter.labels("200").inc(2)
+        counter.labels("500").inc()
+        self.assertEqual(counter.labels("200").value, 3)
+        self.assertEqual(counter.labels("500").value, 1)
+        with self.assertRaises(ValueError):
+            counter.labels("200", "extra")
+    
+    def test_get_or_create(self):
+        """同名指标重复注册返回同一对象，类型不同时报错"""
+        registry = MetricsRegistry()
+        first = registry.counter("calls_total", "调用数")
+        self.assertIs(registry.counter("calls_total", "调用数"), first)
+        with self.assertRaises(ValueError):
+            registry.gauge("calls_total", "调用数")
+    
+    def test_histogram_quantile(self):
+        """直方图按桶插值估算分位数"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "耗时", buckets=(0.1, 0.2, 0.4))
+        for _ in range(90):
+            histogram.observe(0.05)
+        for _ in range(10):
+            histogram.observe(0.3)
+        child = histogram.labels()
+        self.assertEqual(child.count, 100)
+        self.assertLessEqual(child.quantile(0.5), 0.1)
+        self.assertGreater(child.quantile(0.95), 0.2)
+        self.assertLessEqual(child.quantile(0.95), 0.4)
+    
+    def test_gauge_callback(self):
+        """回调型仪表在采集时读取当前值"""
+        registry = MetricsRegistry()
+        value = [3]
+        registry.gauge("queue_size", "队列长度", function=lambda: value[0])
+        value[0] = 7
+        self.assertIn("queue_size 7", registry.render_prometheus())
+    
+    def test_render_prometheus(self):
+        """导出 Prometheus 文本格式"""
+        registry = MetricsRegistry()
+        registry.counter("hits_total", "命中数", ("path",)).labels('a"b').inc()
+        registry.histogram("duration_seconds", "耗时", buckets=(1.0,)).observe(0.5)
+        text = registry.render_prometheus()
+        self.assertIn("# TYPE hits_total counter", text)
+        self.assertIn('hits_total{path="a\\"b"} 1', text)
+        self.assertIn('duration_seconds_bucket{le="1"} 1', text)
+        self.assertIn('duration_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("duration_seconds_count 1", text)
+
+class TestInstrumentation(unittest.TestCase):
+    """各层指标采集测试"""
+    
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_http_layer(self):
+        """HTTP层记录请求状态和缓存命中"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"ok": True})
+        
+        manager = HTTPClientManager(transport=httpx.MockTransport(handler), cache=LRUCache())
+        requests = HTTP_REQUESTS.labels("metrics.test", "200")
+        hits = CACHE_LOOKUPS.labels("hit")
+        before_requests, before_hits = requests.value, hits.value
+        
+        async def run():
+            try:
+                await manager.get_async("https://metrics.test/a", cache_ttl=60)
+                await manager.get_async("https://metrics.test/a", cache_ttl=60)
+            finally:
+                await manager.aclose()
+        
+        asyncio.run(run())
+        self.assertEqual(requests.value - before_requests, 1)
+        self.assertEqual(hits.value - before_hits, 1)
+    
+    def test_instrument_tool(self):
+        """工具装饰器记录调用结果和耗时，并保留函数签名"""
+        @instrument_tool
+        def metrics_sync_tool(value: int) -> int:
+            """同步工具"""
+            if value < 0:
+                raise ValueError("negative")
+            return value
+        
+        @instrument_tool
+        async def metrics_async_tool(value: int) -> int:
+            """异步工具"""
+            return value
+        
+        self.assertEqual(metrics_sync_tool.__name__, "metrics_sync_tool")
+        self.assertEqual(metrics_sync_tool.__doc__, "同步工具")
+        self.assertEqual(metrics_sync_tool(1), 1)
+        with self.assertRaises(ValueError):
+            metrics_sync_tool(-1)
+        self.assertEqual(asyncio.run(metrics_async_tool(2)), 2)
+        
+        self.assertEqual(TOOL_CALLS.labels("metrics_sync_tool", "ok").value, 1)
+        self.assertEqual(TOOL_CALLS.labels("metrics_sync_tool", "exception").value, 1)
+        self.assertEqual(TOOL_LATENCY.labels("metrics_sync_tool").count, 2)
+        self.assertEqual(TOOL_CALLS.labels("metrics_async_tool", "ok").value, 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+负缓存单元测试
+"""
+import sys
+import os
+import socket
+import unittest
+import logging
+from unittest import mock
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache, NegativeCache
+from src.core.circuit_breaker import CircuitState
+from src.core.config import ServiceConfig
+from src.core.error_handler import NotFoundError, handle_api_error
+from src.core.fallback_manager import FallbackManager, fallback_manager
+from src.core.http_client import HTTPClientManager
+from src.services.ip_service import resolve
+from tests.conftest import FakeClock
+
+ENDPOINTS = ("https://coins-a.test/price", "https://coins-b.test/price", "https://coins-c.test/price")
+
+class TestNegativeCache(unittest.TestCase):
+    """负缓存测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.calls = []
+        self.down = set()
+        self.http = HTTPClientManager(transport=httpx.MockTransport(self.handler), cache=LRUCache())
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+        self.config = ServiceConfig(name="coins", primary_endpoint=ENDPOINTS[0], fallback_endpoints=ENDPOINTS[1:],
+                                    negative_cache_ttl=60, retry_count=0)
+    
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.url.host)
+        if request.url.host in self.down:
+            return httpx.Response(503)
+        symbol = request.url.params["symbol"]
+        return httpx.Response(200, json={"bitcoin": 65000.0} if symbol == "bitcoin" else {})
+    
+    def query(self, symbol: str, config: ServiceConfig = None) -> str:
+        def make_request(endpoint: str) -> str:
+            try:
+                data = self.http.get(endpoint, params={"symbol": symbol}).json()
+                if symbol not in data:
+                    raise NotFoundError(f"未找到加密货币: {symbol}")
+                return f"{symbol}: {data[symbol]}"
+            except Exception as e:
+                raise Exception(handle_api_error(e, "加密货币价格查询", endpoint))
+        
+        return self.fallback.execute_with_fallback(config or self.config, make_request, coalesce_key=symbol)
+    
+    def test_not_found_remembered(self):
+        """所有端点都返回不存在时记住结果，有效期内不再访问上游"""
+        self.assertEqual(self.query("notacoin"), "❌ 未找到加密货币: notacoin")
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self.query("notacoin"), "❌ 未找到加密货币: notacoin")
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self.fallback.negative_cache.hits, 1)
+        # 其他查询不受影响
+        self.assertEqual(self.query("bitcoin"), "bitcoin: 65000.0")
+    
+    def test_not_found_does_not_poison_endpoints(self):
+        """返回不存在的端点不计入失败统计，真正故障的端点照常计入"""
+        self.down.add("coins-b.test")
+        for i in range(5):
+            self.fallback.negative_cache.clear()
+            self.assertIn("未找到加密货币", self.query(f"garbage{i}"))
+        self.assertEqual(self.fallback.get_failed_endpoints(), ["https://coins-b.test/price"])
+        for endpoint in (ENDPOINTS[0], ENDPOINTS[2]):
+            self.assertIs(self.fallback.breakers.get(endpoint).state, CircuitState.CLOSED)
+            self.assertEqual(self.fallback.endpoint_stats.get(endpoint).ewma_success, 1.0)
+    
+    def test_not_found_requires_agreement(self):
+        """主端点故障、只有备用端点回答不存在时不下结论，也不记住结果"""
+        self.down.add("coins-a.test")
+        self.assertIn("所有端点都不可用", self.query("newcoin"))
+        self.assertEqual(len(self.fallback.negative_cache), 0)
+        self.down.clear()
+        self.assertEqual(self.query("newcoin"), "❌ 未找到加密货币: newcoin")
+        self.assertEqual(len(self.fallback.negative_cache), 1)
+    
+    def test_not_found_skips_backup_data(self):
+        """查询对象不存在时不使用本地备用数据；未配置负缓存时每次都访问上游"""
+        config = ServiceConfig(name="coins", primary_endpoint=ENDPOINTS[0], fallback_endpoints=("backup://coins",),
+                               retry_count=0)
+        for _ in range(2):
+            self.assertEqual(self.query("notacoin", config), "❌ 未找到加密货币: notacoin")
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(len(self.fallback.negative_cache), 0)
+    
+    def test_expiry_and_capacity(self):
+        """条目按有效期过期，超过上限时淘汰最久未使用的条目"""
+        clock = FakeClock()
+        cache = NegativeCache(max_entries=2, clock=clock)
+        cache.set("a", "A", 10)
+        cache.set("b", "B", 10)
+        self.assertEqual(cache.get("a"), "A")
+        cache.set("c", "C", 10)
+        self.assertIsNone(cache.get("b"))
+        clock.now = 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 1)
+        cache.set("d", "D", 0)
+        self.assertIsNone(cache.get("d"))
+    
+    def test_unresolvable_domain_remembered(self):
+        """无法解析的域名在有效期内不再查询DNS"""
+        fallback_manager.negative_cache.clear()
+        error = socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        with mock.patch("socket.gethostbyname", side_effect=error) as lookup:
+            for _ in range(3):
+                with self.assertRaises(socket.gaierror):
+                    resolve("no-such-host.invalid")
+        self.assertEqual(lookup.call_count, 1)
+        
+        # 暂时性的解析失败不记住
+        error = socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        with mock.patch("socket.gethostbyname", side_effect=error) as lookup:
+            for _ in range(2):
+                with self.assertRaises(socket.gaierror):
+                    resolve("flaky-host.invalid")
+        self.assertEqual(lookup.call_count, 2)
+        fallback_manager.negative_cache.clear()
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
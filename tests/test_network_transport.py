@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+网络传输（SSE / Streamable HTTP）单元测试
+"""
+import sys
+import os
+import socket
+import asyncio
+import subprocess
+import time
+import unittest
+import logging
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from src.main import configure_network, main, mcp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port: int, timeout: float = 20.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+class TestNetworkTransport(unittest.TestCase):
+    """网络传输测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def tearDown(self):
+        configure_network("127.0.0.1", 8000)
+        mcp.settings.stateless_http = False
+    
+    def test_configure_network(self):
+        """只监听本机时开启 DNS 重绑定防护，对外监听时按允许的主机检查"""
+        configure_network("127.0.0.1", 9000, stateless=True)
+        self.assertEqual(mcp.settings.port, 9000)
+        self.assertTrue(mcp.settings.stateless_http)
+        self.assertTrue(mcp.settings.transport_security.enable_dns_rebinding_protection)
+        
+        configure_network("0.0.0.0", 9000)
+        self.assertIsNone(mcp.settings.transport_security)
+        
+        configure_network("0.0.0.0", 9000, allowed_hosts=["mcp.example.com:*"])
+        self.assertEqual(mcp.settings.transport_security.allowed_hosts, ["mcp.example.com:*"])
+    
+    def test_workers_require_streamable_http(self):
+        """SSE 会话绑定在单个进程内，不能多进程运行"""
+        with self.assertRaises(SystemExit):
+            main(["--transport", "sse", "--workers", "2"])
+    
+    def test_streamable_http_workers(self):
+        """多个工作进程共同服务多个客户端会话"""
+        port = free_port()
+        env = dict(os.environ, ENABLE_LOGGING="false", ENABLE_HEALTH_CHECK="false", LOG_LEVEL="WARNING")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "src.main", "--transport", "streamable-http",
+             "--port", str(port), "--workers", "2"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            self.assertTrue(wait_for_port(port), "服务器未能启动")
+            
+            async def client():
+                async with streamablehttp_client(f"http://127.0.0.1:{port}/mcp") as (read, write, _):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        tools = (await session.list_tools()).tools
+                        results = await asyncio.gather(*[
+                            session.call_tool("create_uuid", {}) for _ in range(5)
+                        ])
+                        return len(tools), [r.isError for r in results]
+            
+            async def run():
+                return await asyncio.gather(*[client() for _ in range(3)])
+            
+            for tool_count, errors in asyncio.run(run()):
+                self.assertGreater(tool_count, 20)
+                self.assertEqual(errors, [False] * 5)
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
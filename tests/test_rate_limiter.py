@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+上游限流单元测试
+"""
+import sys
+import os
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache
+from src.core.config import RateLimit, ServiceConfig
+from src.core.error_handler import RateLimitedError
+from src.core.http_client import HTTPClientManager
+from src.core.fallback_manager import FallbackManager
+from src.core.rate_limiter import RateLimiter, TokenBucket
+from tests.conftest import FakeClock
+
+class TestTokenBucket(unittest.TestCase):
+    """令牌桶测试类"""
+    
+    def test_burst_then_refill(self):
+        """突发容量用完后按速率补充"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertAlmostEqual(bucket.try_acquire(), 1.0)
+        clock.now += 1.0
+        self.assertEqual(bucket.try_acquire(), 0)
+    
+    def test_from_limit_never_exceeds_quota(self):
+        """任意一个周期内放行的请求数不超过额度"""
+        clock = FakeClock()
+        bucket = TokenBucket.from_limit(RateLimit(45, 60), clock)
+        granted = 0
+        while clock.now < 60:
+            if bucket.try_acquire() == 0:
+                granted += 1
+            clock.now += 0.1
+        self.assertLessEqual(granted, 45)
+        self.assertGreaterEqual(granted, 40)
+    
+    def test_drain(self):
+        """收到429后清空令牌"""
+        bucket = TokenBucket(rate=1.0, capacity=5, clock=FakeClock())
+        bucket.drain()
+        self.assertGreater(bucket.try_acquire(), 0)
+
+class TestRateLimiter(unittest.TestCase):
+    """限流器测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_unconfigured_host_not_limited(self):
+        """未配置额度的主机不限流"""
+        limiter = RateLimiter(max_wait=0)
+        for _ in range(100):
+            asyncio.run(limiter.acquire("free.test"))
+    
+    def test_rejects_when_wait_exceeds_max(self):
+        """等待时间超过上限时拒绝"""
+        limiter = RateLimiter(max_wait=0.5)
+        limiter.configure("api.test", RateLimit(1, 60, burst=1))
+        asyncio.run(limiter.acquire("api.test"))
+        with self.assertRaises(RateLimitedError):
+            asyncio.run(limiter.acquire("api.test"))
+        self.assertEqual(limiter.stats()["rejected"], 1)
+    
+    def test_queues_within_max_wait(self):
+        """等待时间在上限内时排队"""
+        limiter = RateLimiter(max_wait=1.0)
+        limiter.configure("api.test", RateLimit(20, 1, burst=1))
+        
+        async def run():
+            for _ in range(3):
+                await limiter.acquire("api.test")
+        
+        asyncio.run(run())
+
+class TestHTTPRateLimit(unittest.TestCase):
+    """HTTP层限流测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.calls = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.calls.append(request.url.host)
+            return httpx.Response(200, json={"host": request.url.host})
+        
+        self.http = HTTPClientManager(
+            transport=httpx.MockTransport(handler),
+            cache=LRUCache(),
+            rate_limiter=RateLimiter(max_wait=0)
+        )
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+    
+    def run_requests(self, config: ServiceConfig, count: int):
+        async def make_request(endpoint: str) -> str:
+            response = await self.http.get_async(endpoint)
+            return response.json()["host"]
+        
+        async def run():
+            return [await self.fallback.execute_with_fallback_async(config, make_request) for _ in range(count)]
+        
+        return asyncio.run(run())
+    
+    def test_falls_back_when_limited(self):
+        """额度用完后直接切换备用端点，且不计入熔断统计"""
+        config = ServiceConfig(
+            name="mock",
+            primary_endpoint="https://limited.test/",
+            fallback_endpoints=["https://backup.test/"],
+            rate_limits={"limited.test": RateLimit(2, 60, burst=2)}
+        )
+        self.assertEqual(self.run_requests(config, 4), ["limited.test", "limited.test", "backup.test", "backup.test"])
+        self.assertEqual(self.calls.count("limited.test"), 2)
+        self.assertNotIn("https://limited.test/", self.fallback.get_failed_endpoints())
+        self.assertEqual(self.fallback.get_circuit_states()["https://limited.test/"]["failure_rate"], 0)
+    
+    def test_serves_stale_cache_when_limited(self):
+        """额度用完时返回过期缓存"""
+        config = ServiceConfig(
+            name="mock",
+            primary_endpoint="https://limited.test/",
+            rate_limits={"limited.test": RateLimit(1, 60, burst=1)}
+        )
+        
+        async def make_request(endpoint: str) -> str:
+            response = await self.http.get_async(endpoint, cache_ttl=0.001)
+            return response.json()["host"]
+        
+        async def run():
+            first = await self.fallback.execute_with_fallback_async(config, make_request)
+            await asyncio.sleep(0.01)
+            second = await self.fallback.execute_with_fallback_async(config, make_request)
+            return [first, second]
+        
+        self.assertEqual(asyncio.run(run()), ["limited.test", "limited.test"])
+        self.assertEqual(len(self.calls), 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
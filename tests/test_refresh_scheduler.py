@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+后台刷新调度器单元测试
+"""
+import sys
+import os
+import asyncio
+import datetime
+import time
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache
+from src.core.config import RateLimit, ServiceConfig
+from src.core.fallback_manager import FallbackManager
+from src.core.http_client import HTTPClientManager
+from src.core.rate_limiter import RateLimiter
+from src.core.refresh_scheduler import Dataset, RefreshJob, RefreshScheduler
+from tests.conftest import FakeClock
+
+class TestRefreshScheduler(unittest.TestCase):
+    """后台刷新调度器测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.calls = []
+        self.failing = False
+        self.delay = 0.0
+        self.http = HTTPClientManager(transport=httpx.MockTransport(self.handler), cache=LRUCache(),
+                                      rate_limiter=RateLimiter(max_wait=0))
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+        self.config = ServiceConfig(name="rates", primary_endpoint="https://rates.test/latest/{}", cache_ttl=60)
+        self.clock = FakeClock(1_000_000.0)
+        self.scheduler = RefreshScheduler(jitter=0, idle_after=600, retry_delay=5, clock=self.clock)
+        self.scheduler.register(Dataset("rates", "rates", self.query_rates, interval=50))
+    
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.url.path)
+        await asyncio.sleep(self.delay)
+        if self.failing:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"version": len(self.calls)})
+    
+    async def query_rates(self, base: str) -> str:
+        """模拟服务的查询函数"""
+        self.scheduler.touch("rates", base)
+        
+        async def make_request(endpoint: str) -> str:
+            response = await self.http.get_async(endpoint.format(base))
+            return f"版本 {response.json()['version']}"
+        
+        return await self.fallback.execute_with_fallback_async(self.config, make_request, coalesce_key=base)
+    
+    def query(self, base: str) -> str:
+        return asyncio.run(self.query_rates(base))
+    
+    def run_pending(self) -> int:
+        return asyncio.run(self.scheduler.run_pending())
+    
+    def refresh(self, key: str) -> "asyncio.Future[bool]":
+        """直接刷新一个键，返回刷新任务供并发测试使用"""
+        job = RefreshJob(self.scheduler.datasets["rates"], key, last_used=self.clock.now, next_run=self.clock.now)
+        return asyncio.ensure_future(self.scheduler.refresh(job))
+    
+    def test_refreshes_requested_keys(self):
+        """被请求过的键按间隔刷新，刷新跳过新鲜缓存并更新缓存"""
+        self.assertEqual(self.query("USD"), "版本 1")
+        self.assertEqual(self.run_pending(), 0)
+        
+        self.clock.now += 51
+        self.assertEqual(self.run_pending(), 1)
+        self.assertEqual(self.calls, ["/latest/USD", "/latest/USD"])
+        # 用户请求直接命中刷新后的缓存
+        self.assertEqual(self.query("USD"), "版本 2")
+        self.assertEqual(len(self.calls), 2)
+        # 刷新自身的请求不更新键的访问时间
+        self.assertEqual(self.scheduler.stats()["keys"], {"rates": 1})
+        self.assertEqual(self.run_pending(), 0)
+    
+    def test_idle_keys_paused(self):
+        """长时间无人请求的键停止刷新，再次请求后恢复"""
+        self.query("EUR")
+        for _ in range(12):
+            self.clock.now += 51
+            self.run_pending()
+        self.assertEqual(self.scheduler.stats()["keys"], {"rates": 0})
+        refreshed = len(self.calls)
+        self.assertLessEqual(refreshed, 1 + 600 // 50)
+        
+        self.clock.now += 1000
+        self.assertEqual(self.run_pending(), 0)
+        self.assertEqual(len(self.calls), refreshed)
+        self.query("EUR")
+        self.clock.now += 51
+        self.assertEqual(self.run_pending(), 1)
+    
+    def test_rate_limit_reserved_for_users(self):
+        """剩余令牌不足时放弃刷新并退避，令牌留给用户请求"""
+        self.config = ServiceConfig(name="rates", primary_endpoint="https://rates.test/latest/{}", cache_ttl=60,
+                                    rate_limits={"rates.test": RateLimit(requests=4, period=3600, burst=4)})
+        self.scheduler.rate_reserve = 0.5
+        self.query("GBP")
+        self.query("JPY")
+        calls = len(self.calls)
+        
+        # 令牌只剩 2 个（容量的一半），刷新不再使用
+        self.clock.now += 51
+        self.assertEqual(self.run_pending(), 0)
+        self.assertEqual(len(self.calls), calls)
+        self.assertEqual(self.scheduler.failed, 2)
+        self.assertEqual(self.query("CNY"), "版本 3")
+        
+        # 失败后按退避间隔重试，不等到下一个完整间隔
+        self.clock.now += 5
+        self.assertEqual(self.run_pending(), 0)
+        self.assertEqual(self.scheduler.failed, 4)
+    
+    def test_user_request_not_joined_to_prefetch(self):
+        """刷新进行中时用户请求不加入刷新：额度接近保留值、上游失败时用户仍得到过期缓存"""
+        self.config = ServiceConfig(name="rates", primary_endpoint="https://rates.test/latest/{}", cache_ttl=0.05,
+                                    stale_if_error=3600, retry_count=0,
+                                    rate_limits={"rates.test": RateLimit(requests=4, period=3600, burst=4)})
+        self.assertEqual(self.query("USD"), "版本 1")
+        time.sleep(0.06)
+        self.failing = True
+        self.delay = 0.05
+        
+        async def overlap():
+            # 剩余 3 个令牌，刷新用掉 1 个后正好到达保留值
+            refresh = self.refresh("USD")
+            await asyncio.sleep(0.01)
+            result = await self.query_rates("USD")
+            return result, await refresh
+        
+        result, refreshed = asyncio.run(overlap())
+        self.assertFalse(refreshed)
+        self.assertTrue(result.startswith("版本 1"))
+        self.assertIn("上游暂时不可用", result)
+        # 用户请求自己访问了上游，没有共享刷新的失败结果
+        self.assertEqual(len(self.calls), 3)
+    
+    def test_prefetch_joins_user_request(self):
+        """用户请求进行中时刷新加入该请求，不重复访问上游"""
+        self.delay = 0.05
+        
+        async def overlap():
+            user = asyncio.ensure_future(self.query_rates("EUR"))
+            await asyncio.sleep(0.01)
+            refreshed = await self.refresh("EUR")
+            return await user, refreshed
+        
+        result, refreshed = asyncio.run(overlap())
+        self.assertEqual(result, "版本 1")
+        self.assertTrue(refreshed)
+        self.assertEqual(len(self.calls), 1)
+    
+    def test_unregistered_and_disabled(self):
+        """未登记的数据集和关闭刷新时不记录请求"""
+        self.scheduler.touch("unknown", "x")
+        self.scheduler.enabled = False
+        self.query("USD")
+        self.clock.now += 51
+        self.assertEqual(self.run_pending(), 0)
+        self.assertEqual(self.scheduler.stats()["keys"], {"rates": 0})
+    
+    def test_daily_dataset_refreshed_after_midnight(self):
+        """按日更新的数据集在午夜后一分钟内刷新"""
+        self.scheduler.register(Dataset("history", "history", self.query_rates, interval=3600, daily=True))
+        self.clock.now = datetime.datetime(2026, 5, 1, 23, 50).timestamp()
+        self.scheduler.touch("history")
+        next_run = self.scheduler._jobs[("history", None)].next_run
+        midnight = datetime.datetime(2026, 5, 2).timestamp()
+        self.assertGreater(next_run, midnight)
+        self.assertLessEqual(next_run, midnight + 60)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+响应缓存单元测试
+"""
+import sys
+import os
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache, make_cache_key
+from src.core.config import ServiceConfig
+from src.core.http_client import HTTPClientManager
+from src.core.fallback_manager import FallbackManager
+from tests.conftest import make_entry
+
+class TestLRUCache(unittest.TestCase):
+    """LRU缓存测试类"""
+    
+    def test_evicts_least_recently_used(self):
+        """超出条目上限时淘汰最久未使用的条目"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", make_entry())
+        cache.set("b", make_entry())
+        cache.get("a")
+        cache.set("c", make_entry())
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+    
+    def test_bounded_by_bytes(self):
+        """总字节数不超过上限"""
+        cache = LRUCache(max_entries=100, max_bytes=1000)
+        for i in range(10):
+            cache.set(str(i), make_entry(b"x" * 300))
+        self.assertLessEqual(cache.stats()["bytes"], 1000)
+        self.assertIsNotNone(cache.get("9"))
+    
+    def test_expired_entry_is_miss(self):
+        """过期条目视为未命中，但仍可通过get_stale读取"""
+        cache = LRUCache()
+        cache.set("a", make_entry(ttl=-1))
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get_stale("a"))
+    
+    def test_key_ignores_param_order(self):
+        """参数顺序不影响缓存键"""
+        self.assertEqual(
+            make_cache_key("https://a.test/p?x=1", {"b": "2", "a": "1"}),
+            make_cache_key("https://a.test/p", {"a": "1", "x": "1", "b": "2"})
+        )
+
+class TestHTTPCache(unittest.TestCase):
+    """HTTP层缓存测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.calls = 0
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.calls += 1
+            return httpx.Response(200, json={"n": self.calls})
+        
+        self.http = HTTPClientManager(transport=httpx.MockTransport(handler), cache=LRUCache())
+    
+    def test_explicit_ttl(self):
+        """显式cache_ttl时重复请求只访问上游一次"""
+        first = self.http.get("https://upstream.test/rates", params={"base": "USD"}, cache_ttl=60)
+        second = self.http.get("https://upstream.test/rates", params={"base": "USD"}, cache_ttl=60)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first.json(), second.json())
+    
+    def test_no_ttl_no_cache(self):
+        """未配置有效期时不缓存"""
+        self.http.get("https://upstream.test/random")
+        self.http.get("https://upstream.test/random")
+        self.assertEqual(self.calls, 2)
+    
+    def test_service_ttl_from_fallback(self):
+        """服务配置的cache_ttl通过FallbackManager生效"""
+        config = ServiceConfig(name="mock", primary_endpoint="https://upstream.test/history", cache_ttl=60)
+        fallback = FallbackManager()
+        fallback.exploration_rate = 0
+        
+        async def make_request(endpoint: str) -> str:
+            response = await self.http.get_async(endpoint)
+            return str(response.json()["n"])
+        
+        async def run():
+            return [await fallback.execute_with_fallback_async(config, make_request) for _ in range(3)]
+        
+        self.assertEqual(asyncio.run(run()), ["1", "1", "1"])
+        self.assertEqual(self.calls, 1)
+    
+    def test_rejected_payload_not_cached(self):
+        """请求函数拒绝的 2xx 响应（如内容是错误信息）不写入缓存"""
+        config = ServiceConfig(name="mock", primary_endpoint="https://upstream.test/history", cache_ttl=60)
+        fallback = FallbackManager()
+        fallback.exploration_rate = 0
+        
+        async def make_request(endpoint: str) -> str:
+            response = await self.http.get_async(endpoint)
+            n = response.json()["n"]
+            if n == 1:
+                raise ValueError("上游返回了错误信息")
+            return str(n)
+        
+        async def run():
+            return [await fallback.execute_with_fallback_async(config, make_request) for _ in range(3)]
+        
+        results = asyncio.run(run())
+        self.assertIn("不可用", results[0])
+        self.assertEqual(results[1:], ["2", "2"])
+        self.assertEqual(self.calls, 2)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
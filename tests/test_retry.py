@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+重试策略单元测试
+"""
+import sys
+import os
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import ServiceConfig
+from src.core.http_client import HTTPClientManager
+from src.core.fallback_manager import FallbackManager
+from src.core.retry import RetryBudget, RetryPolicy, is_retryable, parse_retry_after
+
+def status_error(status: int, headers=None) -> httpx.HTTPStatusError:
+    """创建指定状态码的HTTP错误"""
+    request = httpx.Request("GET", "https://upstream.test/")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+class TestRetryPolicy(unittest.TestCase):
+    """重试策略测试类"""
+    
+    def test_retryable_classification(self):
+        """仅临时性错误可重试，超时直接切换备用端点"""
+        request = httpx.Request("GET", "https://upstream.test/")
+        self.assertFalse(is_retryable(httpx.ConnectTimeout("timeout", request=request)))
+        self.assertFalse(is_retryable(httpx.ReadTimeout("timeout", request=request)))
+        self.assertTrue(is_retryable(httpx.ConnectError("refused", request=request)))
+        self.assertTrue(is_retryable(status_error(503)))
+        self.assertTrue(is_retryable(status_error(429)))
+        self.assertFalse(is_retryable(status_error(404)))
+        self.assertFalse(is_retryable(ValueError("bad json")))
+    
+    def test_backoff_bounded(self):
+        """退避时间带抖动且不超过上限"""
+        policy = RetryPolicy(max_retries=10, base_delay=0.1, max_delay=1.0)
+        for attempt in range(10):
+            delay = policy.backoff(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(1.0, 0.1 * 2 ** attempt))
+    
+    def test_retry_after(self):
+        """遵守Retry-After，过长时不重试"""
+        policy = RetryPolicy(max_retries=2, max_delay=5.0)
+        self.assertEqual(parse_retry_after(status_error(429, {"Retry-After": "2"})), 2.0)
+        self.assertEqual(policy.next_delay(0, status_error(429, {"Retry-After": "2"})), 2.0)
+        self.assertIsNone(policy.next_delay(0, status_error(429, {"Retry-After": "60"})))
+        self.assertIsNotNone(parse_retry_after(status_error(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})))
+    
+    def test_budget(self):
+        """重试预算限制次数和总等待时长"""
+        budget = RetryBudget(max_retries=2, max_delay=1.0)
+        self.assertTrue(budget.try_acquire(0.4))
+        self.assertFalse(budget.try_acquire(0.7))
+        self.assertTrue(budget.try_acquire(0.5))
+        self.assertFalse(budget.try_acquire(0))
+
+class TestHTTPRetry(unittest.TestCase):
+    """HTTP层重试测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def run_with_fallback(self, statuses, retry_count=2):
+        """按给定状态码序列响应，通过FallbackManager执行一次请求"""
+        self.calls = 0
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            status = statuses[min(self.calls, len(statuses) - 1)]
+            self.calls += 1
+            return httpx.Response(status, headers={"Retry-After": "0"}, json={"ok": status == 200})
+        
+        http = HTTPClientManager(transport=httpx.MockTransport(handler))
+        config = ServiceConfig(name="mock", primary_endpoint="https://upstream.test/", retry_count=retry_count)
+        fallback = FallbackManager()
+        fallback.exploration_rate = 0
+        
+        async def make_request(endpoint: str) -> str:
+            response = await http.get_async(endpoint)
+            return "ok" if response.json()["ok"] else "bad"
+        
+        return asyncio.run(fallback.execute_with_fallback_async(config, make_request))
+    
+    def test_retries_transient_error(self):
+        """502后重试成功"""
+        self.assertEqual(self.run_with_fallback([502, 200]), "ok")
+        self.assertEqual(self.calls, 2)
+    
+    def test_no_retry_on_client_error(self):
+        """404不重试"""
+        self.assertIn("不可用", self.run_with_fallback([404, 200]))
+        self.assertEqual(self.calls, 1)
+    
+    def test_retry_count_limit(self):
+        """重试次数受服务配置限制"""
+        self.assertIn("不可用", self.run_with_fallback([503], retry_count=1))
+        self.assertEqual(self.calls, 2)
+    
+    def test_timeout_moves_to_fallback(self):
+        """主端点超时后不在同一端点重试，直接切换备用端点"""
+        calls = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.host)
+            if request.url.host == "hanging.test":
+                raise httpx.ReadTimeout("timeout", request=request)
+            return httpx.Response(200, json={"ok": True})
+        
+        http = HTTPClientManager(transport=httpx.MockTransport(handler))
+        config = ServiceConfig(name="mock", primary_endpoint="https://hanging.test/",
+                               fallback_endpoints=("https://fallback.test/",), retry_count=2)
+        fallback = FallbackManager()
+        fallback.exploration_rate = 0
+        
+        async def make_request(endpoint: str) -> str:
+            response = await http.get_async(endpoint)
+            return "ok" if response.json()["ok"] else "bad"
+        
+        self.assertEqual(asyncio.run(fallback.execute_with_fallback_async(config, make_request)), "ok")
+        self.assertEqual(calls, ["hanging.test", "fallback.test"])
+    
+    def test_no_retry_without_service_context(self):
+        """没有服务上下文时（如健康检查）不重试"""
+        calls = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(503)
+        
+        http = HTTPClientManager(transport=httpx.MockTransport(handler))
+        with self.assertRaises(httpx.HTTPStatusError):
+            http.get("https://upstream.test/")
+        self.assertEqual(len(calls), 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+服务注册表单元测试
+"""
+import sys
+import os
+import json
+import tempfile
+import dataclasses
+import unittest
+import logging
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import config_manager
+from src.core.service_registry import EndpointInfo, RateLimit, ServiceConfig, ServiceRegistry, load_document
+
+class TestServiceRegistry(unittest.TestCase):
+    """服务注册表测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_lookup_returns_same_instance(self):
+        """服务配置只构建一次"""
+        self.assertIs(config_manager.get_service_config("cryptocurrency"),
+                      config_manager.get_service_config("cryptocurrency"))
+        self.assertEqual(len(config_manager.services), 15)
+    
+    def test_immutable(self):
+        """服务配置不可修改"""
+        config = config_manager.get_service_config("news")
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            config.timeout = 10
+        with self.assertRaises(TypeError):
+            config.rate_limits["newsapi.org"] = RateLimit(1)
+        self.assertIsInstance(config.fallback_endpoints, tuple)
+    
+    def test_endpoint_metadata(self):
+        """端点元数据预先解析"""
+        ip = config_manager.get_service_config("ip_location")
+        primary = ip.endpoints[0]
+        self.assertEqual((primary.scheme, primary.host), ("https", "ip-api.com"))
+        self.assertTrue(primary.is_template)
+        self.assertFalse(primary.needs_key)
+        
+        self.assertTrue(config_manager.get_service_config("weather").endpoints[0].needs_key)
+        backup = EndpointInfo.parse("backup://local-rates", needs_key=True)
+        self.assertTrue(backup.is_backup)
+        self.assertFalse(backup.needs_key)
+        self.assertIs(config_manager.services.endpoint(ip.primary_endpoint), primary)
+    
+    def test_unknown_service(self):
+        """未注册的服务返回空配置"""
+        config = config_manager.get_service_config("missing")
+        self.assertEqual(config.all_endpoints, ())
+    
+    def test_load_json_overrides_and_adds(self):
+        """从JSON文件覆盖内置服务并新增服务"""
+        builtin = {"quotes": ServiceConfig(name="quotes", primary_endpoint="https://a.test/", cache_ttl=60)}
+        document = {"services": {
+            "quotes": {"fallback_endpoints": ["https://b.test/"]},
+            "extra": {"primary_endpoint": "https://c.test/", "rate_limits": {"c.test": [10, 60]}}
+        }}
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(document, f)
+        try:
+            registry = ServiceRegistry.load(builtin, load_document(f.name)["services"])
+        finally:
+            os.unlink(f.name)
+        
+        quotes = registry.get("quotes")
+        self.assertEqual(quotes.all_endpoints, ("https://a.test/", "https://b.test/"))
+        self.assertEqual(quotes.cache_ttl, 60)
+        self.assertEqual(registry.get("extra").rate_limits["c.test"], RateLimit(10, 60))
+    
+    def test_load_toml(self):
+        """从TOML文件加载服务"""
+        with tempfile.NamedTemporaryFile("w", suffix=".toml", delete=False) as f:
+            f.write('[services.extra]\nprimary_endpoint = "https://c.test/"\n'
+                    '[services.extra.rate_limits."c.test"]\nrequests = 5\nperiod = 1\n')
+        try:
+            registry = ServiceRegistry.load({}, load_document(f.name)["services"])
+        finally:
+            os.unlink(f.name)
+        self.assertEqual(registry.get("extra").rate_limits["c.test"], RateLimit(5, 1))
+    
+    def test_rejects_unknown_field(self):
+        """配置文件中的未知字段报错"""
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump({"services": {"extra": {"primary_endpoint": "https://c.test/", "bogus": 1}}}, f)
+        try:
+            with self.assertRaises(ValueError):
+                ServiceRegistry.load({}, load_document(f.name)["services"])
+        finally:
+            os.unlink(f.name)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+共享状态进程单元测试
+"""
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import CacheEntry, LRUCache, TieredCache
+from src.core.circuit_breaker import CircuitState
+from src.core.config import RateLimit, ServiceConfig
+from src.core.error_handler import RateLimitedError
+from src.core.fallback_manager import FallbackManager
+from src.core.http_client import HTTPClientManager
+from src.core.sidecar import (
+    SidecarCache, SidecarClient, SidecarRateLimiter, SidecarServer, SidecarUnavailable
+)
+
+class TestSidecar(unittest.TestCase):
+    """共享状态进程测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置：在后台线程中运行守护进程"""
+        logging.getLogger().setLevel(logging.ERROR)
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmpdir.name, "sidecar.sock")
+        cls.server = SidecarServer(cls.path)
+        cls.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        
+        def run():
+            asyncio.set_event_loop(cls.loop)
+            cls.loop.run_until_complete(cls.server.start())
+            started.set()
+            cls.loop.run_forever()
+        
+        cls.thread = threading.Thread(target=run, daemon=True)
+        cls.thread.start()
+        started.wait(5)
+    
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.server.close(), cls.loop).result(5)
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join(5)
+        cls.tmpdir.cleanup()
+    
+    def setUp(self):
+        self.clients = []
+    
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+    
+    def client(self, path=None) -> SidecarClient:
+        """模拟一个服务进程的客户端"""
+        client = SidecarClient(path or self.path, timeout=1.0)
+        self.clients.append(client)
+        return client
+    
+    def wait_for(self, predicate, timeout: float = 2.0):
+        """等待在后台线程中发出的报告送达守护进程"""
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            self.assertLess(time.monotonic(), deadline, "等待共享状态超时")
+            time.sleep(0.01)
+    
+    def test_cache_shared_between_processes(self):
+        """一个进程写入的响应，另一个进程从共享缓存读取并回填到内存"""
+        first = TieredCache(SidecarCache(self.client()))
+        second = TieredCache(SidecarCache(self.client()))
+        entry = CacheEntry(url="https://rates.test/latest/USD", status_code=200,
+                           headers=(("content-type", "application/json"),),
+                           content=b'{"rates": {"CNY": 7.2}}', expires_at=time.time() + 60)
+        first.set("rates-usd", entry)
+        
+        shared = second.get("rates-usd")
+        self.assertEqual(shared, entry)
+        self.assertEqual(second.backing_hits, 1)
+        self.assertEqual(len(second), 1)
+        self.assertIsNone(second.get("missing"))
+        
+        # 过期条目只能通过 get_stale 读取
+        stale = CacheEntry(url="https://rates.test/latest/EUR", status_code=200, headers=(),
+                           content=b"{}", expires_at=time.time() - 1)
+        first.set("rates-eur", stale)
+        self.assertIsNone(TieredCache(SidecarCache(self.client())).get("rates-eur"))
+        self.assertEqual(TieredCache(SidecarCache(self.client())).get_stale("rates-eur").content, b"{}")
+    
+    def test_http_manager_uses_shared_cache(self):
+        """两个HTTP客户端管理器共享缓存，第二个进程不访问上游"""
+        calls = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(str(request.url))
+            return httpx.Response(200, json={"text": "event"})
+        
+        settings = {
+            "sidecar_socket": self.path, "sidecar_timeout": 1.0, "sidecar_retry_interval": 5.0,
+            "cache_max_entries": 16, "cache_max_bytes": 1024 * 1024, "rate_limit_max_wait": 1.0
+        }
+        managers = []
+        for _ in range(2):
+            http = HTTPClientManager(transport=httpx.MockTransport(handler), cache=LRUCache())
+            self.assertTrue(http.configure_sidecar(settings))
+            self.clients.append(http.sidecar)
+            self.assertIsInstance(http.cache, TieredCache)
+            managers.append(http)
+        
+        url = "https://history.test/date/5/1"
+        self.assertEqual(managers[0].get(url, cache_ttl=60).json(), {"text": "event"})
+        self.assertEqual(managers[1].get(url, cache_ttl=60).json(), {"text": "event"})
+        self.assertEqual(len(calls), 1)
+    
+    def test_rate_limit_shared_between_processes(self):
+        """各进程从同一个令牌桶取令牌，总请求数不超过上游额度"""
+        limit = RateLimit(requests=4, period=3600, burst=4)
+        limiters = [SidecarRateLimiter(self.client(), max_wait=0) for _ in range(2)]
+        for limiter in limiters:
+            limiter.configure("shared.test", limit)
+        
+        async def run():
+            granted = 0
+            for i in range(8):
+                try:
+                    await limiters[i % 2].acquire("shared.test")
+                    granted += 1
+                except RateLimitedError:
+                    pass
+            return granted
+        
+        self.assertEqual(asyncio.run(run()), 4)
+        # 共享令牌桶清空后，另一个进程也拿不到令牌
+        limiters[0].configure("drained.test", limit)
+        limiters[1].configure("drained.test", limit)
+        limiters[0].drain("drained.test")
+        with self.assertRaises(RateLimitedError):
+            asyncio.run(limiters[1].acquire("drained.test"))
+    
+    def test_endpoint_health_shared(self):
+        """一个进程熔断的端点，其他进程同步后也跳过"""
+        config = ServiceConfig(name="mock", primary_endpoint="https://down.test/",
+                               fallback_endpoints=("https://up.test/",))
+        first, second = FallbackManager(), FallbackManager()
+        for manager in (first, second):
+            manager.exploration_rate = 0
+            manager.sidecar = self.client()
+        calls = []
+        
+        def make_request(endpoint: str) -> str:
+            calls.append(endpoint)
+            if endpoint == "https://down.test/":
+                raise ConnectionError("down")
+            return "ok"
+        
+        for _ in range(3):
+            self.assertEqual(first.execute_with_fallback(config, make_request), "ok")
+        self.assertIs(first.breakers.get("https://down.test/").state, CircuitState.OPEN)
+        self.wait_for(lambda: "https://down.test/" in self.client().open_endpoints())
+        
+        calls.clear()
+        self.assertEqual(second.execute_with_fallback(config, make_request), "ok")
+        self.assertEqual(calls, ["https://up.test/"])
+        self.assertIs(second.breakers.get("https://down.test/").state, CircuitState.OPEN)
+        
+        # 端点恢复后报告给其他进程
+        first.breakers.get("https://down.test/").force_open(0)
+        self.assertEqual(first.execute_with_fallback(config, lambda endpoint: "ok"), "ok")
+        self.wait_for(lambda: "https://down.test/" not in self.client().open_endpoints())
+    
+    def test_event_loop_not_blocked(self):
+        """事件循环中的缓存读写、取令牌和熔断同步都在线程池中访问守护进程"""
+        client = self.client()
+        threads = []
+        call = client.call
+        
+        def record(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return call(*args, **kwargs)
+        
+        client.call = record
+        cache = TieredCache(SidecarCache(client))
+        limiter = SidecarRateLimiter(client, max_wait=0)
+        limiter.configure("loop.test", RateLimit(requests=4, period=3600, burst=4))
+        fallback = FallbackManager()
+        fallback.sidecar = client
+        entry = CacheEntry(url="https://a.test/", status_code=200, headers=(), content=b"x",
+                           expires_at=time.time() + 60)
+        
+        async def run():
+            await cache.set_async("loop", entry)
+            self.assertEqual(await TieredCache(SidecarCache(client)).get_async("loop"), entry)
+            await limiter.acquire("loop.test")
+            await fallback.sync_shared_health_async(force=True)
+        
+        asyncio.run(run())
+        self.assertEqual(len(threads), 4)
+        self.assertNotIn(threading.get_ident(), threads)
+    
+    def test_unavailable_sidecar_falls_back(self):
+        """守护进程不可用时退回本地状态，并在重试间隔内不再连接"""
+        client = self.client(os.path.join(self.tmpdir.name, "missing.sock"))
+        cache = TieredCache(SidecarCache(client))
+        entry = CacheEntry(url="https://a.test/", status_code=200, headers=(), content=b"x",
+                           expires_at=time.time() + 60)
+        cache.set("k", entry)
+        self.assertEqual(cache.get("k"), entry)
+        self.assertFalse(client.available)
+        with self.assertRaises(SidecarUnavailable):
+            client.open_endpoints()
+        
+        limiter = SidecarRateLimiter(client, max_wait=0)
+        limiter.configure("local.test", RateLimit(requests=1, period=3600, burst=1))
+        asyncio.run(limiter.acquire("local.test"))
+        with self.assertRaises(RateLimitedError):
+            asyncio.run(limiter.acquire("local.test"))
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
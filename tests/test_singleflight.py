@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+请求合并单元测试
+"""
+import sys
+import os
+import asyncio
+import threading
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import ServiceConfig
+from src.core.deadline import current_deadline, deadline_scope
+from src.core.error_handler import DeadlineExceededError
+from src.core.http_client import HTTPClientManager
+from src.core.fallback_manager import FallbackManager
+from src.core.singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    """请求合并测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_concurrent_calls_share_result(self):
+        """相同键的并发调用只执行一次"""
+        flight = SingleFlight()
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "done"
+        
+        async def run():
+            return await asyncio.gather(*[flight.do("k", work) for _ in range(10)])
+        
+        self.assertEqual(asyncio.run(run()), ["done"] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats()["shared"], 9)
+        self.assertEqual(flight.in_flight(), 0)
+    
+    def test_exception_shared(self):
+        """异常传递给所有等待者"""
+        flight = SingleFlight()
+        
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("上游错误")
+        
+        async def run():
+            return await asyncio.gather(*[flight.do("k", fail) for _ in range(3)], return_exceptions=True)
+        
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+    
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """某个调用方取消不影响其他等待者"""
+        flight = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.05)
+            return 42
+        
+        async def run():
+            first = asyncio.ensure_future(flight.do("k", work))
+            second = asyncio.ensure_future(flight.do("k", work))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+        
+        self.assertEqual(asyncio.run(run()), 42)
+    
+    def test_join_after_last_waiter_cancelled(self):
+        """所有等待者取消后加入的调用重新执行，不会收到取消异常"""
+        flight = SingleFlight()
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return 42
+        
+        async def run():
+            first = asyncio.ensure_future(flight.do("k", work))
+            await asyncio.sleep(0)
+            first.cancel()
+            # 取消尚未生效时加入
+            second = asyncio.ensure_future(flight.do("k", work))
+            return await second
+        
+        self.assertEqual(asyncio.run(run()), 42)
+        self.assertEqual(len(calls), 2)
+    
+    def test_waiters_use_own_deadline(self):
+        """实际调用不继承发起者的截止时间，各等待者按自己的截止时间等待"""
+        flight = SingleFlight()
+        seen = []
+        
+        async def work():
+            seen.append(current_deadline.get())
+            await asyncio.sleep(0.2)
+            return 42
+        
+        async def call(budget):
+            if budget is None:
+                return await flight.do("k", work)
+            with deadline_scope(budget):
+                return await flight.do("k", work)
+        
+        async def run():
+            return await asyncio.gather(call(0.05), call(None), call(0.05), return_exceptions=True)
+        
+        first, joiner, short = asyncio.run(run())
+        self.assertIsInstance(first, DeadlineExceededError)
+        self.assertEqual(joiner, 42)
+        self.assertIsInstance(short, DeadlineExceededError)
+        self.assertEqual(seen, [None])
+    
+    def test_http_requests_coalesced(self):
+        """并发的相同HTTP请求只访问上游一次（异步和同步路径）"""
+        calls = []
+        
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(str(request.url))
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, json={"rates": {"CNY": 7.2}})
+        
+        http = HTTPClientManager(transport=httpx.MockTransport(handler))
+        
+        async def run():
+            return await asyncio.gather(*[
+                http.get_async("https://rates.test/latest/USD") for _ in range(5)
+            ])
+        
+        responses = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r.json()["rates"]["CNY"] == 7.2 for r in responses))
+        
+        calls.clear()
+        threads = [threading.Thread(target=http.get, args=("https://rates.test/latest/EUR",)) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+    
+    def test_fallback_coalesce_key(self):
+        """带合并键的服务调用共享解析后的结果"""
+        fallback = FallbackManager()
+        fallback.exploration_rate = 0
+        config = ServiceConfig(name="mock", primary_endpoint="https://primary.test/")
+        calls = []
+        
+        async def make_request(endpoint: str) -> str:
+            calls.append(endpoint)
+            await asyncio.sleep(0.05)
+            return "BITCOIN 价格信息"
+        
+        async def run():
+            return await asyncio.gather(*[
+                fallback.execute_with_fallback_async(config, make_request, coalesce_key="bitcoin")
+                for _ in range(4)
+            ])
+        
+        self.assertEqual(asyncio.run(run()), ["BITCOIN 价格信息"] * 4)
+        self.assertEqual(len(calls), 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+过期缓存（stale-while-revalidate / stale-if-error）单元测试
+"""
+import sys
+import os
+import asyncio
+import time
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache
+from src.core.config import ServiceConfig
+from src.core.fallback_manager import FallbackManager, format_age
+from src.core.http_client import STALE_HEADER, HTTPClientManager
+
+class TestStaleCache(unittest.TestCase):
+    """过期缓存测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """类级别的设置"""
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def setUp(self):
+        self.calls = []
+        self.failing = False
+        self.http = HTTPClientManager(transport=httpx.MockTransport(self.handler), cache=LRUCache())
+        self.fallback = FallbackManager()
+        self.fallback.exploration_rate = 0
+        self.headers = []
+    
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.url.host)
+        await asyncio.sleep(0.01)
+        if self.failing:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"version": len(self.calls)})
+    
+    def make_request(self, endpoint: str) -> str:
+        if endpoint.startswith("backup://"):
+            return "本地备用数据"
+        response = self.http.get(endpoint)
+        self.headers.append(response.headers.get(STALE_HEADER))
+        return f"版本 {response.json()['version']}"
+    
+    def call(self, config: ServiceConfig) -> str:
+        return self.fallback.execute_with_fallback(config, self.make_request)
+    
+    def test_stale_while_revalidate(self):
+        """过期不久的缓存立即返回，并在后台刷新"""
+        config = ServiceConfig(name="rates", primary_endpoint="https://rates.test/latest/USD",
+                               cache_ttl=0.05, stale_while_revalidate=60)
+        self.assertEqual(self.call(config), "版本 1")
+        time.sleep(0.06)
+        
+        # 过期后的调用不等待上游，返回旧数据并标注已过期
+        self.assertEqual(self.call(config), "版本 1")
+        self.assertEqual(self.headers[-1], "0")
+        time.sleep(0.05)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.call(config), "版本 2")
+        self.assertIsNone(self.headers[-1])
+    
+    def test_revalidation_window_bounded(self):
+        """过期时间超过窗口时同步请求上游"""
+        config = ServiceConfig(name="rates", primary_endpoint="https://rates.test/latest/EUR",
+                               cache_ttl=0.01, stale_while_revalidate=0.01)
+        self.call(config)
+        time.sleep(0.05)
+        self.assertEqual(self.call(config), "版本 2")
+        self.assertIsNone(self.headers[-1])
+    
+    def test_stale_if_error(self):
+        """所有端点都失败时返回过期缓存并标注，优先于本地备用数据"""
+        config = ServiceConfig(name="rates", primary_endpoint="https://rates.test/latest/GBP",
+                               fallback_endpoints=("backup://local-rates",),
+                               cache_ttl=0.01, stale_if_error=60, retry_count=0)
+        self.assertEqual(self.call(config), "版本 1")
+        time.sleep(0.02)
+        
+        self.failing = True
+        result = self.call(config)
+        self.assertTrue(result.startswith("版本 1"))
+        self.assertIn("上游暂时不可用", result)
+        self.assertIn("已过期", result)
+        self.assertIsNotNone(self.headers[-1])
+        # 降级读取不访问上游，也不计入端点的失败统计
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.fallback.endpoint_stats.get("https://rates.test/latest/GBP").requests, 2)
+    
+    def test_stale_if_error_bounded(self):
+        """过期时间超过上限或没有缓存时使用本地备用数据"""
+        config = ServiceConfig(name="rates", primary_endpoint="https://rates.test/latest/JPY",
+                               fallback_endpoints=("backup://local-rates",),
+                               cache_ttl=0.01, stale_if_error=0.01, retry_count=0)
+        self.call(config)
+        time.sleep(0.05)
+        self.failing = True
+        self.assertEqual(self.call(config), "本地备用数据")
+        
+        uncached = ServiceConfig(name="rates", primary_endpoint="https://rates.test/latest/CNY",
+                                 cache_ttl=60, stale_if_error=60, retry_count=0)
+        self.assertIn("所有端点都不可用", self.call(uncached))
+    
+    def test_format_age(self):
+        """过期时长格式化"""
+        self.assertEqual(format_age(12), "12秒")
+        self.assertEqual(format_age(125), "2分钟")
+        self.assertEqual(format_age(5400), "1.5小时")
+        self.assertEqual(format_age(3 * 86400), "3.0天")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file
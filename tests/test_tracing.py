@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+调用链追踪单元测试
+"""
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+import logging
+
+import httpx
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import ServiceConfig
+from src.core.fallback_manager import FallbackManager
+from src.core.http_client import HTTPClientManager
+from src.core.tracing import JSONLinesExporter, RingBufferExporter, Tracer, format_trace, tracer
+
+class TestTracer(unittest.TestCase):
+    """追踪器测试"""
+    
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_nested_spans(self):
+        """子 span 继承调用链并在根 span 结束后一起导出"""
+        buffer = RingBufferExporter()
+        tracer = Tracer(exporters=[buffer])
+        with tracer.span("root", tool="demo") as root:
+            with tracer.span("child") as child:
+                child.set_attribute("status", 200)
+        
+        (spans,) = buffer.traces()
+        self.assertIs(spans[0], root)
+        self.assertEqual(spans[1].name, "child")
+        self.assertEqual(spans[1].trace_id, root.trace_id)
+        self.assertEqual(spans[1].parent_id, root.span_id)
+        self.assertEqual(spans[1].attributes["status"], 200)
+        self.assertIsNotNone(root.duration)
+    
+    def test_error_recorded(self):
+        """异常记录到 span 上并继续抛出"""
+        buffer = RingBufferExporter()
+        tracer = Tracer(exporters=[buffer])
+        with self.assertRaises(ValueError):
+            with tracer.span("root"):
+                raise ValueError("boom")
+        span = buffer.traces()[0][0]
+        self.assertEqual(span.status, "error")
+        self.assertEqual(span.attributes["error"], "ValueError")
+    
+    def test_sampling(self):
+        """未采样的调用链及其子 span 都不导出"""
+        buffer = RingBufferExporter()
+        tracer = Tracer(sample_rate=0, exporters=[buffer])
+        with tracer.span("root") as root:
+            self.assertFalse(root.recording)
+            with tracer.span("child") as child:
+                child.set_attribute("ignored", True)
+        self.assertEqual(buffer.traces(), [])
+    
+    def test_async_children(self):
+        """并发任务中的 span 挂在创建任务时的父 span 下"""
+        buffer = RingBufferExporter()
+        tracer = Tracer(exporters=[buffer])
+        
+        async def work(name: str):
+            with tracer.span(name):
+                await asyncio.sleep(0)
+        
+        async def run():
+            with tracer.span("root") as root:
+                await asyncio.gather(work("a"), work("b"))
+            return root
+        
+        root = asyncio.run(run())
+        spans = buffer.traces()[0]
+        self.assertEqual(sorted(s.name for s in spans[1:]), ["a", "b"])
+        self.assertTrue(all(s.parent_id == root.span_id for s in spans[1:]))
+    
+    def test_ring_buffer_slowest(self):
+        """环形缓冲区只保留最近的调用链，并按根 span 耗时排序"""
+        buffer = RingBufferExporter(capacity=2)
+        tracer = Tracer(exporters=[buffer])
+        for name in ("a", "b", "c"):
+            with tracer.span(name) as span:
+                pass
+            span.duration = {"a": 3.0, "b": 1.0, "c": 2.0}[name]
+        self.assertEqual([spans[0].name for spans in buffer.slowest(5)], ["c", "b"])
+    
+    def test_json_lines_exporter(self):
+        """JSON Lines 导出器每个 span 写一行"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces.jsonl")
+            tracer = Tracer(exporters=[JSONLinesExporter(path)])
+            with tracer.span("root"):
+                with tracer.span("child", endpoint="https://example.test"):
+                    pass
+            with open(path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual([r["name"] for r in records], ["root", "child"])
+        self.assertEqual(records[1]["attributes"]["endpoint"], "https://example.test")
+        self.assertEqual(records[1]["parent_id"], records[0]["span_id"])
+
+class TestFallbackTracing(unittest.TestCase):
+    """备用端点和HTTP尝试的调用链测试"""
+    
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger().setLevel(logging.ERROR)
+    
+    def test_fallback_chain(self):
+        """调用链记录失败的主端点、HTTP状态码和成功的备用端点"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "primary.test":
+                return httpx.Response(404)
+            return httpx.Response(200, json={"ok": True})
+        
+        http = HTTPClientManager(transport=httpx.MockTransport(handler))
+        manager = FallbackManager()
+        manager.exploration_rate = 0
+        service = ServiceConfig(
+            name="trace_test",
+            primary_endpoint="https://primary.test/a",
+            fallback_endpoints=["https://backup.test/a"],
+            cache_ttl=0
+        )
+        buffer = RingBufferExporter()
+        original = tracer.exporters
+        tracer.exporters = [buffer]
+        
+        async def request(endpoint: str) -> str:
+            response = await http.get_async(endpoint)
+            return response.text
+        
+        async def run():
+            try:
+                with tracer.span("tool demo"):
+                    return await manager.execute_with_fallback_async(service, request)
+            finally:
+                await http.aclose()
+        
+        try:
+            asyncio.run(run())
+        finally:
+            tracer.exporters = original
+        
+        spans = next(t for t in buffer.traces() if t[0].name == "tool demo")
+        names = [s.name for s in spans]
+        self.assertEqual(names.count("endpoint"), 2)
+        fallback = next(s for s in spans if s.name == "fallback")
+        self.assertEqual(fallback.attributes["outcome"], "success")
+        self.assertIn("endpoint=https://backup.test/a", format_trace(spans))
+        # 上游请求由合并器执行，作为独立的调用链记录，根 span 指向发起的调用链
+        flights = [t for t in buffer.traces() if t[0].name == "singleflight"]
+        self.assertTrue(all(t[0].attributes["caller_trace"] == spans[0].trace_id for t in flights))
+        http_spans = [s for t in flights for s in t if s.name == "http GET"]
+        self.assertEqual([s.attributes["status"] for s in http_spans], [404, 200])
+        self.assertEqual(http_spans[0].status, "error")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
\ No newline at end of file